@@ -0,0 +1,82 @@
+import { colors } from '../../theme/colors';
+import { formatEur } from '../../utils/formatters';
+
+interface FlowData {
+  from: string;
+  to: string;
+  fees: number;
+  transfers: number;
+}
+
+interface Props {
+  data: FlowData[];
+}
+
+function getColor(value: number, max: number): string {
+  const ratio = max > 0 ? value / max : 0;
+  if (ratio < 0.1) return colors.text.tertiary;
+  if (ratio < 0.3) return colors.accent.cyan;
+  if (ratio < 0.6) return colors.accent.amber;
+  return colors.accent.red;
+}
+
+export default function LeagueFlowMatrix({ data }: Props) {
+  const leagues = [...new Set(data.flatMap((d) => [d.from, d.to]))].sort((a, b) =>
+    a === 'Other' ? 1 : b === 'Other' ? -1 : a.localeCompare(b),
+  );
+  const max = Math.max(0, ...data.map((d) => d.fees));
+
+  const getFlow = (from: string, to: string) =>
+    data.find((d) => d.from === from && d.to === to);
+
+  return (
+    <div className="overflow-x-auto">
+      <table className="w-full">
+        <thead>
+          <tr>
+            <th className="text-left text-[10px] font-mono text-[#555568] px-2 py-1.5 w-32">
+              Seller \ Buyer
+            </th>
+            {leagues.map((l) => (
+              <th
+                key={l}
+                className="text-center text-[10px] font-mono text-[#555568] px-2 py-1.5"
+              >
+                {l}
+              </th>
+            ))}
+          </tr>
+        </thead>
+        <tbody>
+          {leagues.map((from) => (
+            <tr key={from}>
+              <td className="text-xs font-mono text-[#8888a0] px-2 py-1">
+                {from}
+              </td>
+              {leagues.map((to) => {
+                const flow = getFlow(from, to);
+                const fees = flow?.fees ?? 0;
+                const color = getColor(fees, max);
+                return (
+                  <td key={to} className="px-1 py-1">
+                    <div
+                      className="rounded text-center text-[11px] font-mono font-bold py-2 px-2"
+                      title={`${flow?.transfers ?? 0} transfers`}
+                      style={{
+                        backgroundColor: color + '22',
+                        color,
+                        border: `1px solid ${color}33`,
+                      }}
+                    >
+                      {fees > 0 ? formatEur(fees) : '-'}
+                    </div>
+                  </td>
+                );
+              })}
+            </tr>
+          ))}
+        </tbody>
+      </table>
+    </div>
+  );
+}
@@ -0,0 +1,78 @@
+import { formatEur } from '../../utils/formatters';
+
+interface Hub {
+  club: string;
+  league: string;
+  pagerank: number;
+  partners: number;
+  received: number;
+  paid: number;
+}
+
+interface Props {
+  data: Hub[];
+}
+
+export default function NetworkHubsTable({ data }: Props) {
+  return (
+    <div className="overflow-x-auto">
+      <table className="w-full">
+        <thead>
+          <tr className="border-b border-[#1e1e2e]">
+            <th className="text-left text-[10px] font-mono text-[#555568] uppercase tracking-wider px-3 py-2">
+              #
+            </th>
+            <th className="text-left text-[10px] font-mono text-[#555568] uppercase tracking-wider px-3 py-2">
+              Club
+            </th>
+            <th className="text-left text-[10px] font-mono text-[#555568] uppercase tracking-wider px-3 py-2">
+              League
+            </th>
+            <th className="text-right text-[10px] font-mono text-[#555568] uppercase tracking-wider px-3 py-2">
+              Partners
+            </th>
+            <th className="text-right text-[10px] font-mono text-[#555568] uppercase tracking-wider px-3 py-2">
+              Received
+            </th>
+            <th className="text-right text-[10px] font-mono text-[#555568] uppercase tracking-wider px-3 py-2">
+              Paid
+            </th>
+            <th className="text-right text-[10px] font-mono text-[#555568] uppercase tracking-wider px-3 py-2">
+              PageRank
+            </th>
+          </tr>
+        </thead>
+        <tbody>
+          {data.map((h, i) => (
+            <tr
+              key={h.club}
+              className="border-b border-[#1e1e2e]/50 hover:bg-[#1a1a24] transition-colors"
+            >
+              <td className="text-xs font-mono text-[#555568] px-3 py-2.5">
+                {i + 1}
+              </td>
+              <td className="text-xs font-mono text-[#e8e8f0] font-medium px-3 py-2.5">
+                {h.club}
+              </td>
+              <td className="text-xs font-mono text-[#8888a0] px-3 py-2.5">
+                {h.league}
+              </td>
+              <td className="text-xs font-mono text-[#8888a0] text-right px-3 py-2.5">
+                {h.partners}
+              </td>
+              <td className="text-xs font-mono text-[#4af6c3] text-right px-3 py-2.5">
+                {formatEur(h.received)}
+              </td>
+              <td className="text-xs font-mono text-[#ff433d] text-right px-3 py-2.5">
+                {formatEur(h.paid)}
+              </td>
+              <td className="text-xs font-mono text-[#fb8b1e] font-bold text-right px-3 py-2.5">
+                {(h.pagerank * 100).toFixed(2)}%
+              </td>
+            </tr>
+          ))}
+        </tbody>
+      </table>
+    </div>
+  );
+}
@@ -5,10 +5,12 @@ import KPICard from '../components/ui/KPICard';
 import SectionHeader from '../components/ui/SectionHeader';
 import LoadingSpinner from '../components/ui/LoadingSpinner';
 import { useData } from '../hooks/useData';
-import type { ClubData } from '../types/data';
+import type { ClubData, ClubHistory } from '../types/data';
 import { formatEur } from '../utils/formatters';
 import { colors, chartColors } from '../theme/colors';
 import {
+  AreaChart,
+  Area,
   PieChart,
   Pie,
   Cell,
@@ -23,6 +25,7 @@ import {
 } from 'recharts';
 
 const POSITION_COLORS = [chartColors[0], chartColors[1], chartColors[2], chartColors[3]];
+const POSITIONS = ['Attack', 'Midfield', 'Defender', 'Goalkeeper'];
 
 export default function ClubIntelligence() {
   const { data: clubs, loading } = useData<ClubData[]>('club_financials.json');
@@ -152,7 +155,67 @@ export default function ClubIntelligence() {
             </ResponsiveContainer>
           </div>
         </div>
+
+        {/* Squad value history: club_history.json, only fetched on this page */}
+        <SquadValueHistory club={club.name} />
       </div>
     </PageTransition>
   );
 }
+
+function SquadValueHistory({ club }: { club: string }) {
+  const { data: history, loading } = useData<ClubHistory>('club_history.json');
+
+  if (loading) return <LoadingSpinner />;
+  // Exports from before the history have no club_history.json
+  if (!history) return null;
+
+  return (
+    <div className="bg-[#111118] border border-[#1e1e2e] rounded-lg p-5">
+      <SectionHeader
+        title="Squad Value History"
+        subtitle="Squad as of the 1st of each month, rebuilt from valuations and transfers"
+      />
+      <ResponsiveContainer width="100%" height={300}>
+        <AreaChart data={history[club] ?? []} margin={{ top: 10, right: 10, left: 10, bottom: 0 }}>
+          <CartesianGrid strokeDasharray="3 3" stroke={colors.border.subtle} />
+          <XAxis
+            dataKey="date"
+            stroke={colors.text.tertiary}
+            tick={{ fontSize: 11, fontFamily: 'monospace' }}
+            minTickGap={40}
+          />
+          <YAxis
+            tickFormatter={(v) => formatEur(v)}
+            stroke={colors.text.tertiary}
+            tick={{ fontSize: 10, fontFamily: 'monospace' }}
+            width={70}
+          />
+          <Tooltip
+            contentStyle={{
+              backgroundColor: colors.bg.tertiary,
+              border: `1px solid ${colors.border.default}`,
+              borderRadius: 6,
+              fontFamily: 'monospace',
+              fontSize: 11,
+            }}
+            formatter={(value) => [formatEur(value as number), undefined]}
+          />
+          <Legend wrapperStyle={{ fontSize: 11, fontFamily: 'monospace' }} />
+          {POSITIONS.map((position, i) => (
+            <Area
+              key={position}
+              type="monotone"
+              dataKey={position}
+              stackId="squad"
+              stroke={POSITION_COLORS[i]}
+              fill={POSITION_COLORS[i]}
+              fillOpacity={0.25}
+              dot={false}
+            />
+          ))}
+        </AreaChart>
+      </ResponsiveContainer>
+    </div>
+  );
+}
@@ -1,9 +1,12 @@
+import { useState } from 'react';
 import Header from '../components/layout/Header';
 import KPICard from '../components/ui/KPICard';
 import SectionHeader from '../components/ui/SectionHeader';
 import LoadingSpinner from '../components/ui/LoadingSpinner';
 import PageTransition from '../components/ui/PageTransition';
 import TopTransfersTable from '../components/charts/TopTransfersTable';
+import LeagueFlowMatrix from '../components/charts/LeagueFlowMatrix';
+import NetworkHubsTable from '../components/charts/NetworkHubsTable';
 import { useData } from '../hooks/useData';
 import type { TransferAnalyticsData } from '../types/data';
 import { formatEur, formatNumber } from '../utils/formatters';
@@ -32,9 +35,16 @@ interface Transfer {
 export default function TransferAnalytics() {
   const { data: transfers, loading: loadingTransfers } = useData<Transfer[]>('top_transfers.json');
   const { data: analytics, loading: loadingAnalytics } = useData<TransferAnalyticsData>('transfer_analytics.json');
+  // -1: the last five seasons together
+  const [seasonIdx, setSeasonIdx] = useState(-1);
 
   if (loadingTransfers || loadingAnalytics) return <LoadingSpinner />;
 
+  const seasons = analytics?.seasons ?? [];
+  const season = seasonIdx >= 0 ? seasons[seasonIdx] : undefined;
+  const latest = seasons[seasons.length - 1];
+  const networkSeason = season ?? latest;
+
   const totalFees = transfers?.reduce((s, t) => s + t.fee, 0) ?? 0;
   const maxFee = transfers ? Math.max(...transfers.map((t) => t.fee)) : 0;
 
@@ -61,6 +71,25 @@ export default function TransferAnalytics() {
           />
         </div>
 
+        {/* Season Selector */}
+        {seasons.length > 0 && (
+          <div className="flex flex-wrap gap-2">
+            {[{ season: 'Last 5 Seasons' }, ...seasons].map((s, i) => (
+              <button
+                key={s.season}
+                onClick={() => setSeasonIdx(i - 1)}
+                className={`px-4 py-2 text-xs font-mono rounded border transition-colors ${
+                  i - 1 === seasonIdx
+                    ? 'bg-[#fb8b1e]/10 border-[#fb8b1e] text-[#fb8b1e]'
+                    : 'bg-[#111118] border-[#1e1e2e] text-[#8888a0] hover:border-[#2a2a3a] hover:text-[#e8e8f0]'
+                }`}
+              >
+                {s.season}
+              </button>
+            ))}
+          </div>
+        )}
+
         {/* ROI Distribution + Net Spend */}
         <div className="grid grid-cols-2 gap-6">
           <div className="bg-[#111118] border border-[#1e1e2e] rounded-lg p-5">
@@ -99,11 +128,11 @@ export default function TransferAnalytics() {
 
           <div className="bg-[#111118] border border-[#1e1e2e] rounded-lg p-5">
             <SectionHeader
-              title="Club Net Spend (5yr)"
+              title={`Club Net Spend (${season?.season ?? 'Last 5 Seasons'})`}
               subtitle="Positive = net seller, Negative = net spender"
             />
             <ResponsiveContainer width="100%" height={300}>
-              <BarChart data={analytics?.net_spend ?? []} layout="vertical">
+              <BarChart data={season?.net_spend ?? analytics?.net_spend ?? []} layout="vertical">
                 <CartesianGrid strokeDasharray="3 3" stroke={colors.border.subtle} />
                 <XAxis
                   type="number"
@@ -188,6 +217,27 @@ export default function TransferAnalytics() {
             {transfers && <TopTransfersTable data={transfers} />}
           </div>
         </div>
+
+        {/* Transfer Network */}
+        {networkSeason && (
+          <div className="grid grid-cols-2 gap-6">
+            <div className="bg-[#111118] border border-[#1e1e2e] rounded-lg p-5">
+              <SectionHeader
+                title={`League-to-League Flows (${networkSeason.season})`}
+                subtitle="Fees paid by buying leagues (columns) to selling leagues (rows)"
+              />
+              <LeagueFlowMatrix data={networkSeason.league_flows} />
+            </div>
+
+            <div className="bg-[#111118] border border-[#1e1e2e] rounded-lg p-5">
+              <SectionHeader
+                title={`Network Hubs (${networkSeason.season})`}
+                subtitle="PageRank of clubs in the transfer fee network"
+              />
+              <NetworkHubsTable data={networkSeason.hubs} />
+            </div>
+          </div>
+        )}
       </div>
     </PageTransition>
   );
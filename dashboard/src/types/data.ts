@@ -16,11 +16,35 @@ export interface ScatterPoint {
   name: string;
 }
 
+export interface LeagueFlow {
+  from: string;
+  to: string;
+  fees: number;
+  transfers: number;
+}
+
+export interface NetworkHub {
+  club: string;
+  league: string;
+  pagerank: number;
+  partners: number;
+  received: number;
+  paid: number;
+}
+
+export interface TransferSeason {
+  season: string;
+  net_spend: NetSpend[];
+  league_flows: LeagueFlow[];
+  hubs: NetworkHub[];
+}
+
 export interface TransferAnalyticsData {
   roi_distribution: RoiDistribution[];
   net_spend: NetSpend[];
   scatter: ScatterPoint[];
   total_analyzed: number;
+  seasons?: TransferSeason[];
 }
 
 export interface AgeGroup {
@@ -29,6 +53,18 @@ export interface AgeGroup {
   value: number;
 }
 
+export interface ClubHistoryPoint {
+  date: string;
+  squad_value: number;
+  player_count: number;
+  star_dependency: number;
+  over_30: number;
+  Attack: number;
+  Midfield: number;
+  Defender: number;
+  Goalkeeper: number;
+}
+
 export interface ClubData {
   name: string;
   league: string;
@@ -41,6 +77,9 @@ export interface ClubData {
   age_groups: AgeGroup[];
 }
 
+// club_history.json: monthly points per club, keyed by ClubData.name
+export type ClubHistory = Record<string, ClubHistoryPoint[]>;
+
 export interface TreemapItem {
   name: string;
   size: number;
@@ -5,6 +5,12 @@ Run from project root: python notebooks/build_notebooks.py
 import nbformat as nbf
 from pathlib import Path
 
+from utils.queries import (
+    SQL_CLUSTERS, SQL_MV_TREND, SQL_NET_SPEND, SQL_PEAK_AGE, SQL_REG,
+    SQL_MINUTES_VALUE, SQL_ROI, SQL_SHARPE, SQL_TRANSFERS, SQL_TS, SQL_VALS_DIST,
+    SQL_VALUE_PER_GOAL, SQL_YOY,
+)
+
 NB_DIR = Path(__file__).parent
 
 
@@ -28,6 +34,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import sqlite3
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 from pathlib import Path
@@ -45,70 +52,32 @@ LEAGUE_NAMES = {'GB1': 'Premier League', 'ES1': 'La Liga', 'IT1': 'Serie A',
                 'L1': 'Bundesliga', 'FR1': 'Ligue 1'}
 BIG5 = list(LEAGUE_NAMES.keys())
 
+sys.path.insert(0, str(Path('..').resolve()))
+from notebooks.utils.db_helpers import get_connection, reduce_query, run_query  # results cached until the data changes
+from notebooks.utils.reducers import GroupMedian, GroupSample, PolyFit  # chunk-wise, for large results
+
 DB_PATH = Path('..') / 'data' / 'processed' / 'football.db'
-conn = sqlite3.connect(DB_PATH)
+conn = get_connection('read')  # traced when FOOTBALL_TRACE is set
 print(f"Connected: {DB_PATH}")
 """
 
 # ── 02 EDA ────────────────────────────────────────────────────────────────────
-SQL_TRANSFERS = '''
-    SELECT transfer_fee, market_value_in_eur, player_name,
-           from_club_name, to_club_name, transfer_season
-    FROM transfers
-    WHERE transfer_fee > 1000000
-'''
-
-SQL_MV_TREND = '''
-    SELECT
-        CAST(strftime('%Y', date) AS INTEGER) as year,
-        player_club_domestic_competition_id as league_id,
-        COUNT(DISTINCT player_id) as player_count,
-        SUM(market_value_in_eur) / 1e9 as total_value_bn,
-        AVG(market_value_in_eur) / 1e6 as avg_value_m
-    FROM player_valuations
-    WHERE player_club_domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
-      AND market_value_in_eur > 0
-      AND date >= '2012-01-01'
-    GROUP BY year, league_id
-    ORDER BY year, league_id
-'''
-
-SQL_AGE_EDA = '''
-    SELECT
-        CAST((julianday(pv.date) - julianday(p.date_of_birth)) / 365.25 AS INTEGER) as age,
-        p.position,
-        pv.market_value_in_eur / 1e6 as value_m
-    FROM player_valuations pv
-    JOIN players p ON pv.player_id = p.player_id
-    WHERE p.position IN ('Attack', 'Midfield', 'Defender', 'Goalkeeper')
-      AND p.date_of_birth IS NOT NULL
-      AND pv.market_value_in_eur > 0
-      AND pv.date >= '2015-01-01'
-'''
-
-SQL_VALS_DIST = '''
-    SELECT market_value_in_eur / 1e6 as value_m
-    FROM player_valuations
-    WHERE market_value_in_eur > 0
-      AND date >= '2023-01-01'
-'''
-
 nb02_cells = [
     md("# 02 - Exploratory Data Analysis\n\nDeep-dive into the Transfermarkt dataset: distributions, trends, correlations, and key patterns."),
     code(SETUP),
     md("## 1. Dataset Overview"),
     code("""
-tables = pd.read_sql("SELECT name FROM sqlite_master WHERE type='table'", conn)['name'].tolist()
+tables = run_query("SELECT name FROM sqlite_master WHERE type='table'")['name'].tolist()
 print(f"{'TABLE':<30} {'ROWS':>12}")
 print('-' * 44)
 for t in sorted(tables):
-    n = pd.read_sql(f"SELECT COUNT(*) as n FROM [{t}]", conn)['n'].iloc[0]
+    n = run_query(f"SELECT COUNT(*) as n FROM [{t}]")['n'].iloc[0]
     print(f"{t:<30} {n:>12,}")
 """),
     md("## 2. Transfer Fee Distribution"),
     code(f"""
 SQL = '''{SQL_TRANSFERS}'''
-df_transfers = pd.read_sql(SQL, conn)
+df_transfers = run_query(SQL)
 
 fig, axes = plt.subplots(1, 2, figsize=(14, 5))
 axes[0].hist(df_transfers['transfer_fee'] / 1e6, bins=50, color=ORANGE, alpha=0.8, edgecolor='none')
@@ -131,7 +100,7 @@ print(f"Transfers >1M: {{len(df_transfers):,}} | Max: EUR {{df_transfers['transf
     md("## 3. Market Value Trends by League (Big 5)"),
     code(f"""
 SQL = '''{SQL_MV_TREND}'''
-df_mv = pd.read_sql(SQL, conn)
+df_mv = run_query(SQL)
 df_mv['league'] = df_mv['league_id'].map(LEAGUE_NAMES)
 
 fig, axes = plt.subplots(1, 2, figsize=(14, 5))
@@ -151,12 +120,21 @@ plt.show()
 """),
     md("## 4. Age-Value Depreciation Curves by Position"),
     code(f"""
-SQL = '''{SQL_AGE_EDA}'''
-df_ages = pd.read_sql(SQL, conn)
-df_ages = df_ages[(df_ages['age'] >= 16) & (df_ages['age'] <= 40)]
-age_curves = df_ages.groupby(['position', 'age'])['value_m'].median().reset_index()
+from notebooks.utils.db_helpers import columnar_chunks, read_columnar, reduce_chunks  # Parquet mirror, needs pyarrow
 
 pos_colors = {{'Attack': ORANGE, 'Midfield': CYAN, 'Defender': '#3b82f6', 'Goalkeeper': '#a855f7'}}
+# Columnar mirror: three columns of the 2015+ partitions instead of whole valuation rows,
+# streamed in chunks; only value counts per position and age are kept in memory
+players = read_columnar('players', ['player_id', 'position', 'date_of_birth'])
+players = players.loc[players['position'].isin(pos_colors) & players['date_of_birth'].notna(), ['player_id', 'position']]
+valuations = columnar_chunks('player_valuations', ['player_id', 'valuation_age', 'market_value_in_eur'],
+                             filters=[('valuation_year', '>=', 2015), ('market_value_in_eur', '>', 0),
+                                      ('valuation_age', '>=', 16), ('valuation_age', '<=', 40)])
+chunks = (c.merge(players, on='player_id')
+           .assign(value_m=lambda d: d['market_value_in_eur'] / 1e6)
+           .rename(columns={{'valuation_age': 'age'}}) for c in valuations)
+age_curves = reduce_chunks(chunks, {{'median': GroupMedian(['position', 'age'], 'value_m')}})['median']
+
 fig, ax = plt.subplots(figsize=(12, 6))
 for pos, color in pos_colors.items():
     data = age_curves[age_curves['position'] == pos]
@@ -173,7 +151,7 @@ plt.show()
     md("## 5. Value Distribution (Log Scale)"),
     code(f"""
 SQL = '''{SQL_VALS_DIST}'''
-df_vals = pd.read_sql(SQL, conn)
+df_vals = run_query(SQL)
 fig, ax = plt.subplots(figsize=(10, 5))
 ax.hist(df_vals['value_m'], bins=100, color=CYAN, alpha=0.8, edgecolor='none')
 ax.set_xscale('log')
@@ -189,141 +167,6 @@ pct = df_vals['value_m'].quantile([0.5, 0.75, 0.9, 0.95, 0.99])
 ]
 
 # ── 03 SQL ───────────────────────────────────────────────────────────────────
-SQL_YOY = '''
-    WITH yearly AS (
-        SELECT
-            CAST(strftime('%Y', date) AS INTEGER) as year,
-            player_club_domestic_competition_id as league_id,
-            SUM(market_value_in_eur) / 1e9 as total_value_bn
-        FROM player_valuations
-        WHERE player_club_domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
-          AND market_value_in_eur > 0
-          AND date >= '2012-01-01'
-        GROUP BY year, league_id
-    )
-    SELECT year, league_id,
-        ROUND(total_value_bn, 2) as total_value_bn,
-        ROUND(
-            (total_value_bn - LAG(total_value_bn) OVER (PARTITION BY league_id ORDER BY year))
-            * 100.0
-            / NULLIF(LAG(total_value_bn) OVER (PARTITION BY league_id ORDER BY year), 0),
-        1) as yoy_growth_pct
-    FROM yearly
-    ORDER BY league_id, year DESC
-    LIMIT 25
-'''
-
-SQL_ROI = '''
-    WITH transfer_roi AS (
-        SELECT
-            t.player_name, t.transfer_fee, t.transfer_date,
-            t.from_club_name, t.to_club_name,
-            (SELECT pv.market_value_in_eur
-             FROM player_valuations pv
-             WHERE pv.player_id = t.player_id
-               AND pv.date > t.transfer_date
-               AND pv.date <= DATE(t.transfer_date, '+365 days')
-             ORDER BY pv.date DESC LIMIT 1) AS mv_after_1yr
-        FROM transfers t
-        WHERE t.transfer_fee > 10000000
-    )
-    SELECT
-        player_name,
-        ROUND(transfer_fee / 1e6, 1) as fee_m,
-        ROUND(mv_after_1yr / 1e6, 1) as value_1yr_m,
-        ROUND((mv_after_1yr - transfer_fee) * 100.0 / transfer_fee, 1) as roi_pct,
-        CASE
-            WHEN mv_after_1yr > transfer_fee * 1.5 THEN 'Excellent (>50%)'
-            WHEN mv_after_1yr > transfer_fee THEN 'Positive'
-            WHEN mv_after_1yr > transfer_fee * 0.7 THEN 'Moderate Loss'
-            ELSE 'Significant Loss'
-        END as roi_category
-    FROM transfer_roi
-    WHERE mv_after_1yr IS NOT NULL
-    ORDER BY fee_m DESC LIMIT 20
-'''
-
-SQL_PEAK_AGE = '''
-    WITH age_values AS (
-        SELECT
-            p.position,
-            CAST((julianday(pv.date) - julianday(p.date_of_birth)) / 365.25 AS INTEGER) as age,
-            AVG(pv.market_value_in_eur) as avg_value
-        FROM player_valuations pv
-        JOIN players p ON pv.player_id = p.player_id
-        WHERE p.position IN ('Attack', 'Midfield', 'Defender', 'Goalkeeper')
-          AND p.date_of_birth IS NOT NULL
-          AND pv.market_value_in_eur > 0
-          AND pv.date >= '2015-01-01'
-        GROUP BY p.position, age
-        HAVING age BETWEEN 17 AND 38
-    ),
-    ranked AS (
-        SELECT position, age,
-            ROUND(avg_value / 1e6, 2) as avg_value_m,
-            ROUND(PERCENT_RANK() OVER (PARTITION BY position ORDER BY avg_value) * 100, 1) as value_pct_rank,
-            ROW_NUMBER() OVER (PARTITION BY position ORDER BY avg_value DESC) as value_rank
-        FROM age_values
-    )
-    SELECT position, age, avg_value_m, value_pct_rank
-    FROM ranked WHERE value_rank = 1
-    ORDER BY avg_value_m DESC
-'''
-
-SQL_SHARPE = '''
-    WITH monthly_values AS (
-        SELECT
-            player_club_domestic_competition_id as league_id,
-            strftime('%Y-%m', date) as month,
-            AVG(market_value_in_eur) as avg_value
-        FROM player_valuations
-        WHERE player_club_domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
-          AND market_value_in_eur > 0 AND date >= '2015-01-01'
-        GROUP BY league_id, month
-    ),
-    monthly_returns AS (
-        SELECT league_id, month,
-            (avg_value - LAG(avg_value) OVER (PARTITION BY league_id ORDER BY month))
-            * 100.0 / NULLIF(LAG(avg_value) OVER (PARTITION BY league_id ORDER BY month), 0)
-            as monthly_return_pct
-        FROM monthly_values
-    )
-    SELECT league_id,
-        ROUND(AVG(monthly_return_pct), 3) as avg_monthly_return,
-        ROUND(SQRT(
-            (SUM(monthly_return_pct * monthly_return_pct) / COUNT(*))
-            - (AVG(monthly_return_pct) * AVG(monthly_return_pct))
-        ), 3) as volatility,
-        ROUND(AVG(monthly_return_pct) / NULLIF(SQRT(
-            (SUM(monthly_return_pct * monthly_return_pct) / COUNT(*))
-            - (AVG(monthly_return_pct) * AVG(monthly_return_pct))
-        ), 0), 3) as sharpe_ratio
-    FROM monthly_returns
-    WHERE monthly_return_pct IS NOT NULL
-    GROUP BY league_id
-    ORDER BY sharpe_ratio DESC
-'''
-
-SQL_NET_SPEND = '''
-    WITH club_spend AS (
-        SELECT to_club_name as club, SUM(transfer_fee) as total_spent
-        FROM transfers WHERE transfer_fee > 0 AND transfer_date >= '2018-01-01'
-        GROUP BY to_club_name
-    ),
-    club_receipts AS (
-        SELECT from_club_name as club, SUM(transfer_fee) as total_received
-        FROM transfers WHERE transfer_fee > 0 AND transfer_date >= '2018-01-01'
-        GROUP BY from_club_name
-    )
-    SELECT COALESCE(s.club, r.club) as club,
-        ROUND(COALESCE(s.total_spent, 0) / 1e6, 1) as spent_m,
-        ROUND(COALESCE(r.total_received, 0) / 1e6, 1) as received_m,
-        ROUND((COALESCE(r.total_received, 0) - COALESCE(s.total_spent, 0)) / 1e6, 1) as net_spend_m
-    FROM club_spend s
-    FULL OUTER JOIN club_receipts r ON s.club = r.club
-    ORDER BY spent_m DESC LIMIT 20
-'''
-
 nb03_cells = [
     md("# 03 - SQL Analysis\n\nDemonstrates CTEs, window functions, correlated subqueries, and financial metrics in pure SQL."),
     code("""
@@ -332,12 +175,15 @@ import sqlite3
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path('..').resolve()))
+from notebooks.utils.db_helpers import get_connection, run_query  # results cached until the data changes
+
 DB_PATH = Path('..') / 'data' / 'processed' / 'football.db'
-conn = sqlite3.connect(DB_PATH)
+conn = get_connection('read')  # traced when FOOTBALL_TRACE is set
 print("Connected.")
 
 def show(title, sql, n=10):
-    df = pd.read_sql(sql, conn)
+    df = run_query(sql)
     print(f"\\n{'='*60}\\n  {title}\\n{'='*60}")
     display(df.head(n))
     return df
@@ -346,90 +192,57 @@ def show(title, sql, n=10):
     code(f"show('Year-over-Year Market Value Growth (LAG + Window)', '''{SQL_YOY}''')"),
     md("## 2. Transfer ROI -- Correlated Subquery + CASE"),
     code(f"show('Transfer ROI: Market Value Change 1yr After Transfer', '''{SQL_ROI}''')"),
+    md("## 2b. Multi-Horizon ROI for Every Transfer -- Vectorized As-Of Join\n\nThe correlated subquery above runs once per transfer. `utils/asof.py` computes the same lookup as binary searches in a per-player index of the valuations (`utils/timeseries.py`, cached on disk), for all transfers with a fee and several horizons at once."),
+    code("""
+sys.path.insert(0, str(Path('..').resolve()))
+from notebooks.utils.asof import transfer_roi
+
+roi = transfer_roi(conn, horizons=(6, 12, 24))
+print(f"Transfers with a fee: {len(roi):,}")
+display(roi[['roi_6m_pct', 'roi_12m_pct', 'roi_24m_pct']].describe().round(1))
+"""),
     md("## 3. Peak Age by Position -- PERCENT_RANK + ROW_NUMBER"),
     code(f"show('Peak Value Age by Position', '''{SQL_PEAK_AGE}''')"),
     md("## 4. Sharpe Ratio -- Financial SQL (Variance, Std Dev in pure SQL)"),
     code(f"show('Risk-Adjusted Returns (Sharpe Ratio) by League', '''{SQL_SHARPE}''')"),
     md("## 5. Club Net Spend -- FULL OUTER JOIN + Multi-CTE"),
     code(f"show('Club Net Transfer Spend (2018+)', '''{SQL_NET_SPEND}''')"),
+    md("## 5b. Transfer Network -- Sparse Flow Matrix by Club ID\n\n`utils/transfer_network.py` reduces every transfer once into (season, selling club, buying club) entries keyed by club ID, so clubs that share a name or were renamed stay apart. Net spend, league-to-league flows, top trading partners and a PageRank over the money flow are reductions over those entries, for any window of seasons."),
+    code("""
+from notebooks.utils.transfer_network import TransferNetwork
+
+network = TransferNetwork.from_connection(conn)
+recent = network.seasons[-5:]
+print(f"{len(network.clubs):,} clubs, {len(network.src):,} flows, seasons {network.seasons[0]}-{network.seasons[-1]}")
+display(network.net_spend(recent).head(10))
+display(network.league_flows(recent).head(10))
+display(network.top_partners(k=3, seasons=recent).head(9))
+display(network.centrality(recent).head(10))
+"""),
+    md("## 6. Performance vs. Value -- Season Cube\n\nGoals and minutes come from `cube_player_season` (player x season x competition x club, kept up to date at ingest by `utils/materialized.py`), so these queries read a few thousand season rows instead of every appearance. Each season is valued with the player's last valuation before 1 July."),
+    code(f"show('Value per Goal by League and Season', '''{SQL_VALUE_PER_GOAL}''', n=15)"),
+    code(f"show('Value Change by Minutes Played (Big 5, per Season)', '''{SQL_MINUTES_VALUE}''')"),
     code("conn.close()\nprint('SQL analysis complete.')"),
 ]
 
 # ── 04 Statistical Models ──────────────────────────────────────────────────
-SQL_REG = '''
-    SELECT
-        p.position,
-        CAST((julianday(pv.date) - julianday(p.date_of_birth)) / 365.25 AS INTEGER) as age,
-        LOG(pv.market_value_in_eur) as log_value
-    FROM player_valuations pv
-    JOIN players p ON pv.player_id = p.player_id
-    WHERE p.position IN ('Attack', 'Midfield', 'Defender', 'Goalkeeper')
-      AND p.date_of_birth IS NOT NULL
-      AND pv.market_value_in_eur > 100000
-      AND pv.date >= '2015-01-01'
-'''
-
-SQL_CLUSTERS = '''
-    WITH club_mv AS (
-        SELECT
-            pv.current_club_name as club,
-            pv.player_club_domestic_competition_id as league,
-            SUM(pv.market_value_in_eur) / 1e6 as squad_value_m,
-            COUNT(DISTINCT pv.player_id) as squad_size
-        FROM player_valuations pv
-        WHERE pv.player_club_domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
-          AND pv.market_value_in_eur > 0
-          AND substr(pv.date, 1, 7) = '2023-06'
-        GROUP BY pv.current_club_name, pv.player_club_domestic_competition_id
-        HAVING squad_size >= 10
-    ),
-    club_transfers AS (
-        SELECT to_club_name as club, COUNT(DISTINCT player_id) as transfer_activity
-        FROM transfers WHERE transfer_date >= '2020-01-01' GROUP BY to_club_name
-    ),
-    club_age AS (
-        SELECT pv.current_club_name as club,
-            AVG(CAST((julianday(pv.date) - julianday(p.date_of_birth)) / 365.25 AS INTEGER)) as avg_age
-        FROM player_valuations pv
-        JOIN players p ON pv.player_id = p.player_id
-        WHERE pv.player_club_domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
-          AND p.date_of_birth IS NOT NULL
-          AND substr(pv.date, 1, 7) = '2023-06'
-        GROUP BY pv.current_club_name
-    )
-    SELECT m.club, m.league, m.squad_value_m, m.squad_size,
-        COALESCE(a.avg_age, 26.0) as average_age,
-        COALESCE(t.transfer_activity, 0) as transfer_activity
-    FROM club_mv m
-    LEFT JOIN club_transfers t ON m.club = t.club
-    LEFT JOIN club_age a ON m.club = a.club
-    WHERE m.squad_value_m > 0
-    ORDER BY m.squad_value_m DESC
-'''
-
-SQL_TS = '''
-    SELECT date, player_club_domestic_competition_id as league_id,
-        AVG(market_value_in_eur) / 1e6 as avg_value_m
-    FROM player_valuations
-    WHERE player_club_domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
-      AND market_value_in_eur > 0 AND date >= '2015-01-01'
-    GROUP BY date, league_id
-    ORDER BY date, league_id
-'''
-
 nb04_cells = [
     md("# 04 - Statistical Models\n\nRegression, clustering, and time series analysis on football transfer market data."),
     code(SETUP + """
-from sklearn.linear_model import LinearRegression
 from sklearn.cluster import KMeans
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.model_selection import cross_val_predict
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import r2_score
+from notebooks.utils.features import load_features  # feature store, see section 4
 """),
     md("## 1. Age-Value Regression (Quadratic Fit by Position)"),
     code(f"""
 SQL = '''{SQL_REG}'''
-df = pd.read_sql(SQL, conn)
-df = df[(df['age'] >= 17) & (df['age'] <= 38)].dropna()
+# Streamed in chunks: the fit needs only power sums of age and log value per
+# position (normal equations), the scatter a 3,000-row sample per position
+res = reduce_query(SQL, {{'fit': PolyFit('position', 'age', 'log_value', degree=2),
+                          'sample': GroupSample('position', 3000)}})
+fits, sample = res['fit'].set_index('position'), res['sample']
 
 fig, axes = plt.subplots(2, 2, figsize=(13, 10))
 axes = axes.flatten()
@@ -439,16 +252,12 @@ print(f"{{'Position':<15}} {{'R\u00b2':>8}} {{'Peak Age':>10}}")
 print('-' * 35)
 
 for i, (pos, color) in enumerate(pos_colors.items()):
-    sub = df[df['position'] == pos]
     ages = np.arange(17, 39)
-    X = np.column_stack([sub['age'], sub['age']**2])
-    model = LinearRegression().fit(X, sub['log_value'])
-    r2 = r2_score(sub['log_value'], model.predict(X))
-    X_pred = np.column_stack([ages, ages**2])
-    y_pred = model.predict(X_pred)
+    r2 = fits.loc[pos, 'r2']
+    y_pred = PolyFit.predict(fits.loc[pos, 'coef'], ages)
     peak_age = ages[np.argmax(y_pred)]
     print(f"{{pos:<15}} {{r2:>8.3f}} {{peak_age:>10}}")
-    sub_sample = sub.sample(min(3000, len(sub)), random_state=42)
+    sub_sample = sample[sample['position'] == pos]
     axes[i].scatter(sub_sample['age'], sub_sample['log_value'], alpha=0.05, color=color, s=2)
     axes[i].plot(ages, y_pred, color='white', linewidth=2.5, label=f'R\u00b2={{r2:.3f}}')
     axes[i].axvline(x=peak_age, color=ORANGE, linestyle='--', alpha=0.6, label=f'Peak: {{peak_age}}')
@@ -463,7 +272,7 @@ plt.show()
     md("## 2. Club Tier Segmentation -- K-Means (K=4)"),
     code(f"""
 SQL = '''{SQL_CLUSTERS}'''
-df_clubs = pd.read_sql(SQL, conn).dropna()
+df_clubs = run_query(SQL).dropna()
 features = ['squad_value_m', 'average_age', 'squad_size', 'transfer_activity']
 X_scaled = StandardScaler().fit_transform(df_clubs[features].fillna(0))
 df_clubs['cluster'] = KMeans(n_clusters=4, random_state=42, n_init=10).fit_predict(X_scaled)
@@ -492,7 +301,7 @@ plt.show()
     md("## 3. Rolling Volatility Time Series"),
     code(f"""
 SQL = '''{SQL_TS}'''
-df_ts = pd.read_sql(SQL, conn)
+df_ts = run_query(SQL)
 df_ts['date'] = pd.to_datetime(df_ts['date'])
 pivot = df_ts.pivot(index='date', columns='league_id', values='avg_value_m').resample('Q').mean()
 vol = pivot.pct_change().rolling(4).std() * 100
@@ -508,281 +317,108 @@ axes[1].set_title('Rolling 4Q Volatility (%) -- Key Risk Metric'); axes[1].legen
 plt.tight_layout()
 plt.savefig('../data/processed/fig_volatility_ts.png', dpi=120, bbox_inches='tight', facecolor='#0a0a0f')
 plt.show()
+"""),
+    md("## 4. Market Value Model -- Feature Store"),
+    code("""
+# Feature matrix of sql/06_predictive_features.sql as of today, read from the
+# feature store's Parquet file: career totals are kept per player at ingest and
+# refreshed only for players with new data; age, contract and momentum are dated
+df_feat = load_features()
+X_cols = ['age', 'height_in_cm', 'career_goals', 'career_assists', 'career_minutes',
+          'career_appearances', 'goals_per_90', 'goal_contributions_per_90',
+          'contract_days_remaining', 'league_tier', 'competitions_played', 'career_transfers']
+X = df_feat[X_cols].astype(float)   # missing values stay NaN, handled by the model
+y = np.log10(df_feat['current_value'])
+y_pred = cross_val_predict(HistGradientBoostingRegressor(random_state=42), X, y, cv=5)
+r2 = 1 - ((y - y_pred) ** 2).sum() / ((y - y.mean()) ** 2).sum()
+print(f"{len(df_feat):,} players, {len(X_cols)} features -- 5-fold CV R\u00b2 (log value): {r2:.3f}")
+
+fig, ax = plt.subplots(figsize=(8, 7))
+ax.scatter(y, y_pred, s=2, alpha=0.15, color=CYAN)
+lims = [y.min(), y.max()]
+ax.plot(lims, lims, color=ORANGE, linestyle='--', linewidth=1.5)
+ax.set_xlabel('Actual log10(value)'); ax.set_ylabel('Predicted log10(value)')
+ax.set_title('Market Value Model -- Out-of-Fold Predictions'); ax.grid(True)
+plt.tight_layout()
+plt.savefig('../data/processed/fig_value_model.png', dpi=120, bbox_inches='tight', facecolor='#0a0a0f')
+plt.show()
 """),
     code("conn.close()\nprint('Models complete.')"),
 ]
 
 # ── 05 Export ─────────────────────────────────────────────────────────────────
-SQL_MKT_OVR = '''
-    WITH yearly AS (
-        SELECT
-            CAST(strftime('%Y', date) AS INTEGER) as year,
-            player_club_domestic_competition_id as league_id,
-            SUM(market_value_in_eur) as total_market_value,
-            COUNT(DISTINCT player_id) as player_count,
-            AVG(market_value_in_eur) as avg_player_value
-        FROM player_valuations
-        WHERE player_club_domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
-          AND market_value_in_eur > 0
-          AND strftime('%m', date) = '01'
-        GROUP BY year, league_id
-    )
-    SELECT year, league_id, total_market_value, player_count, avg_player_value,
-        ROUND(
-            (total_market_value - LAG(total_market_value) OVER (PARTITION BY league_id ORDER BY year))
-            * 100.0
-            / NULLIF(LAG(total_market_value) OVER (PARTITION BY league_id ORDER BY year), 0),
-        1) as yoy_growth_pct
-    FROM yearly
-    WHERE year BETWEEN 2012 AND 2025
-    ORDER BY year, league_id
-'''
-
-SQL_LGC = '''
-    WITH latest_year AS (
-        SELECT MAX(CAST(strftime('%Y', date) AS INTEGER)) - 1 as yr
-        FROM player_valuations
-        WHERE player_club_domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
-    ),
-    league_totals AS (
-        SELECT pv.player_club_domestic_competition_id as league_id,
-            SUM(pv.market_value_in_eur) as total_value,
-            AVG(pv.market_value_in_eur) as avg_value,
-            COUNT(DISTINCT pv.player_id) as player_count
-        FROM player_valuations pv, latest_year ly
-        WHERE pv.player_club_domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
-          AND pv.market_value_in_eur > 0
-          AND CAST(strftime('%Y', pv.date) AS INTEGER) = ly.yr
-        GROUP BY pv.player_club_domestic_competition_id
-    ),
-    club_vals AS (
-        SELECT c.domestic_competition_id as league_id, c.name as club_name,
-            c.total_market_value,
-            ROW_NUMBER() OVER (PARTITION BY c.domestic_competition_id ORDER BY c.total_market_value DESC) as rn
-        FROM clubs c
-        WHERE c.domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
-          AND c.total_market_value > 0
-    )
-    SELECT lt.league_id, lt.total_value, lt.avg_value, lt.player_count,
-        cv.club_name as top_club, cv.total_market_value as top_club_value
-    FROM league_totals lt
-    LEFT JOIN club_vals cv ON lt.league_id = cv.league_id AND cv.rn = 1
-    ORDER BY lt.total_value DESC
-'''
-
-SQL_TOPTRANS = '''
-    SELECT player_name, from_club_name as from_club, to_club_name as to_club,
-        ROUND(transfer_fee) as fee, transfer_season as season, transfer_date
-    FROM transfers
-    WHERE transfer_fee > 0
-    ORDER BY transfer_fee DESC LIMIT 15
-'''
-
-SQL_AGECURVES = '''
-    SELECT
-        CAST((julianday(pv.date) - julianday(p.date_of_birth)) / 365.25 AS INTEGER) as age,
-        p.position, pv.market_value_in_eur / 1e6 as value_m
-    FROM player_valuations pv
-    JOIN players p ON pv.player_id = p.player_id
-    WHERE p.position IN ('Attack', 'Midfield', 'Defender', 'Goalkeeper')
-      AND p.date_of_birth IS NOT NULL
-      AND pv.market_value_in_eur > 0
-      AND pv.date >= '2015-01-01'
-'''
-
-SQL_VOL_HEAT = '''
-    WITH monthly AS (
-        SELECT player_club_domestic_competition_id as league_id,
-            strftime('%Y', date) as season, strftime('%m', date) as month,
-            AVG(market_value_in_eur) as avg_val
-        FROM player_valuations
-        WHERE player_club_domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
-          AND market_value_in_eur > 0 AND date >= '2015-01-01'
-        GROUP BY league_id, season, month
-    ),
-    returns AS (
-        SELECT league_id, season,
-            (avg_val - LAG(avg_val) OVER (PARTITION BY league_id ORDER BY season, month))
-            * 100.0 / NULLIF(LAG(avg_val) OVER (PARTITION BY league_id ORDER BY season, month), 0)
-            as monthly_ret
-        FROM monthly
-    )
-    SELECT league_id, season,
-        ROUND(SQRT(
-            (SUM(monthly_ret*monthly_ret)/COUNT(*)) - (AVG(monthly_ret)*AVG(monthly_ret))
-        ), 2) as volatility
-    FROM returns
-    WHERE monthly_ret IS NOT NULL
-    GROUP BY league_id, season HAVING COUNT(*) >= 6
-    ORDER BY season, league_id
-'''
-
-SQL_DRAWDOWN = '''
-    WITH player_peak AS (
-        SELECT pv.player_id, p.position, pv.market_value_in_eur,
-            MAX(pv.market_value_in_eur) OVER (
-                PARTITION BY pv.player_id ORDER BY pv.date
-                ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
-            ) as running_max
-        FROM player_valuations pv
-        JOIN players p ON pv.player_id = p.player_id
-        WHERE p.position IN ('Attack', 'Midfield', 'Defender', 'Goalkeeper')
-          AND pv.market_value_in_eur > 0
-    ),
-    drawdown AS (
-        SELECT player_id, position,
-            ROUND((market_value_in_eur - running_max) * 100.0 / running_max, 2) as drawdown_pct
-        FROM player_peak WHERE running_max > 0
-    ),
-    player_max_dd AS (
-        SELECT player_id, position, MIN(drawdown_pct) as max_drawdown
-        FROM drawdown GROUP BY player_id, position
-    )
-    SELECT position,
-        ROUND(AVG(max_drawdown), 1) as avg_max_drawdown,
-        ROUND(MIN(max_drawdown), 1) as worst_drawdown,
-        COUNT(*) as player_count
-    FROM player_max_dd GROUP BY position ORDER BY avg_max_drawdown
-'''
-
-SQL_DEPR = '''
-    WITH age_brackets AS (
-        SELECT p.position,
-            CASE
-                WHEN CAST((julianday(pv.date) - julianday(p.date_of_birth)) / 365.25 AS INT) < 21 THEN 'U21'
-                WHEN CAST((julianday(pv.date) - julianday(p.date_of_birth)) / 365.25 AS INT) < 25 THEN '21-24'
-                WHEN CAST((julianday(pv.date) - julianday(p.date_of_birth)) / 365.25 AS INT) < 28 THEN '25-27'
-                WHEN CAST((julianday(pv.date) - julianday(p.date_of_birth)) / 365.25 AS INT) < 31 THEN '28-30'
-                ELSE '31+'
-            END as age_bracket,
-            (pv.market_value_in_eur - LAG(pv.market_value_in_eur) OVER (PARTITION BY pv.player_id ORDER BY pv.date))
-            * 100.0 / NULLIF(LAG(pv.market_value_in_eur) OVER (PARTITION BY pv.player_id ORDER BY pv.date), 0)
-            as change_pct
-        FROM player_valuations pv
-        JOIN players p ON pv.player_id = p.player_id
-        WHERE p.position IN ('Attack', 'Midfield', 'Defender', 'Goalkeeper')
-          AND p.date_of_birth IS NOT NULL AND pv.market_value_in_eur > 0
-    )
-    SELECT position, age_bracket,
-        ROUND(AVG(change_pct), 2) as avg_change_pct,
-        ROUND(AVG(CASE WHEN change_pct < 0 THEN change_pct ELSE NULL END), 2) as depreciation_rate
-    FROM age_brackets
-    WHERE change_pct IS NOT NULL AND ABS(change_pct) < 200
-    GROUP BY position, age_bracket ORDER BY position, age_bracket
-'''
-
-SQL_SHARPE2 = '''
-    WITH monthly_vals AS (
-        SELECT player_club_domestic_competition_id as league_id,
-            strftime('%Y-%m', date) as month, AVG(market_value_in_eur) as avg_val
-        FROM player_valuations
-        WHERE player_club_domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
-          AND market_value_in_eur > 0 AND date >= '2015-01-01'
-        GROUP BY league_id, month
-    ),
-    monthly_rets AS (
-        SELECT league_id, month,
-            (avg_val - LAG(avg_val) OVER (PARTITION BY league_id ORDER BY month))
-            * 100.0 / NULLIF(LAG(avg_val) OVER (PARTITION BY league_id ORDER BY month), 0)
-            as ret
-        FROM monthly_vals
-    )
-    SELECT league_id,
-        ROUND(AVG(ret) * 12, 2) as avg_return,
-        ROUND(SQRT((SUM(ret*ret)/COUNT(*)) - (AVG(ret)*AVG(ret))) * SQRT(12), 2) as volatility,
-        ROUND(AVG(ret) / NULLIF(SQRT((SUM(ret*ret)/COUNT(*)) - (AVG(ret)*AVG(ret))), 0), 3) as sharpe_ratio
-    FROM monthly_rets
-    WHERE ret IS NOT NULL GROUP BY league_id ORDER BY sharpe_ratio DESC
-'''
-
+# SQL lives in utils/queries.py, the export graph in utils/dashboard_export.py
 nb05_cells = [
     md("# 05 - Export Dashboard Data\n\nGenerates pre-processed JSON files for the React dashboard. Replaces mock data with real Transfermarkt results."),
     code("""
 import pandas as pd
-import numpy as np
-import sqlite3
 import json
+import sys
 from pathlib import Path
 
-DB_PATH = Path('..') / 'data' / 'processed' / 'football.db'
-OUT_DIR = Path('..') / 'dashboard' / 'public' / 'data'
+sys.path.insert(0, str(Path('..').resolve()))
+from notebooks.utils.dashboard_export import export_dashboard
 
-conn = sqlite3.connect(DB_PATH)
-LEAGUE_NAMES = {'GB1': 'Premier League', 'ES1': 'La Liga', 'IT1': 'Serie A', 'L1': 'Bundesliga', 'FR1': 'Ligue 1'}
+OUT_DIR = Path('..') / 'dashboard' / 'public' / 'data'
 
-def save(name, data):
-    path = OUT_DIR / name
-    with open(path, 'w') as f:
-        json.dump(data, f, indent=2, default=str)
-    n = len(data) if isinstance(data, list) else sum(len(v) if isinstance(v, list) else 1 for v in data.values())
-    print(f"  {name} -> {path.stat().st_size/1024:.1f} KB ({n} records)")
+def load(name):
+    with open(OUT_DIR / name) as f:
+        return json.load(f)
 
 print(f"Output: {OUT_DIR}")
+"""),
+    md("## Export\n\nAll files are built by one task graph (`utils/dashboard_export.py`): queries -> transform -> JSON file. Independent queries run concurrently on pooled read connections, and files whose SQL, transform code and source tables are unchanged since the last run are skipped. Pass `force=True` to rewrite everything."),
+    code("""
+status = export_dashboard(OUT_DIR)
 """),
     md("## 1. market_overview.json"),
-    code(f"""
-df = pd.read_sql('''{SQL_MKT_OVR}''', conn)
-df['league_name'] = df['league_id'].map(LEAGUE_NAMES)
-df['total_market_value'] = df['total_market_value'].round(0)
-df['avg_player_value'] = df['avg_player_value'].round(0)
-df['yoy_growth_pct'] = df['yoy_growth_pct'].where(df['yoy_growth_pct'].notna(), other=None)
-save('market_overview.json', df.to_dict('records'))
+    code("""
+df = pd.DataFrame(load('market_overview.json'))
 display(df[df['league_id']=='GB1'][['year','total_market_value','player_count','yoy_growth_pct']].tail(5))
 """),
     md("## 2. league_comparison.json"),
-    code(f"""
-df = pd.read_sql('''{SQL_LGC}''', conn)
-df['league'] = df['league_id'].map(LEAGUE_NAMES)
-df[['total_value','avg_value','top_club_value']] = df[['total_value','avg_value','top_club_value']].round(0)
-save('league_comparison.json', df.to_dict('records'))
+    code("""
+df = pd.DataFrame(load('league_comparison.json'))
 display(df[['league','player_count','top_club']].round(0))
 """),
     md("## 3. top_transfers.json"),
-    code(f"""
-df = pd.read_sql('''{SQL_TOPTRANS}''', conn)
-save('top_transfers.json', df.to_dict('records'))
+    code("""
+df = pd.DataFrame(load('top_transfers.json'))
 display(df[['player_name','from_club','to_club','fee']].head(10))
 """),
     md("## 4. age_curves.json"),
-    code(f"""
-df = pd.read_sql('''{SQL_AGECURVES}''', conn)
-df = df[(df['age'] >= 17) & (df['age'] <= 38)]
-pivot = df.groupby(['age','position'])['value_m'].median().unstack('position').reset_index()
-for col in ['Attack','Midfield','Defender','Goalkeeper']:
-    if col in pivot.columns:
-        pivot[col] = pivot[col].round(3)
-save('age_curves.json', pivot.to_dict('records'))
-display(pivot.head(5))
+    code("""
+display(pd.DataFrame(load('age_curves.json')).head(5))
 """),
     md("## 5. risk_metrics.json"),
-    code(f"""
-df_vol = pd.read_sql('''{SQL_VOL_HEAT}''', conn)
-df_vol['league'] = df_vol['league_id'].map(LEAGUE_NAMES)
-df_vol = df_vol[['league','season','volatility']].dropna()
-
-df_dd = pd.read_sql('''{SQL_DRAWDOWN}''', conn)
-
-df_dep = pd.read_sql('''{SQL_DEPR}''', conn)
-
-df_sharpe = pd.read_sql('''{SQL_SHARPE2}''', conn)
-df_sharpe['league'] = df_sharpe['league_id'].map(LEAGUE_NAMES)
-
-risk = {{
-    'volatility_heatmap': df_vol.to_dict('records'),
-    'drawdown_by_position': df_dd.to_dict('records'),
-    'depreciation_rates': df_dep.to_dict('records'),
-    'sharpe_ratios': df_sharpe[['league','sharpe_ratio','avg_return','volatility']].to_dict('records'),
-}}
-save('risk_metrics.json', risk)
-print("\\nDrawdown:")
-display(df_dd)
+    code("""
+risk = load('risk_metrics.json')
+print("Drawdown:")
+display(pd.DataFrame(risk['drawdown_by_position']))
 print("\\nSharpe:")
-display(df_sharpe[['league','sharpe_ratio','avg_return','volatility']])
+display(pd.DataFrame(risk['sharpe_ratios']))
+"""),
+    md("## 6. transfer_analytics.json\n\nROI distribution, club net spend, and fee-vs-value-change scatter. Uses the vectorized as-of join in `utils/asof.py` to find the market value at and ~1 year after each transfer. Per season, the club-ID transfer network (`utils/transfer_network.py`) adds net spend, league-to-league flows and the network hubs by PageRank."),
+    code("""
+analytics = load('transfer_analytics.json')
+print(f"Transfers with fee >5M and 1yr valuation: {analytics['total_analyzed']}")
+display(pd.DataFrame(analytics['roi_distribution']))
+print(f"\\nNet spend entries: {len(analytics['net_spend'])}, Scatter points: {len(analytics['scatter'])}")
+"""),
+    md("## 7. club_financials.json\n\nTop 20 clubs by squad value (Big 5 leagues). Reuses the SQL from `sql/07_club_financials.sql` and adds age group breakdowns. Each club's monthly squad portfolio history goes to `club_history.json`: squads rebuilt as of every month from the valuation and transfer history, all months in one sweep (`utils/portfolio.py`)."),
+    code("""
+clubs_out = load('club_financials.json')
+print("Top 5 clubs:")
+for c in clubs_out[:5]:
+    print(f"  {c['name']:<20} {c['league']:<18} {c['squad_value']/1e9:.2f}B  ROI={c['roi']}%")
+history = load('club_history.json')[clubs_out[0]['name']]
+print(f"\\nMonthly history: {len(history)} months per club ({history[0]['date']} to {history[-1]['date']})")
 """),
+    md("## 8. player_positions.json\n\nPosition treemap (total market value by sub_position) and value distribution histogram."),
     code("""
-conn.close()
-print()
-print('All 5 JSON files exported. Dashboard now uses real Transfermarkt data.')
+positions = load('player_positions.json')
+display(pd.DataFrame(positions['treemap']).head(5))
+print(f"\\nHistogram bins: {len(positions['value_distribution'])}, Total players: {positions['total_players']}")
 """),
 ]
 
@@ -0,0 +1,418 @@
+"""Pluggable query engines behind ``db_helpers.run_query`` and ``get_connection``.
+
+SQLite stays the default and the only engine that writes. For read-only
+scan-and-aggregate queries, the ``duckdb`` backend runs the same SQL on
+DuckDB, an in-process vectorized engine, over the columnar Parquet mirror of
+``utils/columnar.py`` (synced first if a table changed). Pick the engine per
+call (``run_query(sql, backend="duckdb")``) or per process
+(``FOOTBALL_BACKEND=duckdb``):
+
+- ``sqlite``: ``football.db`` through the connection pools
+- ``duckdb``: DuckDB views over ``football.columnar/``
+- ``auto``: DuckDB for queries the last parity check found equal and at
+  least ``SPEEDUP_MIN`` times faster, SQLite for everything else
+
+The queries are written for SQLite; :func:`translate` rewrites its dialect
+for DuckDB:
+
+=================================  ==========================================
+``julianday(x)``                   ``epoch(x) / 86400 + 2440587.5``
+``DATE(x, '+365 days')``           timestamp arithmetic, formatted as text
+``DATETIME`` / ``strftime(f, x)``  ``strftime(x, f)``, modifiers as above
+``'now'``                          ``current_timestamp`` (UTC, like SQLite)
+``CAST(x AS INTEGER)``             truncates like SQLite (DuckDB rounds)
+``QUANTILE(x, q)``                 ``quantile_cont`` (interpolated)
+``1.5`` (decimal literal)          ``DOUBLE``, SQLite's REAL (not DECIMAL)
+``NOT INDEXED``, ``INDEXED BY i``  dropped (DuckDB has no index hints)
+=================================  ==========================================
+
+and every DuckDB connection divides integers like SQLite, sorts NULLs first
+in ascending order and has a ``LOG_RETURN`` macro; DuckDB has the other
+``utils/sqlfuncs.py`` aggregates built in.
+
+The parity check runs every ``sql/`` statement and ``SQL_*`` query on both
+engines, compares the results and times them; the report in
+``data/processed/backends/parity.json`` drives ``auto``. Needs ``duckdb``
+(and ``pyarrow`` for the mirror).
+
+Usage:
+    python -m notebooks.utils.backends                  # parity check on football.db
+    python -m notebooks.utils.backends --only sql/05,SHARPE --repeat 5
+    FOOTBALL_BACKEND=auto jupyter lab                   # switch where it pays off
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from . import db_helpers
+from .query_cache import normalize_sql
+
+BACKENDS = ("sqlite", "duckdb", "auto")
+PARITY_FILE = db_helpers.DATA_PROCESSED / "backends" / "parity.json"
+# DuckDB must beat SQLite by this factor before ``auto`` switches a query
+SPEEDUP_MIN = 1.5
+DEFAULT_REPEAT = 3
+# Relative tolerance when comparing floats across engines
+RTOL = 1e-6
+
+# Session settings that make DuckDB evaluate like SQLite
+DUCKDB_SETTINGS = [
+    "SET GLOBAL integer_division = true",
+    "SET GLOBAL default_null_order = 'nulls_first_on_asc_last_on_desc'",
+    "SET GLOBAL TimeZone = 'UTC'",
+]
+DUCKDB_MACROS = [
+    "CREATE OR REPLACE MACRO log_return(cur, prev) AS "
+    "CASE WHEN cur > 0 AND prev > 0 THEN ln(CAST(cur AS DOUBLE) / prev) END",
+]
+
+
+# ── Dialect shim ──────────────────────────────────────────────────────────────
+
+_TOKEN = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/|[A-Za-z_][A-Za-z0-9_]*"""
+                    r"""|\d+\.\d*(?:[eE][+-]?\d+)?|\.?\d+(?:[eE][+-]?\d+)?|\s+|.""", re.S)
+_MODIFIER = re.compile(r"^([+-]?\d+(?:\.\d+)?) (day|hour|minute|second|month|year)s?$", re.I)
+_DECIMAL = re.compile(r"^\d*\.\d*$")
+
+
+def _calls(tokens: list[str], i: int):
+    """Arguments (token lists, split at top-level commas) of the call whose
+    ``(`` is at ``tokens[i]``, and the index after its ``)``."""
+    args, current, depth = [], [], 0
+    for j in range(i + 1, len(tokens)):
+        tok = tokens[j]
+        if tok == "(":
+            depth += 1
+        elif tok == ")":
+            if depth == 0:
+                args.append(current)
+                return args, j + 1
+            depth -= 1
+        elif tok == "," and depth == 0:
+            args.append(current)
+            current = []
+            continue
+        current.append(tok)
+    raise ValueError("unbalanced parentheses in SQL")
+
+
+def _literal(arg: str) -> str | None:
+    """The value of a string literal argument, else None."""
+    arg = arg.strip()
+    if len(arg) >= 2 and arg[0] == arg[-1] == "'":
+        return arg[1:-1].replace("''", "'")
+    return None
+
+
+def _timestamp(arg: str, modifiers=()) -> str:
+    """DuckDB timestamp expression for a SQLite time value and modifiers."""
+    expr = "CAST(current_timestamp AS TIMESTAMP)" if (_literal(arg) or "").lower() == "now" \
+        else f"TRY_CAST({arg.strip()} AS TIMESTAMP)"
+    for mod in modifiers:
+        m = _MODIFIER.match(_literal(mod) or "")
+        if not m:
+            raise ValueError(f"date modifier {mod.strip()} is not supported on DuckDB")
+        amount, unit = m.groups()
+        expr = f"({expr} + INTERVAL ({amount}) {unit.upper()})"
+    return expr
+
+
+def _rewrite(name: str, args: list[str]) -> str | None:
+    """DuckDB text for a call to ``name``, or None to keep it as is."""
+    name = name.lower()
+    if name == "julianday" and len(args) >= 1:
+        return f"(epoch({_timestamp(args[0], args[1:])}) / 86400 + 2440587.5)"
+    if name == "date" and len(args) >= 1:
+        return f"strftime({_timestamp(args[0], args[1:])}, '%Y-%m-%d')"
+    if name == "datetime" and len(args) >= 1:
+        return f"strftime({_timestamp(args[0], args[1:])}, '%Y-%m-%d %H:%M:%S')"
+    if name == "strftime" and len(args) >= 2:
+        return f"strftime({_timestamp(args[1], args[2:])}, {args[0].strip()})"
+    if name == "quantile" and len(args) == 2:
+        return f"quantile_cont({args[0].strip()}, {args[1].strip()})"
+    if name == "cast" and len(args) == 1:
+        m = re.match(r"^(.*)\s+AS\s+INT(?:EGER)?\s*$", args[0], re.I | re.S)
+        if m:
+            return f"CAST(TRUNC({m.group(1).strip()}) AS BIGINT)"
+    return None
+
+
+def _next_word(tokens: list[str], i: int) -> int:
+    while i < len(tokens) and tokens[i].isspace():
+        i += 1
+    return i
+
+
+def _index_hint_end(tokens: list[str], i: int) -> int:
+    """End of a ``NOT INDEXED`` / ``INDEXED BY name`` hint at ``i``, or ``i``."""
+    j = _next_word(tokens, i + 1)
+    word, following = tokens[i].upper(), tokens[j].upper() if j < len(tokens) else ""
+    if word == "NOT" and following == "INDEXED":
+        return j + 1
+    if word == "INDEXED" and following == "BY":
+        return _next_word(tokens, j + 1) + 1
+    return i
+
+
+def _translate(tokens: list[str]) -> str:
+    out, i = [], 0
+    while i < len(tokens):
+        tok = tokens[i]
+        if tok[0].isalpha() or tok[0] == "_":
+            end = _index_hint_end(tokens, i)
+            if end > i:
+                i = end
+                continue
+            j = i + 1
+            while j < len(tokens) and tokens[j].isspace():
+                j += 1
+            if j < len(tokens) and tokens[j] == "(":
+                arg_tokens, end = _calls(tokens, j)
+                args = [_translate(a) for a in arg_tokens]
+                new = _rewrite(tok, args)
+                out.append(new if new is not None else f"{tok}({','.join(args)})")
+                i = end
+                continue
+        elif _DECIMAL.match(tok) and tok != ".":
+            tok = f"CAST({tok} AS DOUBLE)"
+        out.append(tok)
+        i += 1
+    return "".join(out)
+
+
+def translate(sql: str) -> str:
+    """Rewrite SQLite-dialect ``sql`` for DuckDB (see the module docstring)."""
+    tokens = [t for t in _TOKEN.findall(sql) if not t.startswith(("--", "/*"))]
+    return _translate(tokens)
+
+
+# ── DuckDB engine ─────────────────────────────────────────────────────────────
+
+class DuckDBBackend:
+    """DuckDB views over the columnar mirror of one database."""
+
+    name = "duckdb"
+
+    def __init__(self, db_path: Path | None = None):
+        import duckdb
+
+        self.db_path = Path(db_path or db_helpers.DB_PATH)
+        self._conn = duckdb.connect(":memory:")
+        for stmt in DUCKDB_SETTINGS + DUCKDB_MACROS:
+            self._conn.execute(stmt)
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, tables=None):
+        """Sync the mirror of ``tables`` (default: all) and (re)create their views."""
+        from .columnar import mirror_dir, read_manifest, sync_mirror, table_schema
+        from .pool import open_connection
+
+        with self._lock:
+            sync_mirror(self.db_path, tables=tables, verbose=False)
+            root = mirror_dir(self.db_path)
+            manifest = read_manifest(root)
+            conn = open_connection(self.db_path, "read")
+            try:
+                for table in tables or manifest:
+                    if self._views.get(table) == manifest[table]["version"]:
+                        continue
+                    # Parquet puts the hive partition column last; keep SQLite's order
+                    columns = ", ".join(f'"{c}"' for c in table_schema(conn, table).names)
+                    files = (root / table / "**" / "*.parquet").as_posix()
+                    hive = "true" if manifest[table]["partition"] else "false"
+                    self._conn.execute(
+                        f'CREATE OR REPLACE VIEW "{table}" AS SELECT {columns} '
+                        f"FROM read_parquet('{files}', hive_partitioning = {hive})")
+                    self._views[table] = manifest[table]["version"]
+            finally:
+                conn.close()
+
+    def connect(self):
+        """A new DuckDB cursor on views of every table; use one per thread."""
+        self.refresh()
+        return self._conn.cursor()
+
+    def read_sql(self, query: str, params: tuple = ()) -> pd.DataFrame:
+        """Result of the SQLite-dialect ``query`` as a DataFrame."""
+        with db_helpers.connection("read") as conn:
+            tables = list(db_helpers.query_versions(conn, query))
+        if tables:
+            self.refresh(tables)
+        cur = self._conn.cursor()
+        try:
+            return cur.execute(translate(query), list(params)).df()
+        finally:
+            cur.close()
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def duckdb_backend(db_path: Path | None = None) -> DuckDBBackend:
+    """The shared DuckDB engine for ``db_path``."""
+    key = Path(db_path or db_helpers.DB_PATH).resolve()
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = DuckDBBackend(key)
+        return _engines[key]
+
+
+# ── Per-query choice and parity ───────────────────────────────────────────────
+
+def query_id(query: str) -> str:
+    return hashlib.sha1(normalize_sql(query).encode()).hexdigest()[:16]
+
+
+_parity = None
+
+
+def load_parity() -> dict:
+    """The saved parity report (read once per process)."""
+    global _parity
+    if _parity is None:
+        _parity = json.loads(PARITY_FILE.read_text()) if PARITY_FILE.exists() else {}
+    return _parity
+
+
+def resolve(query: str, backend: str) -> str:
+    """The engine that runs ``query``: ``backend``, or the parity verdict for ``auto``."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {list(BACKENDS)}")
+    if backend != "auto":
+        return backend
+    entry = load_parity().get("queries", {}).get(query_id(query))
+    if entry and entry["match"] and (entry["speedup"] or 0) >= SPEEDUP_MIN:
+        return "duckdb"
+    return "sqlite"
+
+
+def _comparable(df: pd.DataFrame) -> pd.DataFrame:
+    """Positional columns, plain float/object values and a canonical row order."""
+    df = df.copy()
+    df.columns = range(df.shape[1])
+    for col in df.columns:
+        s = df[col]
+        if s.dtype == object and not s.map(lambda v: v is None or isinstance(v, str)).all():
+            try:
+                s = pd.to_numeric(s)    # DuckDB DECIMAL values
+            except (TypeError, ValueError):
+                pass
+        if pd.api.types.is_numeric_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype):
+            s = s.astype("float64")
+        else:
+            s = s.astype(object).where(s.notna(), None)
+        df[col] = s
+    return df.sort_values(list(df.columns), na_position="first", ignore_index=True)
+
+
+def compare_frames(a: pd.DataFrame, b: pd.DataFrame, rtol: float = RTOL) -> str | None:
+    """Why ``a`` and ``b`` differ, or None when they hold the same rows.
+
+    Row order is ignored (engines break ORDER BY ties differently) and
+    columns are matched by position, so unnamed expressions may differ.
+    """
+    if a.shape != b.shape:
+        return f"shape {a.shape} vs {b.shape}"
+    a, b = _comparable(a), _comparable(b)
+    for col in a.columns:
+        x, y = a[col], b[col]
+        if x.dtype == "float64" and y.dtype == "float64":
+            both = x.notna() & y.notna()
+            close = (x[both] - y[both]).abs() <= rtol * y[both].abs().clip(lower=1.0)
+            if not (x.isna() == y.isna()).all() or not close.all():
+                return f"column {col}: values differ"
+        elif not x.equals(y):
+            return f"column {col}: values differ"
+    return None
+
+
+def _best_of(fn, repeat: int):
+    result, times = None, []
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def parity_check(workloads, repeat: int = DEFAULT_REPEAT, verbose: bool = True) -> dict:
+    """Run ``(name, sql)`` workloads on both engines; equal results and timings."""
+    engine = duckdb_backend()
+    engine.refresh()
+    report = {"db": str(db_helpers.DB_PATH), "queries": {}}
+    for name, sql in workloads:
+        rec = {"name": name, "match": False, "sqlite_s": None, "duckdb_s": None,
+               "speedup": None, "error": None}
+        try:
+            expected, rec["sqlite_s"] = _best_of(
+                lambda: db_helpers.run_query(sql, use_cache=False, backend="sqlite"), repeat)
+            got, rec["duckdb_s"] = _best_of(lambda: engine.read_sql(sql), repeat)
+            rec["error"] = compare_frames(got, expected)
+            rec["match"] = rec["error"] is None
+            rec["speedup"] = round(rec["sqlite_s"] / max(rec["duckdb_s"], 1e-6), 2)
+        except Exception as e:  # a query the shim cannot run must not stop the check
+            rec["error"] = f"{type(e).__name__}: {e}"
+        for key in ("sqlite_s", "duckdb_s"):
+            rec[key] = round(rec[key], 4) if rec[key] is not None else None
+        report["queries"][query_id(sql)] = rec
+        if verbose:
+            verdict = "ok" if rec["match"] else f"MISMATCH {rec['error']}"
+            speed = f"{rec['speedup']:>6.1f}x" if rec["speedup"] is not None else "      -"
+            print(f"  {name:.<40} {speed}  {verdict}")
+    return report
+
+
+def save_parity(report: dict, path: Path = PARITY_FILE) -> Path:
+    global _parity
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2))
+    if path == PARITY_FILE:
+        _parity = report
+    return path
+
+
+def main(argv=None):
+    from .bench import sql_workloads
+
+    parser = argparse.ArgumentParser(description="Check that SQLite and DuckDB return the same results")
+    parser.add_argument("--db", type=Path, default=None, help="database to check (default football.db)")
+    parser.add_argument("--only", help="comma-separated substrings of workload names")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per engine")
+    parser.add_argument("--out", type=Path, default=PARITY_FILE, help="parity report (drives backend='auto')")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        db_helpers.DB_PATH = args.db
+    if not db_helpers.DB_PATH.exists():
+        sys.exit(f"Database not found: {db_helpers.DB_PATH}")
+    only = [p.strip() for p in args.only.split(",")] if args.only else None
+    workloads = [(n, s) for n, s in sql_workloads() if not only or any(p in n for p in only)]
+    start = time.perf_counter()
+    report = parity_check(workloads, repeat=args.repeat)
+    path = save_parity(report, args.out)
+
+    recs = list(report["queries"].values())
+    mismatched = [r for r in recs if not r["match"]]
+    faster = [r for r in recs if r["match"] and (r["speedup"] or 0) >= SPEEDUP_MIN]
+    total = {k: sum(r[k] or 0 for r in recs if r["match"]) for k in ("sqlite_s", "duckdb_s")}
+    print(f"\n{len(recs) - len(mismatched)}/{len(recs)} queries match; "
+          f"{len(faster)} at least {SPEEDUP_MIN:g}x faster on DuckDB "
+          f"(matching queries: SQLite {total['sqlite_s']:.2f}s, DuckDB {total['duckdb_s']:.2f}s) "
+          f"in {time.perf_counter() - start:.1f}s")
+    print(f"Report saved to {path}")
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
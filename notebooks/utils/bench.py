@@ -0,0 +1,368 @@
+"""Benchmarks for every SQL file, notebook query and export step.
+
+Workloads:
+
+- ``sql/<file>#<n>``: every statement of ``sql/01``-``sql/07``
+- ``queries.SQL_*``: every query string shared by the notebooks and exports
+- ``export:`` / ``analysis:`` / ``models:`` steps: the Python transforms of
+  the dashboard export and pipeline graphs, fed with the query results
+  from above (steps that read the database directly read the benchmarked one)
+
+Each workload runs once to warm the page cache while peak Python heap
+(``tracemalloc``, which sees pandas/NumPy buffers) is traced, then
+``repeat`` more times for wall time. Queries also report rows returned
+and SQLite virtual machine steps, counted through the progress handler;
+VM steps do not depend on machine load, so they catch plan regressions
+that noisy timings hide.
+
+Every run is saved as JSON in ``data/processed/benchmarks`` and compared
+against ``baseline.json`` there: a workload regresses when its median
+time or VM steps grow by more than ``--threshold``. The exit status is 1
+when anything regressed, so the benchmark can gate a release.
+
+Usage:
+    python -m notebooks.utils.bench                       # football.db
+    python -m notebooks.utils.bench --scale 1,10          # synthetic databases (generated if missing)
+    python -m notebooks.utils.bench --only LGC,sql/05 --repeat 5
+    python -m notebooks.utils.bench --save-baseline       # make this run the reference
+    python -m notebooks.utils.bench --history             # median time per workload across runs
+"""
+
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from . import db_helpers, queries
+from .pool import open_connection
+from .query_cache import normalize_sql
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+SQL_DIR = PROJECT_ROOT / "sql"
+BENCH_DIR = db_helpers.DATA_PROCESSED / "benchmarks"
+BASELINE = "baseline.json"
+
+# The progress handler fires every VM_STEP_UNIT virtual machine instructions
+VM_STEP_UNIT = 1000
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.20
+# Timing changes smaller than this are noise, whatever the ratio
+MIN_DELTA_S = 0.02
+
+
+def sql_workloads() -> list[tuple[str, str]]:
+    """``(name, sql)`` for every statement in ``sql/01``-``sql/07`` and every ``SQL_*``."""
+    out = []
+    for path in sorted(SQL_DIR.glob("[0-9][0-9]_*.sql")):
+        if path.name.startswith("00_"):
+            continue
+        for i, stmt in enumerate(db_helpers.split_statements(path.read_text(encoding="utf-8")), 1):
+            out.append((f"sql/{path.stem}#{i}", stmt))
+    for name in sorted(n for n in vars(queries) if n.startswith("SQL_")):
+        out.append((f"queries.{name}", getattr(queries, name)))
+    return out
+
+
+def graphs() -> dict:
+    """The task graphs whose Python steps are benchmarked, by prefix."""
+    from .dashboard_export import build_graph
+    from .pipeline import analysis_graph, models_graph
+
+    return {"export": build_graph, "analysis": analysis_graph, "models": models_graph}
+
+
+@contextmanager
+def using_database(db_path: Path):
+    """Point ``db_helpers`` (pools, ``run_query``) at ``db_path`` for the block."""
+    previous = db_helpers.DB_PATH
+    db_helpers.close_pools()
+    db_helpers.DB_PATH = Path(db_path)
+    try:
+        yield
+    finally:
+        db_helpers.close_pools()
+        db_helpers.DB_PATH = previous
+
+
+def _measure(fn, repeat: int) -> dict:
+    """Warm-up run with heap tracing, then ``repeat`` timed runs of ``fn``."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return {
+        "result": result,
+        "wall_s": round(statistics.median(times), 4) if times else None,
+        "wall_min_s": round(min(times), 4) if times else None,
+        "peak_mb": round(peak / 1024 / 1024, 2),
+    }
+
+
+def _rows(result):
+    if isinstance(result, (pd.DataFrame, list)):
+        return len(result)
+    if isinstance(result, dict):
+        return sum(len(v) if isinstance(v, list) else 1 for v in result.values())
+    return None
+
+
+def bench_queries(conn: sqlite3.Connection, workloads, repeat: int) -> tuple[list[dict], dict]:
+    """Benchmark ``(name, sql)`` workloads; also returns results by normalized SQL."""
+    steps = [0]
+
+    def tick():
+        steps[0] += 1
+        return 0
+
+    records, results = [], {}
+    conn.set_progress_handler(tick, VM_STEP_UNIT)
+    try:
+        for name, sql in workloads:
+            rec = {"name": name, "kind": "query"}
+            try:
+                steps[0] = 0
+                m = _measure(lambda: pd.read_sql_query(sql, conn), repeat)
+                rec["vm_steps"] = steps[0] * VM_STEP_UNIT // (repeat + 1)
+                results[normalize_sql(sql)] = m.pop("result")
+                rec.update(m, rows=len(results[normalize_sql(sql)]))
+            except Exception as e:  # a broken query must not stop the suite
+                rec["error"] = f"{type(e).__name__}: {e}"
+            records.append(rec)
+    finally:
+        conn.set_progress_handler(None, 0)
+    return records, results
+
+
+def bench_steps(graph_fns: dict, query_results: dict, repeat: int, only=None) -> list[dict]:
+    """Benchmark the Python steps of each graph, fed with benchmarked query results.
+
+    Query tasks not among ``query_results`` run once, unmeasured; with
+    ``only``, unreported steps run only when a reported step needs them.
+    """
+    records = []
+    for prefix, build in graph_fns.items():
+        graph = build()
+        steps = [n for n, t in graph.tasks.items() if not t["output"] and t["sql"] is None]
+        reported = [n for n in steps if not only or any(p in f"{prefix}:{n}" for p in only)]
+        needed = graph.upstream(reported)
+        results, failed = {}, set()
+        for name, task in graph.tasks.items():  # insertion order is topological
+            if name not in needed:
+                continue
+            rec = {"name": f"{prefix}:{name}", "kind": "step"}
+            if failed & set(task["deps"]):
+                failed.add(name)
+                rec["error"] = "skipped: an input failed"
+            elif task["sql"] is not None:
+                key = normalize_sql(task["sql"])
+                try:
+                    results[name] = query_results[key] if key in query_results and not task["params"] \
+                        else db_helpers.run_query(task["sql"], task["params"], use_cache=False)
+                except Exception:
+                    failed.add(name)
+                continue
+            else:
+                fn = lambda: task["fn"](*[results[d] for d in task["deps"]])  # noqa: E731
+                try:
+                    if name in reported:
+                        m = _measure(fn, repeat)
+                        results[name] = m.pop("result")
+                        rec.update(m, rows=_rows(results[name]))
+                    else:
+                        results[name] = fn()
+                except Exception as e:
+                    failed.add(name)
+                    rec["error"] = f"{type(e).__name__}: {e}"
+            if name in reported:
+                records.append(rec)
+    return records
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(datasets: dict[str, Path], repeat: int = DEFAULT_REPEAT, only=None,
+                  label: str | None = None, verbose: bool = True) -> dict:
+    """Benchmark every workload against each ``{dataset: db_path}``."""
+    run = {
+        "label": label,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "repeat": repeat,
+        "datasets": {},
+        "results": [],
+    }
+    workloads = sql_workloads()
+    for dataset, db_path in datasets.items():
+        if verbose:
+            print(f"[{dataset}] {db_path}")
+        start = time.perf_counter()
+        with using_database(db_path):
+            run["datasets"][dataset] = {
+                "db": str(db_path),
+                "size_mb": round(Path(db_path).stat().st_size / 1024 / 1024, 1),
+                "tables": dict(db_helpers.table_info().itertuples(index=False, name=None)),
+            }
+            conn = open_connection(db_path, "read")
+            try:
+                records, results = bench_queries(
+                    conn, [(n, s) for n, s in workloads if not only or any(p in n for p in only)],
+                    repeat,
+                )
+            finally:
+                conn.close()
+            records += bench_steps(graphs(), results, repeat, only)
+        for rec in records:
+            rec["dataset"] = dataset
+        run["results"] += records
+        if verbose:
+            print(f"[{dataset}] {len(records)} workloads in {time.perf_counter() - start:.1f}s\n")
+    return run
+
+
+def results_frame(run: dict) -> pd.DataFrame:
+    cols = ["dataset", "name", "kind", "rows", "wall_s", "wall_min_s", "vm_steps", "peak_mb", "error"]
+    df = pd.DataFrame(run["results"]).reindex(columns=cols)
+    return df.astype({"rows": "Int64", "vm_steps": "Int64"})
+
+
+def compare(run: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> pd.DataFrame:
+    """Per-workload change against ``baseline`` with a ``regressed`` flag."""
+    cur = results_frame(run)
+    base = results_frame(baseline)[["dataset", "name", "wall_s", "vm_steps"]]
+    df = cur.merge(base, on=["dataset", "name"], how="left", suffixes=("", "_base"))
+    df["wall_change_pct"] = ((df["wall_s"] / df["wall_s_base"] - 1) * 100).round(1)
+    df["vm_change_pct"] = ((df["vm_steps"] / df["vm_steps_base"] - 1) * 100).round(1)
+    wall, wall_base = df["wall_s"].astype(float), df["wall_s_base"].astype(float)
+    slower = (wall > wall_base * (1 + threshold)) & (wall - wall_base > MIN_DELTA_S)
+    more_work = df["vm_steps"].astype(float) > df["vm_steps_base"].astype(float) * (1 + threshold)
+    broke = df["error"].notna() & wall_base.notna()
+    df["regressed"] = slower | more_work | broke
+    return df
+
+
+def save_run(run: dict, out_dir: Path = BENCH_DIR) -> Path:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = run["timestamp"].replace(":", "").replace("-", "")
+    path = out_dir / f"bench-{stamp}.json"
+    path.write_text(json.dumps(run, indent=2, default=str))
+    return path
+
+
+def history(out_dir: Path = BENCH_DIR, dataset: str | None = None) -> pd.DataFrame:
+    """Median wall time per workload (rows) for every saved run (columns)."""
+    frames = []
+    for path in sorted(Path(out_dir).glob("bench-*.json")):
+        run = json.loads(path.read_text())
+        df = results_frame(run)
+        if dataset:
+            df = df[df["dataset"] == dataset]
+        tag = run.get("label") or f"{run['timestamp'][:16]} {run.get('commit') or ''}".strip()
+        frames.append(df.assign(run=tag)[["dataset", "name", "run", "wall_s"]])
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames).pivot_table(index=["dataset", "name"], columns="run",
+                                         values="wall_s", aggfunc="first", sort=False)
+
+
+def _datasets(args) -> dict[str, Path]:
+    datasets = {}
+    for scale in [s for s in (args.scale or "").split(",") if s.strip()]:
+        scale = float(scale)
+        path = db_helpers.DATA_PROCESSED / f"football_synthetic_x{scale:g}.db"
+        if not path.exists():
+            from .synthetic import generate
+
+            print(f"Generating synthetic database at scale {scale:g}...")
+            generate(path, scale=scale)
+        datasets[f"x{scale:g}"] = path
+    for path in args.db or []:
+        datasets[Path(path).stem] = Path(path)
+    if not datasets:
+        datasets[db_helpers.DB_PATH.stem] = db_helpers.DB_PATH
+    missing = [str(p) for p in datasets.values() if not p.exists()]
+    if missing:
+        sys.exit(f"Database not found: {', '.join(missing)}")
+    return datasets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SQL files, notebook queries and export steps")
+    parser.add_argument("--db", type=Path, action="append", help="database to benchmark (repeatable)")
+    parser.add_argument("--scale", help="comma-separated synthetic scales, e.g. 1,10")
+    parser.add_argument("--only", help="comma-separated substrings of workload names")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per workload")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown that counts as a regression")
+    parser.add_argument("--label", help="name of this run in the history, e.g. a release tag")
+    parser.add_argument("--out", type=Path, default=BENCH_DIR, help="results directory")
+    parser.add_argument("--baseline", type=Path, default=None,
+                        help=f"run to compare against (default <out>/{BASELINE})")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--history", action="store_true", help="print the saved history and exit")
+    args = parser.parse_args(argv)
+
+    pd.set_option("display.width", 200)
+    pd.set_option("display.max_rows", None)
+    if args.history:
+        print(history(args.out).to_string())
+        return 0
+
+    only = [p.strip() for p in args.only.split(",")] if args.only else None
+    run = run_benchmark(_datasets(args), repeat=args.repeat, only=only, label=args.label)
+    path = save_run(run, args.out)
+
+    baseline_path = args.baseline or Path(args.out) / BASELINE
+    regressed = 0
+    if baseline_path.exists():
+        table = compare(run, json.loads(baseline_path.read_text()), args.threshold)
+        regressed = int(table["regressed"].sum())
+        cols = ["dataset", "name", "rows", "wall_s", "wall_change_pct", "vm_steps",
+                "vm_change_pct", "peak_mb", "regressed"]
+    else:
+        table = results_frame(run)
+        cols = ["dataset", "name", "rows", "wall_s", "wall_min_s", "vm_steps", "peak_mb"]
+    print(table[cols].to_string(index=False))
+    errors = table[table["error"].notna()]
+    for _, row in errors.iterrows():
+        print(f"  ERROR {row['dataset']} {row['name']}: {row['error']}")
+
+    print(f"\nResults saved to {path}")
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(path.read_text())
+        print(f"Baseline updated: {baseline_path}")
+    elif baseline_path.exists():
+        print(f"{regressed} regression(s) against {baseline_path} (threshold {args.threshold:.0%})")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
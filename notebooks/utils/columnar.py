@@ -0,0 +1,290 @@
+"""Columnar Parquet mirror of ``football.db`` for analytical reads.
+
+Sums, averages and medians over ``market_value_in_eur`` by league or date
+only need a few columns, yet every SQLite scan reads whole rows. The mirror
+keeps each table as zstd-compressed Parquet next to the database
+(``football.db`` -> ``football.columnar/``):
+
+- ``player_valuations``, ``transfers`` and ``games`` are partitioned by year
+  (``valuation_year=2023/``, ... the calendar columns of ``derived.py``),
+  so a read of recent seasons opens only those directories
+- every other table, including the materialized ones, is a single dataset
+
+Readers (``db_helpers.read_columnar``) load only the requested columns and
+partitions, memory-mapping the files; text comes back dictionary-encoded,
+i.e. as pandas categoricals. ``_manifest.json`` records the ``ingest_meta``
+version each table was mirrored at: a sync rewrites only tables whose
+version changed, and a read of a stale table re-syncs it first.
+
+Needs ``pyarrow``.
+
+Usage:
+    python -m notebooks.utils.columnar              # sync changed tables
+    python -m notebooks.utils.columnar --force      # rewrite every table
+"""
+
+import argparse
+import json
+import shutil
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as fs
+import pyarrow.parquet as pq
+
+from . import db_helpers
+from .derived import CALENDAR_COLUMNS
+from .pool import open_connection
+
+MANIFEST = "_manifest.json"
+# Rows fetched from SQLite per record batch while writing
+BATCH_ROWS = 100_000
+# Year partitions split each batch; buffer rows so row groups stay large
+ROW_GROUP_ROWS = 250_000
+COMPRESSION = "zstd"
+# Bookkeeping tables that are not mirrored
+SKIP_TABLES = {db_helpers.META_TABLE}
+
+
+def mirror_dir(db_path: Path | None = None) -> Path:
+    """Directory of the mirror of ``db_path``: ``football.db`` -> ``football.columnar``."""
+    return Path(db_path or db_helpers.DB_PATH).with_suffix(".columnar")
+
+
+def partition_column(table: str) -> str | None:
+    """The year column ``table`` is partitioned by, if any."""
+    if table not in CALENDAR_COLUMNS:
+        return None
+    return f"{CALENDAR_COLUMNS[table][1]}_year"
+
+
+def _arrow_type(declared: str) -> pa.DataType:
+    """Arrow type for a declared SQLite column type, by SQLite's affinity rules."""
+    decl = (declared or "").upper()
+    if "INT" in decl:
+        return pa.int64()
+    if any(t in decl for t in ("CHAR", "CLOB", "TEXT")):
+        return pa.string()
+    if any(t in decl for t in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    if "BLOB" in decl or not decl:
+        return pa.binary()
+    # NUMERIC affinity; the loader declares dates as TIMESTAMP and stores text
+    return pa.string()
+
+
+def table_schema(conn: sqlite3.Connection, table: str) -> pa.Schema:
+    """Arrow schema of ``table``, generated columns included."""
+    # hidden: 0 normal, 2/3 generated (virtual/stored), 1 hidden (virtual tables)
+    cols = [r for r in conn.execute(f'PRAGMA table_xinfo("{table}")') if r[6] != 1]
+    return pa.schema([(r[1], _arrow_type(r[2])) for r in cols])
+
+
+# Fallback conversions for columns holding values of another storage class
+_PANDAS_TYPE = {pa.int64(): "Float64", pa.float64(): "Float64", pa.string(): "string",
+                pa.binary(): "object"}
+
+
+def _batches(conn: sqlite3.Connection, table: str, schema: pa.Schema):
+    names = ", ".join(f'"{n}"' for n in schema.names)
+    cur = conn.execute(f'SELECT {names} FROM "{table}"')
+    while rows := cur.fetchmany(BATCH_ROWS):
+        columns = list(zip(*rows))
+        arrays = []
+        for values, field in zip(columns, schema):
+            try:
+                arrays.append(pa.array(values, type=field.type))
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # SQLite typing is per value; stray values go through pandas
+                arrays.append(pa.array(pd.Series(values).astype(_PANDAS_TYPE[field.type]),
+                                       type=field.type, from_pandas=True))
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _versions(conn: sqlite3.Connection, tables, db_path: Path) -> dict[str, str]:
+    """Content version per table; tables without metadata use the file stamp."""
+    known = db_helpers.table_versions(conn)
+    files = [db_path, Path(f"{db_path}-wal")]
+    stamp = ":".join(f"{f.stat().st_mtime_ns}.{f.stat().st_size}" for f in files if f.exists())
+    return {t: known.get(t, f"file:{stamp}") for t in tables}
+
+
+def read_manifest(root: Path) -> dict:
+    path = root / MANIFEST
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def write_table(conn: sqlite3.Connection, table: str, root: Path) -> tuple[int, str | None]:
+    """Mirror one table into ``root/<table>``, replacing the old copy atomically.
+
+    Returns the row count and the partition column.
+    """
+    schema = table_schema(conn, table)
+    part = partition_column(table)
+    if part not in schema.names:
+        part = None     # database from before the derived columns
+    tmp = root / f".{table}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    rows = 0
+
+    def batches():
+        nonlocal rows
+        for batch in _batches(conn, table, schema):
+            rows += batch.num_rows
+            yield batch
+
+    ds.write_dataset(
+        pa.RecordBatchReader.from_batches(schema, batches()), tmp, format="parquet",
+        partitioning=ds.partitioning(pa.schema([schema.field(part)]), flavor="hive") if part else None,
+        file_options=ds.ParquetFileFormat().make_write_options(compression=COMPRESSION),
+        basename_template="part-{i}.parquet",
+        min_rows_per_group=ROW_GROUP_ROWS,
+        max_rows_per_group=4 * ROW_GROUP_ROWS,
+        existing_data_behavior="overwrite_or_ignore",
+        max_partitions=4096,
+    )
+    if not rows:
+        # Empty table: one empty file keeps the schema for readers
+        tmp.mkdir(exist_ok=True)
+        pq.write_table(schema.empty_table(), tmp / "part-0.parquet", compression=COMPRESSION)
+    target = root / table
+    old = root / f".{table}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    if target.exists():
+        target.rename(old)
+    tmp.rename(target)
+    shutil.rmtree(old, ignore_errors=True)
+    return rows, part
+
+
+def sync_mirror(db_path: Path | None = None, tables=None, force: bool = False,
+                verbose: bool = True) -> dict[str, int]:
+    """Bring the mirror of ``db_path`` up to date; returns rows written per table.
+
+    Only tables whose ``ingest_meta`` version differs from the manifest are
+    rewritten (all with ``force``); tables gone from the database are removed.
+    """
+    db_path = Path(db_path or db_helpers.DB_PATH)
+    root = mirror_dir(db_path)
+    root.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(root)
+    # pyarrow's writer pulls the record batches from one of its own threads
+    conn = open_connection(db_path, "read", check_same_thread=False)
+    written = {}
+    try:
+        existing = [r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        existing = [t for t in existing if t not in SKIP_TABLES]
+        versions = _versions(conn, existing, db_path)
+        for table in tables or existing:
+            if table not in versions:
+                raise KeyError(f"no table {table!r} in {db_path}")
+            entry = manifest.get(table)
+            if not force and entry and entry["version"] == versions[table] and (root / table).exists():
+                continue
+            start = time.perf_counter()
+            rows, part = write_table(conn, table, root)
+            manifest[table] = {
+                "version": versions[table],
+                "rows": rows,
+                "partition": part,
+                "bytes": sum(f.stat().st_size for f in (root / table).rglob("*.parquet")),
+            }
+            written[table] = rows
+            if verbose:
+                print(f"  {table:.<30} {rows:>10,} rows  {manifest[table]['bytes'] / 2**20:7.1f} MB"
+                      f"  {time.perf_counter() - start:5.1f}s")
+        if tables is None:
+            for table in set(manifest) - set(existing):
+                shutil.rmtree(root / table, ignore_errors=True)
+                del manifest[table]
+    finally:
+        conn.close()
+    (root / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return written
+
+
+def is_stale(table: str, db_path: Path | None = None) -> bool:
+    """Whether the mirror of ``table`` is missing or older than the database."""
+    db_path = Path(db_path or db_helpers.DB_PATH)
+    root = mirror_dir(db_path)
+    entry = read_manifest(root).get(table)
+    if entry is None or not (root / table).exists():
+        return True
+    conn = open_connection(db_path, "read")
+    try:
+        return entry["version"] != _versions(conn, [table], db_path)[table]
+    finally:
+        conn.close()
+
+
+def _scan(table: str, columns, years, filters, db_path):
+    """Dataset, text columns and filter expression for a read of ``table``."""
+    db_path = Path(db_path or db_helpers.DB_PATH)
+    if is_stale(table, db_path):
+        sync_mirror(db_path, tables=[table], verbose=False)
+    path = mirror_dir(db_path) / table
+    if filters is not None and not isinstance(filters, ds.Expression):
+        filters = pq.filters_to_expression(filters)
+    if years is not None:
+        part = partition_column(table)
+        if part is None:
+            raise ValueError(f"{table} is not partitioned by year")
+        year_filter = ds.field(part).isin([int(y) for y in years])
+        filters = year_filter if filters is None else filters & year_filter
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    text = [f.name for f in dataset.schema if pa.types.is_string(f.type)]
+    if columns is not None:
+        text = [c for c in text if c in columns]
+    return path, text, filters
+
+
+def read_table(table: str, columns=None, years=None, filters=None,
+               db_path: Path | None = None) -> pd.DataFrame:
+    """Columns of ``table`` from the mirror, optionally only some years' partitions.
+
+    ``years`` (e.g. ``range(2015, 2024)``) selects partitions of the
+    year-partitioned tables; ``filters`` is a pyarrow filter expression or
+    DNF list applied while reading (``[("market_value_in_eur", ">", 0)]``).
+    """
+    path, text, filters = _scan(table, columns, years, filters, db_path)
+    result = pq.read_table(path, columns=columns, filters=filters, memory_map=True,
+                           partitioning="hive", read_dictionary=text)
+    return db_helpers.downcast(result.to_pandas())
+
+
+def iter_table(table: str, columns=None, years=None, filters=None,
+               db_path: Path | None = None, batch_rows: int = BATCH_ROWS):
+    """Like :func:`read_table`, as DataFrames of up to ``batch_rows`` rows."""
+    path, text, filters = _scan(table, columns, years, filters, db_path)
+    dataset = ds.dataset(path, format=ds.ParquetFileFormat(read_options={"dictionary_columns": text}),
+                         partitioning="hive", filesystem=fs.LocalFileSystem(use_mmap=True))
+    for batch in dataset.to_batches(columns=columns, filter=filters, batch_size=batch_rows):
+        if batch.num_rows:
+            yield db_helpers.downcast(batch.to_pandas())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mirror football.db into columnar Parquet files")
+    parser.add_argument("--db", type=Path, default=None, help="database to mirror (default football.db)")
+    parser.add_argument("--tables", help="comma-separated tables (default: all)")
+    parser.add_argument("--force", action="store_true", help="rewrite tables even if unchanged")
+    args = parser.parse_args(argv)
+
+    db_path = Path(args.db or db_helpers.DB_PATH)
+    if not db_path.exists():
+        sys.exit(f"Database not found: {db_path}")
+    tables = [t.strip() for t in args.tables.split(",")] if args.tables else None
+    start = time.perf_counter()
+    written = sync_mirror(db_path, tables=tables, force=args.force)
+    print(f"\n{len(written)} tables mirrored to {mirror_dir(db_path)} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
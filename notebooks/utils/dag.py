@@ -0,0 +1,236 @@
+"""Dependency-aware, incremental task graph for export pipelines.
+
+A graph is built from three kinds of tasks:
+
+- ``query(name, sql)``: a ``run_query`` call (pooled read connection, cached)
+- ``step(name, fn, deps)``: a Python transform of its dependencies' results
+- ``output(filename, dep)``: writes the dependency's result as JSON
+
+``run()`` executes independent tasks concurrently on a thread pool (SQLite
+releases the GIL while a query runs), so wall time is bounded by the slowest
+chain rather than the sum of all queries. Every output gets a signature from
+the SQL text of all upstream queries, the code of all upstream transforms
+(the source files of their module and of every module of this package it
+imports, directly or not) and the content versions of the tables they read;
+outputs whose signature matches the manifest of the previous run are skipped
+together with every task only they depend on. Manifests are kept under
+``data/processed/export_manifests/``, one per output directory, so they are
+never deployed with the outputs.
+"""
+
+import ast
+import hashlib
+import inspect
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+
+from .db_helpers import DATA_PROCESSED, connection, query_versions, run_query
+from .query_cache import is_cacheable, normalize_sql
+
+MANIFEST_DIR = DATA_PROCESSED / "export_manifests"
+# Written into the output directory by earlier versions; removed on the next run
+LEGACY_MANIFEST = ".export_manifest.json"
+
+_PACKAGE = __name__.rpartition(".")[0]
+_PACKAGE_DIR = Path(__file__).resolve().parent
+
+
+def manifest_path(out_dir: Path) -> Path:
+    """Manifest of the outputs written to ``out_dir``."""
+    out_dir = Path(out_dir).resolve()
+    digest = hashlib.sha256(str(out_dir).encode("utf-8")).hexdigest()[:12]
+    return MANIFEST_DIR / f"{out_dir.name}-{digest}.json"
+
+
+def _source(fn) -> str:
+    try:
+        return inspect.getsource(fn)
+    except (OSError, TypeError):
+        return getattr(fn, "__qualname__", repr(fn))
+
+
+@lru_cache(maxsize=None)
+def _parse_module(path: Path, mtime_ns: int) -> tuple[str, frozenset]:
+    """Digest of a source file and the files of this package it imports,
+    at module level or inside functions (lazy imports)."""
+    text = path.read_text(encoding="utf-8")
+    names = set()
+    for node in ast.walk(ast.parse(text)):
+        if isinstance(node, ast.ImportFrom) and node.level == 1 and path.parent == _PACKAGE_DIR:
+            names.update([node.module] if node.module else [a.name for a in node.names])
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            if node.module == _PACKAGE:
+                names.update(a.name for a in node.names)
+            elif node.module.startswith(_PACKAGE + "."):
+                names.add(node.module[len(_PACKAGE) + 1:])
+        elif isinstance(node, ast.Import):
+            names.update(a.name[len(_PACKAGE) + 1:] for a in node.names
+                         if a.name.startswith(_PACKAGE + "."))
+    files = (_PACKAGE_DIR / f"{n.split('.')[0]}.py" for n in names)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest(), frozenset(f for f in files if f.exists())
+
+
+def _code_version(fn) -> str:
+    """Digest of the source files ``fn`` runs: its module and, transitively,
+    every module of this package imported from there."""
+    try:
+        path = Path(inspect.getsourcefile(fn)).resolve()
+    except TypeError:
+        return ""
+    digests, seen, stack = [], set(), [path]
+    while stack:
+        path = stack.pop()
+        if path in seen or not path.exists():
+            continue
+        seen.add(path)
+        digest, imports = _parse_module(path, path.stat().st_mtime_ns)
+        digests.append(f"{path.name}:{digest}")
+        stack.extend(imports)
+    return "\n".join(sorted(digests))
+
+
+def save_json(path: Path, data) -> int:
+    """Write ``data`` as indented JSON (atomically); returns the record count."""
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp, path)
+    return len(data) if isinstance(data, list) else sum(
+        len(v) if isinstance(v, list) else 1 for v in data.values()
+    )
+
+
+class TaskGraph:
+    """Named tasks with dependencies, executed concurrently and incrementally."""
+
+    def __init__(self):
+        self.tasks = {}
+
+    def _add(self, name: str, fn, deps=(), fingerprint: str = "", tables=(), output=None,
+             volatile: bool = False, sql: str | None = None, params: tuple = ()):
+        if name in self.tasks:
+            raise ValueError(f"Duplicate task {name!r}")
+        missing = [d for d in deps if d not in self.tasks]
+        if missing:
+            raise ValueError(f"Task {name!r} depends on unknown tasks {missing}")
+        self.tasks[name] = {
+            "fn": fn, "deps": tuple(deps), "fingerprint": fingerprint,
+            "tables": tuple(tables), "output": output, "volatile": volatile,
+            "sql": sql, "params": tuple(params),
+        }
+        return name
+
+    def query(self, name: str, sql: str, params: tuple = ()) -> str:
+        """Task returning ``run_query(sql, params)``."""
+        fingerprint = normalize_sql(sql) + repr(params)
+        return self._add(name, lambda: run_query(sql, params), (), fingerprint, [sql],
+                         volatile=not is_cacheable(sql), sql=sql, params=params)
+
+    def step(self, name: str, fn, deps=(), tables=()) -> str:
+        """Task returning ``fn(*results_of_deps)``.
+
+        ``tables`` lists source tables the function reads directly (not
+        through a dependency), so their changes invalidate its outputs. A
+        change to the function's module, or to any module of this package
+        it imports, does too.
+        """
+        fingerprint = _source(fn) + "\n" + _code_version(fn)
+        return self._add(name, fn, deps, fingerprint, [" ".join(tables)] if tables else [])
+
+    def output(self, filename: str, dep: str) -> str:
+        """Task writing the result of ``dep`` to ``filename`` in the output directory."""
+        return self._add(filename, None, (dep,), "", (), output=filename)
+
+    def upstream(self, names) -> set[str]:
+        """The given tasks plus everything they transitively depend on."""
+        seen, stack = set(), list(names)
+        while stack:
+            name = stack.pop()
+            if name not in seen:
+                seen.add(name)
+                stack.extend(self.tasks[name]["deps"])
+        return seen
+
+    def signatures(self) -> dict[str, str]:
+        """Signature of every task from its definition and its inputs' versions."""
+        today = date.today().isoformat()
+        sigs = {}
+        with connection("read") as conn:
+            for name, task in self.tasks.items():  # insertion order is topological
+                parts = [name, task["fingerprint"]]
+                for text in task["tables"]:
+                    parts.append(json.dumps(query_versions(conn, text), sort_keys=True))
+                if task["volatile"]:
+                    parts.append(today)  # DATE('now') results change at most daily
+                parts.extend(sigs[d] for d in task["deps"])
+                sigs[name] = hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+        return sigs
+
+    def run(self, out_dir: Path, workers: int | None = None, force: bool = False,
+            verbose: bool = True) -> dict[str, str]:
+        """Run every output whose inputs changed; returns ``{output: status}``.
+
+        Status is ``"written"`` or ``"unchanged"``.
+        """
+        start = time.perf_counter()
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        manifest_file = manifest_path(out_dir)
+        (out_dir / LEGACY_MANIFEST).unlink(missing_ok=True)
+        try:
+            manifest = json.loads(manifest_file.read_text())
+        except (FileNotFoundError, ValueError):
+            manifest = {}
+
+        sigs = self.signatures()
+        outputs = [n for n, t in self.tasks.items() if t["output"]]
+        stale = [
+            n for n in outputs
+            if force or manifest.get(n) != sigs[n] or not (out_dir / n).exists()
+        ]
+        status = {n: "unchanged" for n in outputs}
+        needed = self.upstream(stale)
+        results = {}
+
+        def execute(name):
+            task = self.tasks[name]
+            args = [results[d] for d in task["deps"]]
+            if task["output"]:
+                return save_json(out_dir / task["output"], args[0])
+            return task["fn"](*args)
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1)) as pool:
+                waiting = {n: set(self.tasks[n]["deps"]) for n in self.tasks if n in needed}
+                running = {}
+                while waiting or running:
+                    for name in [n for n, deps in waiting.items() if deps <= results.keys()]:
+                        del waiting[name]
+                        running[pool.submit(execute, name)] = name
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        results[name] = future.result()
+                        if self.tasks[name]["output"]:
+                            manifest[name] = sigs[name]
+                            status[name] = "written"
+                            if verbose:
+                                size = (out_dir / name).stat().st_size / 1024
+                                print(f"  {name} -> {size:.1f} KB ({results[name]} records)")
+        finally:
+            manifest_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = manifest_file.with_suffix(".tmp")
+            tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+            os.replace(tmp, manifest_file)
+
+        if verbose:
+            skipped = [n for n, s in status.items() if s == "unchanged"]
+            if skipped:
+                print(f"  unchanged: {', '.join(skipped)}")
+            print(f"{len(stale)} of {len(outputs)} outputs written in {time.perf_counter() - start:.1f}s")
+        return status
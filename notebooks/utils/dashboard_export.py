@@ -0,0 +1,360 @@
+"""Export of the pre-processed JSON files behind the React dashboard.
+
+Each file in ``dashboard/public/data`` is a small graph of tasks
+(queries -> transform -> JSON file) run by :class:`utils.dag.TaskGraph`:
+queries run concurrently on pooled read connections, and files whose SQL,
+transform code and source tables are unchanged since the last export are
+skipped.
+
+Usage:
+    python -m notebooks.utils.dashboard_export [--workers N] [--force]
+"""
+
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from .asof import load_valuations, value_asof
+from .dag import TaskGraph
+from .db_helpers import connection
+from .portfolio import club_portfolios
+from .queries import (
+    SQL_AGECURVES, SQL_CLUB_AGE_GROUPS, SQL_CLUB_LEAGUE, SQL_DEPR,
+    SQL_FEE_TRANSFERS, SQL_LGC, SQL_MKT_OVR, SQL_POS_TREEMAP, SQL_SHARPE2,
+    SQL_TOPTRANS, SQL_TOTAL_PLAYERS, SQL_VALUE_HIST, SQL_VOL_HEAT,
+)
+from .timeseries import drawdown_by_position
+from .transfer_network import TransferNetwork, season_label
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+OUT_DIR = PROJECT_ROOT / "dashboard" / "public" / "data"
+CLUB_FINANCIALS_SQL = PROJECT_ROOT / "sql" / "07_club_financials.sql"
+
+LEAGUE_NAMES = {"GB1": "Premier League", "ES1": "La Liga", "IT1": "Serie A",
+                "L1": "Bundesliga", "FR1": "Ligue 1"}
+AGE_ORDER = ["U21", "21-24", "25-28", "29-32", "33+"]
+# Clubs in club_financials.json and club_history.json
+TOP_CLUBS = 20
+ROI_CATEGORIES = ["Excellent (>50%)", "Positive (0-50%)", "Moderate Loss", "Significant Loss"]
+# Transfer network: net spend window (latest seasons) and first season exported
+NET_SPEND_SEASONS = 5
+FIRST_SEASON = 2012
+
+# Full legal names -> short display names
+CLUB_SUFFIXES = [
+    " Football Club", " Club de Fútbol", " Fútbol Club",
+    " S.p.A.", " S.A.D.", " S.S.C.", " S.p.a.",
+    " Associazione Calcica", " Associazione Calcio",
+    " Associazione Sportiva",
+]
+CLUB_SHORT_NAMES = {
+    "Manchester City": "Man City",
+    "Paris Saint-Germain": "PSG",
+    "Futbol Club Barcelona": "Barcelona",
+    "FC Bayern München": "Bayern Munich",
+    "Tottenham Hotspur": "Tottenham",
+    "Manchester United": "Man United",
+    "Newcastle United": "Newcastle",
+    "Football Club Internazionale Milano": "Inter Milan",
+    "Milan": "AC Milan",
+    "Nottingham Forest": "Nott. Forest",
+    "Club Atlético de Madrid": "Atletico Madrid",
+    "Roma": "AS Roma",
+    "Brighton and Hove Albion": "Brighton",
+}
+
+
+def shorten_club_name(name: str) -> str:
+    short = name
+    for suffix in CLUB_SUFFIXES:
+        short = short.replace(suffix, "")
+    return CLUB_SHORT_NAMES.get(short.strip(), short.strip())
+
+
+# ── Transforms ────────────────────────────────────────────────────────────────
+
+def market_overview(df: pd.DataFrame) -> list[dict]:
+    df = df.copy()
+    df["league_name"] = df["league_id"].map(LEAGUE_NAMES)
+    df["total_market_value"] = df["total_market_value"].round(0)
+    df["avg_player_value"] = df["avg_player_value"].round(0)
+    df["yoy_growth_pct"] = df["yoy_growth_pct"].where(df["yoy_growth_pct"].notna(), other=None)
+    return df.to_dict("records")
+
+
+def league_comparison(df: pd.DataFrame) -> list[dict]:
+    df = df.copy()
+    df["league"] = df["league_id"].map(LEAGUE_NAMES)
+    cols = ["total_value", "avg_value", "top_club_value"]
+    df[cols] = df[cols].round(0)
+    return df.to_dict("records")
+
+
+def age_curves(df: pd.DataFrame) -> list[dict]:
+    """Median value per age (rows) and position (columns); medians come from SQL."""
+    pivot = df.pivot(index="age", columns="position", values="value_m").reset_index()
+    for col in ["Attack", "Midfield", "Defender", "Goalkeeper"]:
+        if col in pivot.columns:
+            pivot[col] = pivot[col].round(3)
+    return pivot.to_dict("records")
+
+
+def risk_metrics(df_vol, df_dd, df_dep, df_sharpe) -> dict:
+    df_vol = df_vol.assign(league=df_vol["league_id"].map(LEAGUE_NAMES))
+    df_vol = df_vol[["league", "season", "volatility"]].dropna()
+    df_sharpe = df_sharpe.assign(league=df_sharpe["league_id"].map(LEAGUE_NAMES))
+    return {
+        "volatility_heatmap": df_vol.to_dict("records"),
+        "drawdown_by_position": df_dd.to_dict("records"),
+        "depreciation_rates": df_dep.to_dict("records"),
+        "sharpe_ratios": df_sharpe[["league", "sharpe_ratio", "avg_return", "volatility"]].to_dict("records"),
+    }
+
+
+def _drawdown_by_position() -> pd.DataFrame:
+    with connection("read") as conn:
+        return drawdown_by_position(conn)
+
+
+def _valuations() -> pd.DataFrame:
+    with connection("read") as conn:
+        return load_valuations(conn, positive_only=False)
+
+
+def _club_history() -> pd.DataFrame:
+    with connection("read") as conn:
+        return club_portfolios(conn)
+
+
+def _transfer_network() -> TransferNetwork:
+    with connection("read") as conn:
+        return TransferNetwork.from_connection(conn)
+
+
+def _roi_category(roi: float) -> str:
+    if roi > 50:
+        return ROI_CATEGORIES[0]
+    if roi >= 0:
+        return ROI_CATEGORIES[1]
+    if roi >= -50:
+        return ROI_CATEGORIES[2]
+    return ROI_CATEGORIES[3]
+
+
+def _net_spend_charts(df: pd.DataFrame) -> dict:
+    """Six biggest net spenders and six biggest net sellers per season
+    (rows of ``TransferNetwork.net_spend_by_season``), biggest spender first."""
+    df = df[df["paid"] + df["received"] > 0].sort_values(["season", "net_spend"], kind="stable")
+    by_season = df.groupby("season")
+    chart = pd.concat([by_season.head(6), by_season.tail(6)]).drop_duplicates(["season", "club_id"])
+    charts = {}
+    for row in chart.sort_values(["season", "net_spend"], kind="stable").itertuples():
+        charts.setdefault(row.season, []).append(
+            {"club": shorten_club_name(row.club), "net_spend": int(row.net_spend)})
+    return charts
+
+
+def transfer_seasons(network: TransferNetwork) -> list[dict]:
+    """Net spend, Big-5 league flows and network hubs of every season from
+    ``FIRST_SEASON``, each computed for all seasons at once."""
+    seasons = [int(s) for s in network.seasons if s >= FIRST_SEASON]
+    net_spend = _net_spend_charts(network.net_spend_by_season())
+    flows, hubs = {}, {}
+    for row in network.league_flows(seasons, by_season=True, leagues=LEAGUE_NAMES).itertuples():
+        flows.setdefault(row.season, []).append({
+            "from": LEAGUE_NAMES.get(row.from_league, row.from_league),
+            "to": LEAGUE_NAMES.get(row.to_league, row.to_league),
+            "fees": int(row.fees), "transfers": int(row.transfers),
+        })
+    for row in network.centrality(seasons, by_season=True).groupby("season").head(8).itertuples():
+        hubs.setdefault(row.season, []).append({
+            "club": shorten_club_name(row.club),
+            "league": LEAGUE_NAMES.get(row.league_id, "Other"),
+            "pagerank": round(float(row.pagerank), 4), "partners": int(row.partners),
+            "received": int(row.received), "paid": int(row.paid),
+        })
+    return [{"season": season_label(s), "net_spend": net_spend.get(s, []),
+             "league_flows": flows.get(s, []), "hubs": hubs.get(s, [])} for s in seasons]
+
+
+def transfer_analytics(df_transfers, valuations, network) -> dict:
+    """ROI distribution, club net spend, fee-vs-value-change scatter and the
+    per-season transfer network (net spend, league flows, hubs)."""
+    df = df_transfers.copy()
+    # Latest valuation on or before the transfer; first one from 10 months after
+    df["value_at_transfer"] = value_asof(df, valuations)
+    df["value_after_1yr"] = value_asof(df, valuations, months=10, direction="forward")
+    df["roi_pct"] = (
+        (df["value_after_1yr"] - df["transfer_fee"]) / df["transfer_fee"] * 100
+    ).round(1)
+    df["value_change_pct"] = (
+        (df["value_after_1yr"] - df["value_at_transfer"]) / df["value_at_transfer"] * 100
+    ).round(1)
+    birth = pd.to_datetime(df["date_of_birth"], errors="coerce")
+    transfer = pd.to_datetime(df["transfer_date"], errors="coerce")
+    df["age_at_transfer"] = ((transfer - birth).dt.days / 365.25).round(0)
+    valid = df.dropna(subset=["value_after_1yr", "value_at_transfer"]).copy()
+
+    valid["roi_cat"] = valid["roi_pct"].apply(_roi_category)
+    roi_dist = valid.groupby("roi_cat").agg(
+        count=("roi_pct", "size"),
+        avg_roi=("roi_pct", "mean"),
+    ).round(1).reset_index().rename(columns={"roi_cat": "category"})
+    roi_dist["_order"] = roi_dist["category"].map({c: i for i, c in enumerate(ROI_CATEGORIES)})
+    roi_dist = roi_dist.sort_values("_order").drop(columns="_order")
+
+    # Keyed by club ID; over the latest seasons of the data
+    latest = network.net_spend(network.seasons[-NET_SPEND_SEASONS:]).assign(season=0)
+    net_spend = _net_spend_charts(latest).get(0, [])
+
+    scatter = valid.nlargest(200, "transfer_fee")[
+        ["transfer_fee", "value_change_pct", "age_at_transfer", "player_name"]
+    ].copy()
+    scatter.columns = ["fee", "value_change", "age", "name"]
+    scatter = scatter.dropna()
+    scatter["age"] = scatter["age"].astype(int)
+
+    return {
+        "roi_distribution": roi_dist.to_dict("records"),
+        "net_spend": net_spend,
+        "scatter": scatter.to_dict("records"),
+        "total_analyzed": int(len(valid)),
+        "seasons": transfer_seasons(network),
+    }
+
+
+def club_history(df: pd.DataFrame) -> list[dict]:
+    """Monthly squad portfolio of one club (rows of ``portfolio.club_portfolios``)."""
+    return [{
+        "date": pd.Timestamp(row.date).strftime("%Y-%m"),
+        "squad_value": int(row.total_squad_value),
+        "player_count": int(row.player_count),
+        "star_dependency": float(row.star_dependency_pct),
+        "over_30": float(row.over_30_value_pct),
+        # Flat, one key per position, for stacked charts
+        "Attack": int(row.attack_value),
+        "Midfield": int(row.midfield_value),
+        "Defender": int(row.defender_value),
+        "Goalkeeper": int(row.goalkeeper_value),
+    } for row in df.itertuples()]
+
+
+def club_financials(df_clubs, league_for_club, df_age) -> list[dict]:
+    """Top 20 clubs by squad value with position and age group breakdowns."""
+    club_league = dict(zip(league_for_club["club_name"], league_for_club["league_id"].map(LEAGUE_NAMES)))
+    age_by_club = {}
+    for club_name, group in df_age.groupby("club_name"):
+        records = group[["age_group", "count", "value"]].rename(columns={"age_group": "group"}).to_dict("records")
+        records.sort(key=lambda r: AGE_ORDER.index(r["group"]) if r["group"] in AGE_ORDER else 99)
+        age_by_club[club_name] = records
+
+    clubs = []
+    for _, row in df_clubs.head(TOP_CLUBS).iterrows():
+        # Cap ROI at +/- 200%: academy-heavy clubs with little investment get absurd ROI
+        roi = max(-200.0, min(200.0, float(row["investment_roi_pct"] or 0)))
+        clubs.append({
+            "name": shorten_club_name(row["club_name"]),
+            "league": club_league.get(row["club_name"], row["league_name"]),
+            "squad_value": int(row["total_squad_value"] or 0),
+            "avg_age": float(row["average_age"] or 0),
+            "star_dependency": float(row["star_dependency_pct"] or 0),
+            "invested_5yr": int(row["invested_5yr"] or 0),
+            "roi": round(roi, 1),
+            "positions": {
+                "Attack": int(row["attack_value"] or 0),
+                "Midfield": int(row["midfield_value"] or 0),
+                "Defender": int(row["defender_value"] or 0),
+                "Goalkeeper": int(row["goalkeeper_value"] or 0),
+            },
+            "age_groups": age_by_club.get(row["club_name"], []),
+        })
+    return clubs
+
+
+def club_histories(df_clubs, df_history) -> dict[str, list[dict]]:
+    """Monthly squad portfolio history of the clubs in ``club_financials.json``,
+    keyed by their display name.
+
+    A separate file, as it is many times the size of the snapshot and only the
+    history chart of the club page reads it.
+    """
+    top = df_clubs.head(TOP_CLUBS)["club_name"]
+    history = {name: club_history(group)
+               for name, group in df_history[df_history["club_name"].isin(top)].groupby("club_name")}
+    return {shorten_club_name(name): history.get(name, []) for name in top}
+
+
+def player_positions(df_treemap, df_hist, df_total) -> dict:
+    return {
+        "treemap": df_treemap.to_dict("records"),
+        "value_distribution": df_hist.to_dict("records"),
+        "total_players": int(df_total.iloc[0, 0]),
+    }
+
+
+def _records(df: pd.DataFrame) -> list[dict]:
+    return df.to_dict("records")
+
+
+# ── Graph ─────────────────────────────────────────────────────────────────────
+
+def build_graph() -> TaskGraph:
+    """All dashboard exports as one task graph."""
+    g = TaskGraph()
+
+    g.output("market_overview.json", g.step("market_overview", market_overview,
+                                            [g.query("q_market_overview", SQL_MKT_OVR)]))
+    g.output("league_comparison.json", g.step("league_comparison", league_comparison,
+                                              [g.query("q_league_comparison", SQL_LGC)]))
+    g.output("top_transfers.json", g.step("top_transfers", _records,
+                                          [g.query("q_top_transfers", SQL_TOPTRANS)]))
+    g.output("age_curves.json", g.step("age_curves", age_curves,
+                                       [g.query("q_age_curves", SQL_AGECURVES)]))
+    g.output("risk_metrics.json", g.step("risk_metrics", risk_metrics, [
+        g.query("q_volatility", SQL_VOL_HEAT),
+        g.step("drawdown", _drawdown_by_position, tables=["fact_valuation_returns", "players"]),
+        g.query("q_depreciation", SQL_DEPR),
+        g.query("q_sharpe", SQL_SHARPE2),
+    ]))
+    g.output("transfer_analytics.json", g.step("transfer_analytics", transfer_analytics, [
+        g.query("q_fee_transfers", SQL_FEE_TRANSFERS),
+        g.step("valuations", _valuations, tables=["player_valuations"]),
+        g.step("transfer_network", _transfer_network, tables=["transfers", "clubs"]),
+    ]))
+    clubs = g.query("q_club_financials", CLUB_FINANCIALS_SQL.read_text(encoding="utf-8"))
+    g.output("club_financials.json", g.step("club_financials", club_financials, [
+        clubs,
+        g.query("q_club_league", SQL_CLUB_LEAGUE),
+        g.query("q_club_age_groups", SQL_CLUB_AGE_GROUPS),
+    ]))
+    g.output("club_history.json", g.step("club_histories", club_histories, [
+        clubs,
+        g.step("club_history", _club_history,
+               tables=["fact_valuation_returns", "transfers", "players", "clubs"]),
+    ]))
+    g.output("player_positions.json", g.step("player_positions", player_positions, [
+        g.query("q_position_treemap", SQL_POS_TREEMAP),
+        g.query("q_value_histogram", SQL_VALUE_HIST),
+        g.query("q_total_players", SQL_TOTAL_PLAYERS),
+    ]))
+    return g
+
+
+def export_dashboard(out_dir: Path = OUT_DIR, workers: int | None = None,
+                     force: bool = False, verbose: bool = True) -> dict[str, str]:
+    """Refresh the dashboard JSON files; returns ``{file: "written" | "unchanged"}``."""
+    return build_graph().run(out_dir, workers=workers, force=force, verbose=verbose)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export dashboard JSON files")
+    parser.add_argument("--out", type=Path, default=OUT_DIR, help="output directory")
+    parser.add_argument("--workers", type=int, default=None, help="concurrent tasks")
+    parser.add_argument("--force", action="store_true", help="rewrite unchanged files too")
+    args = parser.parse_args()
+    export_dashboard(args.out, workers=args.workers, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,307 @@
 """SQLite database connection helpers for the football analytics project."""
 
+import os
+import re
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
+import numpy as np
 import pandas as pd
 
-DB_PATH = Path(__file__).parent.parent.parent / "data" / "processed" / "football.db"
+from .pool import ConnectionPool, open_connection
+from .query_cache import QueryCache, is_cacheable, referenced_tables
+from .tracing import record_cache_hit
+
 DATA_RAW = Path(__file__).parent.parent.parent / "data" / "raw"
 DATA_PROCESSED = Path(__file__).parent.parent.parent / "data" / "processed"
+# FOOTBALL_DB points every helper at another database, e.g. a synthetic one
+DB_PATH = Path(os.environ.get("FOOTBALL_DB") or DATA_PROCESSED / "football.db")
+# Engine for run_query (utils/backends.py): sqlite, duckdb or auto
+BACKEND = os.environ.get("FOOTBALL_BACKEND") or "sqlite"
+
+# Per-table ingestion bookkeeping written by utils/ingest.py
+META_TABLE = "ingest_meta"
+
+# On-disk result cache used by run_query(), built next to the database
+CACHE_SUFFIX = ".query_cache"
+_caches = {}
+
+# Rows per chunk of read_chunks(); text columns with at most this share of
+# distinct values in a chunk become categoricals
+CHUNK_ROWS = 50_000
+CATEGORY_RATIO = 0.5
+
+# Connection pools per (database, profile), see utils/pool.py
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection(profile: str = "write", backend: str = "sqlite"):
+    """Get a new, caller-owned connection to the database.
+
+    ``backend="duckdb"`` returns a read-only DuckDB cursor over the columnar
+    mirror instead (utils/backends.py); its SQL is DuckDB's, see
+    ``backends.translate`` for the SQLite dialect.
+    """
+    if backend == "sqlite":
+        return open_connection(DB_PATH, profile)
+    if profile != "read":
+        raise ValueError(f"The {backend} backend is read-only; use profile='read'")
+    from .backends import duckdb_backend
+
+    return duckdb_backend(DB_PATH).connect()
+
+
+def get_pool(profile: str = "read", db_path: Path | None = None) -> ConnectionPool:
+    """The shared connection pool for ``db_path`` and ``profile``."""
+    key = (Path(db_path or DB_PATH).resolve(), profile)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(key[0], profile)
+        return _pools[key]
+
+
+@contextmanager
+def connection(profile: str = "read"):
+    """Borrow a pooled connection: ``with connection() as conn: ...``"""
+    with get_pool(profile).connection() as conn:
+        yield conn
+
+
+def close_pools():
+    """Close every pooled connection, e.g. before replacing the database."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+def cache_dir(db_path: Path | None = None) -> Path:
+    """Directory of the query result cache of ``db_path``: ``football.db`` -> ``football.query_cache``."""
+    return Path(db_path or DB_PATH).with_suffix(CACHE_SUFFIX)
+
+
+def get_cache() -> QueryCache:
+    """The process-wide query result cache of the current database."""
+    path = cache_dir().resolve()
+    if path not in _caches:
+        _caches[path] = QueryCache(path)
+    return _caches[path]
+
+
+def query_versions(conn: sqlite3.Connection, query: str) -> dict[str, str]:
+    """Content versions of the tables a query mentions.
+
+    Tables without ingestion metadata fall back to the database file's
+    modification stamp, which is coarse but never stale.
+    """
+    tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+    known = table_versions(conn)
+    stamp = None
+    versions = {}
+    for table in referenced_tables(query, tables):
+        if table in known:
+            versions[table] = known[table]
+        else:
+            if stamp is None:
+                files = [DB_PATH, Path(f"{DB_PATH}-wal")]
+                stamp = ":".join(f"{f.stat().st_mtime_ns}.{f.stat().st_size}" for f in files if f.exists())
+            versions[table] = f"file:{stamp}"
+    return versions
+
+
+def run_query(query: str, params: tuple = (), use_cache: bool = True,
+              backend: str | None = None) -> pd.DataFrame:
+    """Execute a SQL query and return results as a DataFrame.
+
+    Deterministic read-only queries are served from the on-disk cache when
+    none of the tables they touch changed since the result was stored.
+    ``backend`` (default :data:`BACKEND`) picks the engine, see
+    utils/backends.py; the SQL is always SQLite's.
+    """
+    backend = backend or BACKEND
+    if backend != "sqlite":
+        from .backends import duckdb_backend, resolve
+
+        backend = resolve(query, backend)
+
+    def execute(conn):
+        if backend == "sqlite":
+            return pd.read_sql_query(query, conn, params=params)
+        return duckdb_backend(DB_PATH).read_sql(query, params)
+
+    with connection("read") as conn:
+        if not (use_cache and is_cacheable(query)):
+            return execute(conn)
+        start = time.perf_counter()
+        cache = get_cache()
+        versions = query_versions(conn, query)
+        key = cache.key(query if backend == "sqlite" else f"-- {backend}\n{query}", params, versions)
+        df = cache.get(key)
+        if df is None:
+            df = execute(conn)
+            cache.put(key, df, sorted(versions))
+        else:
+            record_cache_hit(query, time.perf_counter() - start, len(df))
+        return df
 
 
-def get_connection() -> sqlite3.Connection:
-    """Get a connection to the SQLite database."""
-    DATA_PROCESSED.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
-    return conn
+def downcast(df: pd.DataFrame, category_ratio: float = CATEGORY_RATIO) -> pd.DataFrame:
+    """Narrowest lossless dtypes for a query result, in place.
 
+    Integers shrink to the smallest type holding their range, floats become
+    float32 only when every value survives the round trip, and text columns
+    with few distinct values (positions, league ids, club names) become
+    categoricals.
+    """
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_integer_dtype(s.dtype):
+            df[col] = pd.to_numeric(s, downcast="integer")
+        elif pd.api.types.is_float_dtype(s.dtype):
+            small = s.astype(np.float32)
+            if np.array_equal(small.to_numpy(np.float64), s.to_numpy(np.float64), equal_nan=True):
+                df[col] = small
+        elif pd.api.types.is_object_dtype(s.dtype) or pd.api.types.is_string_dtype(s.dtype):
+            if len(s) and s.nunique() <= category_ratio * len(s):
+                df[col] = s.astype("category")
+    return df
 
-def run_query(query: str, params: tuple = ()) -> pd.DataFrame:
-    """Execute a SQL query and return results as a DataFrame."""
-    conn = get_connection()
-    try:
-        return pd.read_sql_query(query, conn, params=params)
-    finally:
-        conn.close()
 
+def read_chunks(query: str, params: tuple = (),
+                chunksize: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Stream a query's result as downcast DataFrames of ``chunksize`` rows.
 
-def run_sql_file(filepath: str) -> pd.DataFrame:
-    """Read and execute a .sql file, return results as a DataFrame."""
-    with open(filepath, "r", encoding="utf-8") as f:
-        query = f.read()
-    return run_query(query)
+    Not cached: the point is never to hold the whole result. The pooled
+    connection stays borrowed until the iterator is exhausted or closed.
+    """
+    with connection("read") as conn:
+        for chunk in pd.read_sql_query(query, conn, params=params, chunksize=chunksize):
+            yield downcast(chunk)
+
+
+def read_frame(query: str, params: tuple = (), chunksize: int = CHUNK_ROWS) -> pd.DataFrame:
+    """A query's whole result with :func:`downcast` dtypes, built chunk by chunk.
+
+    Peak memory is the compact frame plus one chunk, instead of the row
+    tuples and object columns of a plain ``read_sql_query``.
+    """
+    chunks = list(read_chunks(query, params, chunksize))
+    if not chunks:
+        with connection("read") as conn:
+            return pd.read_sql_query(query, conn, params=params)
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [c[col] for c in chunks]
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            # Chunks have their own categories; plain concat would fall back to object
+            columns[col] = pd.api.types.union_categoricals(parts, ignore_order=True)
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def reduce_query(query: str, reducers: dict, params: tuple = (),
+                 chunksize: int = CHUNK_ROWS) -> dict:
+    """Stream a query through chunk-wise reducers (see utils/reducers.py).
+
+    ``reducers`` maps names to objects with ``update(chunk)`` and
+    ``result()``; returns the results under the same names.
+    """
+    return reduce_chunks(read_chunks(query, params, chunksize), reducers)
+
+
+def reduce_chunks(chunks, reducers: dict) -> dict:
+    """Fold an iterable of DataFrames (e.g. :func:`columnar_chunks`) into ``reducers``."""
+    for chunk in chunks:
+        for reducer in reducers.values():
+            reducer.update(chunk)
+    return {name: reducer.result() for name, reducer in reducers.items()}
+
+
+def read_columnar(table: str, columns=None, years=None, filters=None) -> pd.DataFrame:
+    """Columns of ``table`` from the Parquet mirror of the database (utils/columnar.py).
+
+    Reads only ``columns`` and, for the year-partitioned fact tables, only the
+    partitions of ``years``; files are memory-mapped. A missing or stale
+    mirror of the table is synced first. Needs ``pyarrow``.
+    """
+    from .columnar import read_table
+
+    return read_table(table, columns=columns, years=years, filters=filters)
+
+
+def columnar_chunks(table: str, columns=None, years=None, filters=None,
+                    chunksize: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """:func:`read_columnar` as a stream of chunks, e.g. for utils/reducers.py."""
+    from .columnar import iter_table
+
+    return iter_table(table, columns=columns, years=years, filters=filters, batch_rows=chunksize)
+
+
+def cache_stats() -> dict:
+    """Hit/miss statistics and size of the query result cache."""
+    return get_cache().stats()
+
+
+def split_statements(script: str) -> list[str]:
+    """Split a SQL script into its statements.
+
+    Semicolons inside string literals and comments do not end a statement;
+    comment-only fragments are dropped.
+    """
+    statements, start = [], 0
+    for m in re.finditer(";", script):
+        chunk = script[start:m.end()]
+        if sqlite3.complete_statement(chunk):
+            statements.append(chunk)
+            start = m.end()
+    statements.append(script[start:])
+    return [s.strip() for s in statements
+            if re.sub(r"--[^\n]*|/\*.*?\*/", "", s, flags=re.DOTALL).strip(" \t\n;")]
+
+
+def run_sql_file(filepath: str) -> dict[str, pd.DataFrame]:
+    """Execute every statement of a .sql file; results by statement name.
+
+    Independent statements run concurrently, see utils/sql_runner.py.
+    """
+    from .sql_runner import run_file
+
+    return run_file(Path(filepath))
 
 
 def table_info() -> pd.DataFrame:
     """List all tables in the database with row counts."""
-    conn = get_connection()
-    try:
-        tables = pd.read_sql_query(
-            "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name", conn
+    with connection("read") as conn:
+        tables = [r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name"
+        )]
+        if not tables:
+            return pd.DataFrame(columns=["table", "rows"])
+        # One round trip for all counts instead of one query per table
+        counts = " UNION ALL ".join(
+            f"SELECT {i} AS pos, COUNT(*) AS rows FROM [{t}]" for i, t in enumerate(tables)
         )
-        rows = []
-        for table_name in tables["name"]:
-            count = pd.read_sql_query(f"SELECT COUNT(*) as cnt FROM [{table_name}]", conn)
-            rows.append({"table": table_name, "rows": count["cnt"].iloc[0]})
-        return pd.DataFrame(rows)
-    finally:
-        conn.close()
+        rows = dict(conn.execute(counts).fetchall())
+        return pd.DataFrame({"table": tables, "rows": [rows[i] for i in range(len(tables))]})
+
+
+def table_versions(conn: sqlite3.Connection | None = None) -> dict[str, str]:
+    """Content version of every ingested table, from the ingestion metadata.
+
+    A table's version changes whenever ingestion actually modified it, so
+    downstream caches can compare versions to see which tables changed.
+    """
+    if conn is None:
+        with connection("read") as conn:
+            return table_versions(conn)
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (META_TABLE,)
+    ).fetchone()
+    if not exists:
+        return {}
+    return dict(conn.execute(f"SELECT table_name, version FROM {META_TABLE}").fetchall())
@@ -0,0 +1,114 @@
+"""Typed derived columns on the fact tables, so predicates stay sargable.
+
+Filters like ``strftime('%Y', date) = ...`` or ``substr(date, 1, 7) = ...``
+cannot use an index, and the age formula
+``CAST((julianday(pv.date) - julianday(p.date_of_birth)) / 365.25 AS INTEGER)``
+is evaluated per row, up to four times in ``SQL_DEPR``'s CASE. Ingestion
+adds these columns instead:
+
+- calendar columns on ``player_valuations.date`` (``valuation_*``),
+  ``transfers.transfer_date`` (``transfer_*``) and ``games.date``
+  (``game_*``): ``<prefix>_year`` (INTEGER), ``<prefix>_month``
+  (``'YYYY-MM'``) and ``<prefix>_epoch_day`` (days since 1970-01-01)
+- ``player_valuations.valuation_age``: whole years between the player's
+  date of birth and the valuation, the same formula as the queries
+- ``player_valuations.valuation_age_bracket``: ``U21``, ``21-24``,
+  ``25-27``, ``28-30`` or ``31+``, the brackets of ``SQL_DEPR``
+
+Calendar columns and the bracket are VIRTUAL generated columns. SQLite keeps
+them in step with every insert and update, they take no space in the table
+and their indexes in ``sql/00_create_tables.sql`` hold the values.
+``valuation_age`` depends on ``players`` as well, which a generated column
+cannot read. It is a stored column, registered in ``DERIVED`` with its
+source tables and a refresh function ``fn(conn, since) -> rows`` like the
+tables in ``materialized.py``.
+"""
+
+import sqlite3
+
+# table -> (date column, prefix of its calendar columns)
+CALENDAR_COLUMNS = {
+    "player_valuations": ("date", "valuation"),
+    "transfers": ("transfer_date", "transfer"),
+    "games": ("date", "game"),
+}
+
+# Upper age bound (exclusive) -> bracket; older players are '31+'
+AGE_BRACKETS = [(21, "U21"), (25, "21-24"), (28, "25-27"), (31, "28-30")]
+
+AGE_SQL = "CAST((julianday({date}) - julianday({dob})) / 365.25 AS INTEGER)"
+
+# Stored derived columns, which the raw-file diff of incremental ingestion skips
+STORED_COLUMNS = {"player_valuations": ["valuation_age"]}
+
+
+def _bracket_sql(col: str) -> str:
+    whens = " ".join(f"WHEN {col} < {upper} THEN '{label}'" for upper, label in AGE_BRACKETS)
+    return f"CASE WHEN {col} IS NULL THEN NULL {whens} ELSE '31+' END"
+
+
+def derived_columns(table: str) -> list[tuple[str, str]]:
+    """``(name, declaration)`` of the derived columns of ``table``."""
+    cols = []
+    if table in CALENDAR_COLUMNS:
+        date, prefix = CALENDAR_COLUMNS[table]
+        cols += [
+            (f"{prefix}_year", f"INTEGER GENERATED ALWAYS AS (CAST(substr({date}, 1, 4) AS INTEGER)) VIRTUAL"),
+            (f"{prefix}_month", f"TEXT GENERATED ALWAYS AS (substr({date}, 1, 7)) VIRTUAL"),
+            (f"{prefix}_epoch_day",
+             f"INTEGER GENERATED ALWAYS AS (CAST(julianday(substr({date}, 1, 10)) - 2440587.5 AS INTEGER)) VIRTUAL"),
+        ]
+    if table == "player_valuations":
+        cols += [
+            ("valuation_age", "INTEGER"),
+            ("valuation_age_bracket", f"TEXT GENERATED ALWAYS AS ({_bracket_sql('valuation_age')}) VIRTUAL"),
+        ]
+    return cols
+
+
+def add_derived_columns(conn: sqlite3.Connection) -> int:
+    """Add missing derived columns to the loaded fact tables; returns how many."""
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    added = 0
+    for table in CALENDAR_COLUMNS:
+        if table not in tables:
+            continue
+        # table_xinfo, unlike table_info, lists generated columns too
+        existing = {r[1] for r in conn.execute(f'PRAGMA table_xinfo("{table}")')}
+        for name, decl in derived_columns(table):
+            if name not in existing:
+                conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{name}" {decl}')
+                added += 1
+    return added
+
+
+def refresh_valuation_age(conn: sqlite3.Connection, since: str | None = None) -> int:
+    """Fill ``valuation_age`` (only unset rows from ``since`` onwards if given).
+
+    Rows written by an incremental load start out unset; a change to
+    ``players`` recomputes every row.
+    """
+    conn.execute("DROP TABLE IF EXISTS temp._dob")
+    conn.execute("CREATE TEMP TABLE _dob (player_id INTEGER PRIMARY KEY, date_of_birth TEXT)")
+    conn.execute("""
+        INSERT OR IGNORE INTO temp._dob
+        SELECT player_id, date_of_birth FROM players
+        WHERE player_id IS NOT NULL AND date_of_birth IS NOT NULL
+    """)
+    age = AGE_SQL.format(date="player_valuations.date", dob="d.date_of_birth")
+    where, params = "", ()
+    if since is not None:
+        where, params = "WHERE valuation_age IS NULL AND date >= ?", (since,)
+    cur = conn.execute(f"""
+        UPDATE player_valuations
+        SET valuation_age = (SELECT {age} FROM temp._dob d WHERE d.player_id = player_valuations.player_id)
+        {where}
+    """, params)
+    conn.execute("DROP TABLE temp._dob")
+    return cur.rowcount
+
+
+# column -> (source tables, refresh function)
+DERIVED = {
+    "player_valuations.valuation_age": (["player_valuations", "players"], refresh_valuation_age),
+}
@@ -0,0 +1,204 @@
+"""Feature store behind the predictive feature matrix of ``sql/06_predictive_features.sql``.
+
+The matrix has two kinds of columns:
+
+- per-player history: career totals from ``appearances`` and the valuation
+  and transfer counts. They change only when the player's own data does, so
+  they live in the materialized table ``feature_player`` (``materialized.py``),
+  refreshed at ingest for just the players with new appearances, valuations
+  or transfers since the last build
+- date-dependent: age, contract days remaining and 6-month value momentum,
+  next to the current attributes from ``players``. They are computed when the
+  matrix is served, as of a date (default today); the momentum comes from
+  binary searches in the cached valuation index (``timeseries.py``)
+
+``load_features`` serves the matrix from a Parquet file next to the database
+(``football.db`` -> ``football.features.parquet``), rebuilt only when the
+as-of date or the version of ``feature_player``, ``players`` or
+``fact_valuation_returns`` changes; a column subset reads only those columns.
+Notebook 04 trains its market value model on it. Needs ``pyarrow``.
+
+Usage:
+    python -m notebooks.utils.features                      # refresh the matrix file
+    python -m notebooks.utils.features --as-of 2024-06-30
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import db_helpers
+from .materialized import FEATURE_PLAYER, MATERIALIZED
+from .pool import open_connection
+from .timeseries import ValuationSeries, value_momentum
+
+MATRIX_SUFFIX = ".features.parquet"
+# Tables whose versions key the matrix file
+MATRIX_SOURCES = (FEATURE_PLAYER, "players", "fact_valuation_returns")
+_META_KEY = b"football_features"
+
+# Ordinal league feature of sql/06; every other competition is 6
+LEAGUE_TIERS = {"GB1": 1, "ES1": 2, "L1": 3, "IT1": 4, "FR1": 5}
+
+SQL_PLAYERS = """
+    SELECT player_id, name AS player_name, position, sub_position, height_in_cm, foot,
+           country_of_citizenship, market_value_in_eur AS current_value,
+           highest_market_value_in_eur AS peak_value, date_of_birth, contract_expiration_date,
+           current_club_domestic_competition_id
+    FROM players
+    WHERE market_value_in_eur IS NOT NULL
+      AND market_value_in_eur > 0
+      AND date_of_birth IS NOT NULL
+"""
+
+# Output columns of sql/06, then what the store adds
+FEATURE_COLUMNS = [
+    "player_id", "player_name", "position", "sub_position", "height_in_cm", "foot",
+    "country_of_citizenship", "current_value", "peak_value", "age",
+    "career_goals", "career_assists", "career_minutes", "career_appearances",
+    "goals_per_game", "goals_per_90", "goal_contributions_per_90",
+    "career_yellows", "career_reds", "contract_days_remaining", "league_tier",
+    "value_momentum_6m_pct", "peak_value_ratio",
+    "competitions_played", "n_valuations", "career_transfers", "career_transfer_fees", "as_of",
+]
+_COUNTS = ["career_goals", "career_assists", "career_minutes", "career_appearances",
+           "career_yellows", "career_reds", "competitions_played", "n_valuations", "career_transfers"]
+
+
+def matrix_path(db_path: Path | None = None) -> Path:
+    """Matrix file of ``db_path``: ``football.db`` -> ``football.features.parquet``."""
+    db_path = Path(db_path or db_helpers.DB_PATH)
+    return db_path.with_name(db_path.stem + MATRIX_SUFFIX)
+
+
+def ensure_store(db_path: Path | None = None) -> bool:
+    """Build ``feature_player`` in a database from before the feature store; True if built."""
+    from .ingest import read_meta, write_meta
+
+    conn = open_connection(Path(db_path or db_helpers.DB_PATH), "write", isolation_level=None)
+    try:
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        if FEATURE_PLAYER in tables:
+            return False
+        sources, refresh = MATERIALIZED[FEATURE_PLAYER]
+        meta = read_meta(conn)
+        conn.execute("BEGIN")
+        try:
+            rows = refresh(conn, None)
+            version = "+".join(str(meta.get(s, {}).get("version")) for s in sources)
+            write_meta(conn, FEATURE_PLAYER, None, version, rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+    finally:
+        conn.close()
+
+
+def _days_between(later, earlier) -> np.ndarray:
+    """Days from ``earlier`` to ``later``, with fractions (``julianday`` difference)."""
+    later = pd.to_datetime(later, errors="coerce")
+    earlier = pd.to_datetime(earlier, errors="coerce")
+    return (later - earlier) / pd.Timedelta(days=1)
+
+
+def feature_matrix(conn: sqlite3.Connection, as_of=None,
+                   series: ValuationSeries | None = None) -> pd.DataFrame:
+    """The feature matrix of ``sql/06`` as of a date (default today), from the feature store.
+
+    ``as_of`` stands in for ``'now'`` of the SQL (age, contract days, the
+    momentum's 6-months-ago date); career totals and the latest value cover
+    all loaded data. One row per valued player with a birth date, most
+    valuable first.
+    """
+    as_of = pd.Timestamp(as_of or pd.Timestamp.now()).normalize()
+    if series is None:
+        series = ValuationSeries.cached(conn)
+    df = pd.read_sql_query(SQL_PLAYERS, conn).merge(
+        pd.read_sql_query(f"SELECT * FROM {FEATURE_PLAYER}", conn), on="player_id", how="left")
+    df[_COUNTS] = df[_COUNTS].fillna(0).astype(np.int64)
+    df["career_transfer_fees"] = df["career_transfer_fees"].fillna(0.0)
+
+    df["age"] = np.trunc(_days_between(as_of, df["date_of_birth"]) / 365.25).astype("Int64")
+    # Whole days from the as-of date; sql/06 also subtracts the time of day ('now')
+    df["contract_days_remaining"] = np.trunc(
+        _days_between(df["contract_expiration_date"], as_of)).astype("Int64")
+    games = df["career_appearances"].where(df["career_appearances"] > 0)
+    minutes = df["career_minutes"].where(df["career_minutes"] > 0)
+    df["goals_per_game"] = (df["career_goals"] / games).round(3)
+    df["goals_per_90"] = (df["career_goals"] * 90.0 / minutes).round(3)
+    df["goal_contributions_per_90"] = ((df["career_goals"] + df["career_assists"]) * 90.0 / minutes).round(3)
+    df["league_tier"] = df["current_club_domestic_competition_id"].map(LEAGUE_TIERS).fillna(6).astype(np.int64)
+    momentum = value_momentum(series, df["player_id"].to_numpy(), as_of=as_of, days=180)
+    df["value_momentum_6m_pct"] = momentum["value_momentum_pct"].to_numpy()
+    peak = df["peak_value"].where(df["peak_value"] > 0)
+    df["peak_value_ratio"] = (df["current_value"] / peak).round(3)
+
+    df = df.sort_values("current_value", ascending=False, kind="stable", ignore_index=True)
+    return df[FEATURE_COLUMNS]
+
+
+def _matrix_key(conn: sqlite3.Connection, as_of: pd.Timestamp) -> dict | None:
+    versions = db_helpers.table_versions(conn)
+    key = {"as_of": as_of.strftime("%Y-%m-%d"), "versions": {t: versions.get(t) for t in MATRIX_SOURCES}}
+    # Without a version a table's changes cannot be detected: never reuse the file
+    return None if None in key["versions"].values() else key
+
+
+def load_features(columns=None, as_of=None, db_path: Path | None = None,
+                  force: bool = False) -> pd.DataFrame:
+    """The feature matrix as of ``as_of`` (default today), from its Parquet file.
+
+    The file is rebuilt first when missing or out of date (or with ``force``);
+    ``columns`` reads only those columns.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    db_path = Path(db_path or db_helpers.DB_PATH)
+    as_of = pd.Timestamp(as_of or pd.Timestamp.now()).normalize()
+    path = matrix_path(db_path)
+    ensure_store(db_path)
+    conn = open_connection(db_path, "read")
+    try:
+        key = _matrix_key(conn, as_of)
+        if not force and key is not None and path.exists():
+            stored = (pq.read_schema(path).metadata or {}).get(_META_KEY)
+            if stored is not None and json.loads(stored) == key:
+                return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+        df = feature_matrix(conn, as_of, ValuationSeries.cached(conn, db_path))
+    finally:
+        conn.close()
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, _META_KEY: json.dumps(key)})
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+    return df if columns is None else df[list(columns)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the predictive feature matrix file")
+    parser.add_argument("--as-of", default=None, help="feature date (default today)")
+    parser.add_argument("--force", action="store_true", help="rebuild even if up to date")
+    args = parser.parse_args(argv)
+
+    if not db_helpers.DB_PATH.exists():
+        sys.exit(f"Database not found: {db_helpers.DB_PATH}")
+    start = time.perf_counter()
+    df = load_features(as_of=args.as_of, force=args.force)
+    print(f"{len(df):,} players x {df.shape[1]} features -> {matrix_path()} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
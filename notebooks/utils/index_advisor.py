@@ -0,0 +1,595 @@
+"""Index advisor: derives composite, covering and partial indexes from the project's SQL.
+
+The hand-written indexes in ``sql/00_create_tables.sql`` are single-column
+ones, while the hot queries filter on several columns at once, e.g.
+``player_club_domestic_competition_id IN ('GB1', ...) AND
+market_value_in_eur > 0 AND date >= ...``. The advisor:
+
+1. reads every workload the benchmark knows (``sql/01``-``sql/07`` and the
+   ``queries.SQL_*`` strings the notebooks and the export use)
+2. splits each ``SELECT`` block into its ``WHERE``/``ON`` conjuncts and
+   proposes, per table, a composite index (equality columns, then one range
+   column), a covering one (plus every other column the block reads) and
+   partial ones whose ``WHERE`` repeats the block's constant predicates,
+   e.g. a Big-5-only index
+3. copies the database to a scratch file, runs every workload there under
+   ``EXPLAIN QUERY PLAN`` and the benchmark timer, then adds each candidate
+   alone and re-times the workloads it was proposed for
+4. keeps, per workload, the smallest candidate within 10% of the best gain,
+   applies the kept set together, drops members the set does not need
+   (largest first) and measures every workload again
+
+The result is the full index DDL (kept existing indexes plus the advised
+ones, each with its measured speedup and size) in the layout of the
+schema file, ready to replace its index section (``--write-schema``).
+
+Usage:
+    python -m notebooks.utils.index_advisor
+    python -m notebooks.utils.index_advisor --db data/processed/football_synthetic_x1.db
+    python -m notebooks.utils.index_advisor --only sql/05,LGC --repeat 5 --write-schema
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from . import db_helpers
+from .bench import bench_queries, sql_workloads
+from .ingest import SCHEMA_SQL
+from .pool import open_connection
+
+ADVICE_DIR = db_helpers.DATA_PROCESSED / "index_advisor"
+# Wider covering indexes cost more than they save on these tables
+MAX_COLUMNS = 8
+# A candidate must beat the baseline by both margins to count
+MIN_SPEEDUP = 1.10
+MIN_GAIN_S = 0.005
+# Among near-equal candidates for a workload the smallest wins
+NEAR_BEST = 0.90
+INDEX_SECTION = re.compile(r"(-- INDEXES for query performance\n-- =+\n).*", re.DOTALL)
+TABLE_ABBREV = {"player_valuations": "pv", "appearances": "app", "club_games": "cg",
+                "game_events": "ge"}
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_TOKEN = re.compile(r"""
+    '(?:[^']|'')*'                          # string literal
+  | [\[\"`]\w+[\]\"`]                       # quoted identifier
+  | \d+(?:\.\d+)?(?:[eE][-+]?\d+)?          # number
+  | \w+(?:\.\w+)?                           # identifier, optionally qualified
+  | <=|>=|<>|!=|==|\|\|                     # two-character operators
+  | \S
+""", re.VERBOSE)
+_COMPARE = {"=", "==", "<", ">", "<=", ">=", "in", "between", "is", "like"}
+_EQUALITY = {"=", "==", "in"}
+_CLAUSE_END = {"group", "order", "limit", "having", "window", "union", "except", "intersect",
+               "join", "left", "inner", "cross", "natural", "where", "on", "using", "select",
+               "from"}
+_NOT_ALIAS = {"where", "on", "join", "left", "right", "inner", "outer", "cross", "natural",
+              "group", "order", "limit", "union", "using", "as", "having", "window", "full"}
+
+
+# ── Parsing ──────────────────────────────────────────────────────────────────
+
+def _tree(sql: str) -> list:
+    """Tokens of ``sql`` with every parenthesized group nested as a sub-list."""
+    root = []
+    stack = [root]
+    for tok in _TOKEN.findall(_COMMENT.sub(" ", sql)):
+        if tok == "(":
+            stack[-1].append([])
+            stack.append(stack[-1][-1])
+        elif tok == ")" and len(stack) > 1:
+            stack.pop()
+        else:
+            stack[-1].append(tok.strip('[]"`') if tok[0] in '["`' else tok)
+    return root
+
+
+def _text(items) -> str:
+    out = " ".join(f"({_text(i)})" if isinstance(i, list) else i for i in items)
+    return re.sub(r"\s+,", ",", out)
+
+
+def _word(item) -> str:
+    return item.lower() if isinstance(item, str) else ""
+
+
+def _is_select(items) -> bool:
+    return any(_word(i) == "select" for i in items)
+
+
+def _split(items, word: str) -> list[list]:
+    """Split ``items`` on a top-level keyword (``and``, ``,``)."""
+    parts, current = [], []
+    for item in items:
+        if _word(item) == word:
+            parts.append(current)
+            current = []
+        else:
+            current.append(item)
+    parts.append(current)
+    return [p for p in parts if p]
+
+
+def _clause(items, start: int) -> list:
+    """Items after position ``start`` up to the next clause keyword."""
+    out = []
+    for item in items[start + 1:]:
+        if _word(item) in _CLAUSE_END:
+            break
+        out.append(item)
+    return out
+
+
+class _Block:
+    """One ``SELECT`` block: its tables, predicates and referenced columns."""
+
+    def __init__(self, items: list, schema: dict[str, list[str]]):
+        self.items = items
+        self.schema = schema
+        self.aliases = {}
+        self.star = set()
+        for i, item in enumerate(items):
+            if _word(item) == "from":
+                for ref in _split(_clause(items, i), ","):
+                    self._add_table(ref)
+            elif _word(item) == "join":
+                self._add_table(_clause(items, i))
+
+    def _add_table(self, ref: list):
+        if not ref or not isinstance(ref[0], str) or ref[0].lower() not in self.schema:
+            return
+        table = ref[0].lower()
+        self.aliases[table] = table
+        rest = [r for r in ref[1:] if _word(r) != "as"]
+        if rest and isinstance(rest[0], str) and rest[0].lower() not in _NOT_ALIAS:
+            self.aliases[rest[0].lower()] = table
+
+    @property
+    def tables(self) -> set[str]:
+        return set(self.aliases.values())
+
+    def resolve(self, item) -> tuple[str, str] | None:
+        """``(table, column)`` of an identifier token, if it names a real column."""
+        if not isinstance(item, str) or not re.fullmatch(r"\w+(\.\w+)?", item):
+            return None
+        alias, _, col = item.lower().rpartition(".")
+        if alias:
+            table = self.aliases.get(alias)
+            return (table, col) if table and col in self.schema[table] else None
+        owners = [t for t in self.tables if col in self.schema[t]]
+        return (owners[0], col) if len(owners) == 1 else None
+
+    def _own_items(self, items=None):
+        """Items of this block, descending into non-``SELECT`` groups only."""
+        for item in self.items if items is None else items:
+            if isinstance(item, list):
+                if not _is_select(item):
+                    yield from self._own_items(item)
+            else:
+                yield item
+
+    def columns(self) -> dict[str, set[str]]:
+        used = {t: set() for t in self.tables}
+        items = list(self._own_items())
+        for i, item in enumerate(items):
+            if item == "*" and i and _word(items[i - 1]) in {"select", ","}:
+                self.star |= self.tables
+            elif item == "*" and i > 1 and items[i - 1] == "." and _word(items[i - 2]) in self.aliases:
+                self.star.add(self.aliases[_word(items[i - 2])])
+            ref = self.resolve(item)
+            if ref:
+                used[ref[0]].add(ref[1])
+        return used
+
+    def predicates(self) -> list[dict]:
+        """Sargable ``WHERE``/``ON`` conjuncts: column, operator, constant text."""
+        preds = []
+        for i, item in enumerate(self.items):
+            if _word(item) not in {"where", "on"}:
+                continue
+            conjuncts = _split(_clause(self.items, i), "and")
+            # Re-attach the upper bound of BETWEEN, which the split cut off
+            merged = []
+            for c in conjuncts:
+                if merged and any(_word(x) == "between" for x in merged[-1]) \
+                        and sum(_word(x) == "and" for x in merged[-1]) == 0 and len(merged[-1]) < 5:
+                    merged[-1] = merged[-1] + ["AND"] + c
+                else:
+                    merged.append(c)
+            for c in merged:
+                preds += self._predicate(c)
+        return preds
+
+    def _predicate(self, items: list) -> list[dict]:
+        if any(_word(x) == "or" for x in items) or len(items) < 2:
+            return []
+        op = _word(items[1])
+        ref = self.resolve(items[0])
+        if not ref or op not in _COMPARE:
+            return []
+        rhs = items[2:]
+        if op == "is":
+            kind = "eq" if [_word(x) for x in rhs] == ["null"] else "range"
+        elif op == "like":
+            kind = "range" if rhs and re.fullmatch(r"'[^%_]+%'", str(rhs[0])) else None
+        else:
+            kind = "eq" if op in _EQUALITY else "range"
+        if kind is None:
+            return []
+        other = self.resolve(rhs[0]) if len(rhs) == 1 else None
+        if other and op in _EQUALITY:  # join
+            return [{"table": ref[0], "column": ref[1], "kind": "eq", "const": None},
+                    {"table": other[0], "column": other[1], "kind": "eq", "const": None}]
+        constant = not any(
+            self.resolve(x) or (isinstance(x, list) and _is_select(x))
+            or (isinstance(x, str) and re.fullmatch(r"[A-Za-z_][\w.]*", x)
+                and x.lower() not in {"null", "not", "and"})
+            for x in _flatten(rhs)
+        )
+        const = f"{ref[1]} {_text(items[1:])}" if constant else None
+        return [{"table": ref[0], "column": ref[1], "kind": kind, "const": const}]
+
+    def order_columns(self) -> list[tuple[str, str]]:
+        out = []
+        for i, item in enumerate(self.items):
+            if _word(item) in {"group", "order"} and i + 1 < len(self.items) \
+                    and _word(self.items[i + 1]) == "by":
+                for part in _split(_clause(self.items, i + 1), ","):
+                    ref = self.resolve(part[0]) if len(part) <= 2 else None
+                    if not ref:
+                        break
+                    out.append(ref)
+        return out
+
+
+def _flatten(items):
+    for item in items:
+        if isinstance(item, list):
+            yield from _flatten(item)
+        else:
+            yield item
+
+
+def _blocks(items: list, schema: dict):
+    if _is_select(items):
+        yield _Block(items, schema)
+    for item in items:
+        if isinstance(item, list):
+            yield from _blocks(item, schema)
+
+
+def read_schema(conn: sqlite3.Connection) -> dict[str, list[str]]:
+    """Columns of every user table, by lower-case table name."""
+    tables = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    return {t.lower(): [r[1].lower() for r in conn.execute(f"PRAGMA table_xinfo([{t}])")]
+            for t in tables}
+
+
+# ── Candidates ───────────────────────────────────────────────────────────────
+
+def _index_name(table: str, cols: tuple, where: str | None) -> str:
+    digest = hashlib.sha1(f"{table}|{cols}|{where}".encode()).hexdigest()[:6]
+    prefix = TABLE_ABBREV.get(table, table)
+    return f"idx_{prefix}_{cols[0]}_{'p' if where else 'c'}{digest}"
+
+
+def _candidate(table: str, cols, where: str | None = None) -> dict | None:
+    cols = tuple(dict.fromkeys(cols))
+    if not cols or len(cols) > MAX_COLUMNS:
+        return None
+    name = _index_name(table, cols, where)
+    ddl = f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(cols)})"
+    if where:
+        ddl += f" WHERE {where}"
+    return {"name": name, "table": table, "columns": cols, "where": where, "ddl": ddl}
+
+
+def propose(sql: str, schema: dict[str, list[str]]) -> list[dict]:
+    """Composite, covering and partial index candidates for one statement."""
+    out = []
+    for block in _blocks(_tree(sql), schema):
+        used = block.columns()
+        preds = block.predicates()
+        order = block.order_columns()
+        for table in block.tables:
+            mine = [p for p in preds if p["table"] == table]
+            eq = [p["column"] for p in mine if p["kind"] == "eq" and p["const"] is None] \
+                + [p["column"] for p in mine if p["kind"] == "eq" and p["const"] is not None]
+            ranges = [p["column"] for p in mine if p["kind"] == "range"]
+            sort = [c for t, c in order if t == table]
+            key = list(dict.fromkeys(eq + ranges[:1])) or sort
+            if not key and not mine:
+                continue
+            covering = table not in block.star
+            rest = sorted(used[table] - set(key))
+            out.append(_candidate(table, key))
+            if covering:
+                out.append(_candidate(table, key + rest))
+            consts = sorted({p["const"] for p in mine if p["const"]})
+            if not consts:
+                continue
+            # Partial indexes: the constant predicates become the index WHERE,
+            # once all of them and once the IN lists alone (the Big-5 filter)
+            variants = {tuple(consts), tuple(c for c in consts if " in " in c.lower())}
+            for variant in filter(None, variants):
+                fixed = {p["column"] for p in mine if p["const"] in variant}
+                pkey = [c for c in key if c not in fixed]
+                where = " AND ".join(variant)
+                out.append(_candidate(table, pkey or sort, where))
+                if covering:
+                    out.append(_candidate(table, pkey + sorted(used[table] - set(pkey)), where))
+    unique = {}
+    for cand in filter(None, out):
+        unique.setdefault(cand["name"], cand)
+    return list(unique.values())
+
+
+# ── Measurement ──────────────────────────────────────────────────────────────
+
+def _used_bytes(conn: sqlite3.Connection) -> int:
+    pages = conn.execute("PRAGMA page_count").fetchone()[0] - \
+        conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return pages * conn.execute("PRAGMA page_size").fetchone()[0]
+
+
+def _plan_indexes(conn: sqlite3.Connection, sql: str) -> set[str]:
+    try:
+        details = [r[3] for r in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    except sqlite3.Error:
+        return set()
+    return {m for d in details for m in re.findall(r"USING (?:COVERING )?INDEX (\w+)", d)}
+
+
+def _timings(conn, workloads, repeat: int) -> dict[str, dict]:
+    records, _ = bench_queries(conn, workloads, repeat)
+    return {r["name"]: r for r in records}
+
+
+def _create(conn: sqlite3.Connection, cand: dict) -> int:
+    """Create ``cand`` with statistics; returns its size in bytes."""
+    before = _used_bytes(conn)
+    conn.execute(cand["ddl"])
+    conn.execute(f"ANALYZE {cand['name']}")
+    conn.commit()
+    return _used_bytes(conn) - before
+
+
+def existing_indexes(conn: sqlite3.Connection) -> list[dict]:
+    rows = conn.execute(
+        "SELECT name, tbl_name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")
+    out = []
+    for name, table, sql in rows:
+        cols = re.search(r"\(([^)]*)\)", sql).group(1)
+        where = re.search(r"\bWHERE\b(.*)$", sql, re.IGNORECASE | re.DOTALL)
+        out.append({
+            "name": name, "table": table.lower(),
+            "columns": tuple(c.strip().lower() for c in cols.split(",")),
+            "where": where.group(1).strip() if where else None,
+            "ddl": re.sub(r"^CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ", sql),
+        })
+    return out
+
+
+def advise(db_path: Path = None, only=None, repeat: int = 3, scratch_dir: Path = ADVICE_DIR,
+           verbose: bool = True) -> dict:
+    """Propose, measure and select indexes for every workload against ``db_path``."""
+    db_path = Path(db_path or db_helpers.DB_PATH)
+    workloads = [(n, s) for n, s in sql_workloads() if not only or any(p in n for p in only)]
+    scratch_dir = Path(scratch_dir)
+    scratch_dir.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=scratch_dir))
+    scratch = tmp / "scratch.db"
+    try:
+        src = open_connection(db_path, "read")
+        try:
+            schema = read_schema(src)
+            dst = sqlite3.connect(scratch)
+            src.backup(dst)
+            dst.close()
+        finally:
+            src.close()
+        conn = open_connection(scratch, "write")
+        try:
+            return _advise(conn, workloads, schema, repeat, verbose) | {"db": str(db_path)}
+        finally:
+            conn.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _total(timings: dict, names) -> float:
+    return sum(timings[n].get("wall_s") or 0 for n in names)
+
+
+def _prune(conn, chosen: dict, workloads, final: dict, repeat: int, verbose: bool):
+    """Drop chosen indexes the combined set does not need, largest first.
+
+    Indexes picked one workload at a time can overlap or make the planner
+    choose worse plans elsewhere; an index stays only if dropping it slows
+    the workloads whose plans use it by the same margins a candidate needs.
+    """
+    for cand in sorted(chosen.values(), key=lambda c: -c["size_bytes"]):
+        users = [(w, sql) for w, sql in workloads if cand["name"] in _plan_indexes(conn, sql)]
+        conn.execute(f"DROP INDEX {cand['name']}")
+        conn.commit()
+        without = _timings(conn, users, repeat) if users else {}
+        names = [w for w, _ in users]
+        kept_s, dropped_s = _total(final, names), _total(without, names)
+        if users and dropped_s >= kept_s * MIN_SPEEDUP and dropped_s - kept_s >= MIN_GAIN_S:
+            _create(conn, cand)
+            continue
+        del chosen[cand["name"]]
+        final.update(without)
+        if verbose:
+            print(f"  dropped {cand['name']}: {dropped_s:.3f}s without vs {kept_s:.3f}s with")
+
+
+def _advise(conn, workloads, schema, repeat, verbose) -> dict:
+    candidates = {}
+    for name, sql in workloads:
+        for cand in propose(sql, schema):
+            candidates.setdefault(cand["name"], {**cand, "workloads": []})["workloads"].append(name)
+    existing = existing_indexes(conn)
+    known = {(e["table"], e["columns"], e["where"]) for e in existing}
+    candidates = {n: c for n, c in candidates.items()
+                  if (c["table"], c["columns"], c["where"]) not in known}
+    by_name = dict(workloads)
+    if verbose:
+        print(f"{len(workloads)} workloads, {len(candidates)} candidate indexes")
+
+    base = _timings(conn, workloads, repeat)
+    for i, cand in enumerate(candidates.values(), 1):
+        try:
+            cand["size_bytes"] = _create(conn, cand)
+        except sqlite3.Error as e:
+            cand["error"] = str(e)
+            continue
+        targets = [(w, by_name[w]) for w in cand["workloads"]
+                   if cand["name"] in _plan_indexes(conn, by_name[w])]
+        timed = _timings(conn, targets, repeat) if targets else {}
+        cand["gains"] = {}
+        for w, rec in timed.items():
+            before, after = base[w].get("wall_s"), rec.get("wall_s")
+            if before and after is not None:
+                cand["gains"][w] = {"before_s": before, "after_s": after,
+                                    "vm_before": base[w].get("vm_steps"), "vm_after": rec.get("vm_steps")}
+        conn.execute(f"DROP INDEX {cand['name']}")
+        conn.commit()
+        if verbose:
+            best = max((g["before_s"] / max(g["after_s"], 1e-4) for g in cand["gains"].values()), default=0)
+            print(f"  [{i}/{len(candidates)}] {cand['name']}: {cand['size_bytes'] / 2**20:.1f} MB, "
+                  f"used by {len(cand['gains'])}, best {best:.1f}x")
+
+    chosen = {}
+    for w, _ in workloads:
+        options = []
+        for cand in candidates.values():
+            g = cand.get("gains", {}).get(w)
+            if g and g["before_s"] >= g["after_s"] * MIN_SPEEDUP and g["before_s"] - g["after_s"] >= MIN_GAIN_S:
+                options.append((g["before_s"] - g["after_s"], cand))
+        if not options:
+            continue
+        best = max(gain for gain, _ in options)
+        pick = min((c for gain, c in options if gain >= best * NEAR_BEST), key=lambda c: c["size_bytes"])
+        chosen[pick["name"]] = pick
+
+    for cand in chosen.values():
+        cand["size_bytes"] = _create(conn, cand)
+    final = _timings(conn, workloads, repeat)
+    _prune(conn, chosen, workloads, final, repeat, verbose)
+    final = _timings(conn, workloads, repeat)
+    plans = {w: _plan_indexes(conn, sql) for w, sql in workloads}
+    used = set().union(*plans.values()) if plans else set()
+
+    rows = []
+    for w, _ in workloads:
+        b, f = base.get(w, {}), final.get(w, {})
+        rows.append({"name": w, "before_s": b.get("wall_s"), "after_s": f.get("wall_s"),
+                     "vm_before": b.get("vm_steps"), "vm_after": f.get("vm_steps"),
+                     "indexes": sorted(plans[w] & set(chosen)), "error": f.get("error")})
+    for e in existing:
+        e["used"] = e["name"] in used
+        e["superseded_by"] = next(
+            (c["name"] for c in chosen.values() if c["table"] == e["table"] and c["where"] is None
+             and e["where"] is None and c["columns"][:len(e["columns"])] == e["columns"]
+             and c["name"] in used), None)
+    for cand in chosen.values():
+        cand["workloads"] = [r["name"] for r in rows if cand["name"] in r["indexes"]]
+    return {
+        "workloads": rows,
+        "candidates": [{k: v for k, v in c.items() if k != "ddl"} for c in candidates.values()],
+        "chosen": list(chosen.values()),
+        "existing": existing,
+        "ddl": index_ddl(existing, list(chosen.values()), rows),
+    }
+
+
+# ── Output ───────────────────────────────────────────────────────────────────
+
+def index_ddl(existing: list[dict], chosen: list[dict], rows: list[dict]) -> str:
+    """The adopted index set, grouped by table, in the schema file's layout."""
+    timing = {r["name"]: r for r in rows}
+    lines = []
+    for table in sorted({i["table"] for i in existing + chosen}):
+        lines.append(f"-- {table}")
+        for e in (e for e in existing if e["table"] == table):
+            if e.get("superseded_by"):
+                lines.append(f"-- superseded by {e['superseded_by']}: {e['ddl']};")
+                continue
+            if not e.get("used"):
+                lines.append("-- (not used by the analysis SQL; kept for lookups and joins)")
+            lines.append(f"{e['ddl']};")
+        for c in (c for c in chosen if c["table"] == table):
+            speedups = []
+            for w in c["workloads"]:
+                r = timing[w]
+                if r["before_s"] and r["after_s"]:
+                    speedups.append(f"{w} {r['before_s'] / max(r['after_s'], 1e-4):.1f}x")
+            lines.append(f"-- advised, {c['size_bytes'] / 2**20:.1f} MB: {', '.join(speedups) or 'n/a'}")
+            lines.append(f"{c['ddl']};")
+        lines.append("")
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def write_schema(ddl: str, path: Path = SCHEMA_SQL):
+    """Replace the index section of the schema DDL with ``ddl``."""
+    text = path.read_text(encoding="utf-8")
+    if not INDEX_SECTION.search(text):
+        raise ValueError(f"No index section found in {path}")
+    path.write_text(INDEX_SECTION.sub(lambda m: m.group(1) + "\n" + ddl, text), encoding="utf-8")
+
+
+def report_frame(advice: dict) -> pd.DataFrame:
+    df = pd.DataFrame(advice["workloads"])
+    df["speedup"] = (df["before_s"] / df["after_s"].clip(lower=1e-4)).round(2)
+    df["indexes"] = df["indexes"].str.join(", ")
+    return df.sort_values("before_s", ascending=False, ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Derive and measure indexes for the project's SQL")
+    parser.add_argument("--db", type=Path, default=None, help="database to analyse (default football.db)")
+    parser.add_argument("--only", help="comma-separated substrings of workload names")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per workload")
+    parser.add_argument("--out", type=Path, default=ADVICE_DIR / "indexes.sql",
+                        help="where to write the advised index DDL")
+    parser.add_argument("--write-schema", action="store_true",
+                        help=f"also replace the index section of {SCHEMA_SQL.name}")
+    args = parser.parse_args(argv)
+
+    db_path = args.db or db_helpers.DB_PATH
+    if not Path(db_path).exists():
+        sys.exit(f"Database not found: {db_path}")
+    only = [p.strip() for p in args.only.split(",")] if args.only else None
+    advice = advise(db_path, only=only, repeat=args.repeat)
+
+    with pd.option_context("display.width", 200, "display.max_rows", None, "display.max_colwidth", 60):
+        cols = ["name", "before_s", "after_s", "speedup", "vm_before", "vm_after", "indexes"]
+        print(report_frame(advice)[cols].to_string(index=False))
+    size = sum(c["size_bytes"] for c in advice["chosen"]) / 2**20
+    before = sum(r["before_s"] or 0 for r in advice["workloads"])
+    after = sum(r["after_s"] or 0 for r in advice["workloads"])
+    print(f"\n{len(advice['chosen'])} advised indexes, {size:.1f} MB; "
+          f"all workloads {before:.2f}s -> {after:.2f}s")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(advice["ddl"], encoding="utf-8")
+    args.out.with_suffix(".json").write_text(json.dumps(advice, indent=2, default=str))
+    print(f"Index DDL: {args.out}")
+    if args.write_schema:
+        write_schema(advice["ddl"])
+        print(f"Updated {SCHEMA_SQL}")
+
+
+if __name__ == "__main__":
+    main()
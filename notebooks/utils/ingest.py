@@ -0,0 +1,788 @@
+"""Streaming CSV-to-SQLite bulk loader for the Transfermarkt dataset.
+
+Replaces the all-in-memory ingestion of ``01_data_ingestion.ipynb``: every CSV
+is parsed in fixed-size chunks by a pool of worker processes, coerced with the
+same ``DATE_COLUMNS`` / ``NUMERIC_COLUMNS`` rules as the notebook, and
+bulk-inserted into SQLite in large transactions. Indexes from
+``sql/00_create_tables.sql`` are created only after all data is in.
+
+With ``--incremental`` an existing database is refreshed in place: each raw
+file is fingerprinted, unchanged files are skipped before anything is
+parsed, files that only grew by appended rows have just their new tail
+loaded, and other changed files are diffed against the table by natural key
+so only new or changed rows are written. Per-table watermarks and content versions are kept in the
+``ingest_meta`` table.
+
+Both modes add the derived columns of ``derived.py`` (calendar keys, age at
+valuation) and finish by refreshing them and the aggregate tables in
+``materialized.py``, incrementally from the earliest changed date where
+possible.
+
+Run from project root: python -m notebooks.utils.ingest [--incremental]
+"""
+
+import hashlib
+import io
+import multiprocessing as mp
+import os
+import re
+import sqlite3
+import time
+import traceback
+from pathlib import Path
+
+import pandas as pd
+
+from .db_helpers import DATA_RAW, DB_PATH, META_TABLE
+from .derived import DERIVED, STORED_COLUMNS, add_derived_columns
+from .materialized import MATERIALIZED
+from .pool import open_connection
+
+SQL_DIR = Path(__file__).parent.parent.parent / "sql"
+SCHEMA_SQL = SQL_DIR / "00_create_tables.sql"
+
+CSV_FILES = {
+    "appearances": "appearances.csv",
+    "clubs": "clubs.csv",
+    "competitions": "competitions.csv",
+    "games": "games.csv",
+    "players": "players.csv",
+    "player_valuations": "player_valuations.csv",
+    "transfers": "transfers.csv",
+    "club_games": "club_games.csv",
+    "game_events": "game_events.csv",
+}
+
+DATE_COLUMNS = {
+    "games": ["date"],
+    "appearances": ["date"],
+    "players": ["date_of_birth", "contract_expiration_date"],
+    "player_valuations": ["date"],
+    "transfers": ["transfer_date"],
+}
+
+NUMERIC_COLUMNS = {
+    "players": ["market_value_in_eur", "highest_market_value_in_eur", "height_in_cm"],
+    "player_valuations": ["market_value_in_eur"],
+    "transfers": ["transfer_fee", "market_value_in_eur"],
+    "clubs": ["total_market_value", "squad_size", "average_age"],
+    "games": ["home_club_goals", "away_club_goals", "attendance"],
+    "appearances": ["goals", "assists", "minutes_played", "yellow_cards", "red_cards"],
+}
+
+# Natural key per table, used to detect new or changed rows on incremental runs.
+# Not necessarily unique: a player can have two transfers on the same day.
+NATURAL_KEYS = {
+    "player_valuations": ["player_id", "date"],
+    "transfers": ["player_id", "transfer_date"],
+    "players": ["player_id"],
+    "clubs": ["club_id"],
+    "competitions": ["competition_id"],
+    "games": ["game_id"],
+    "appearances": ["appearance_id"],
+    "club_games": ["game_id", "club_id"],
+    "game_events": ["game_event_id"],
+}
+
+# Date column per table whose earliest changed value is recorded as watermark.
+WATERMARK_COLUMNS = {
+    "player_valuations": "date",
+    "transfers": "transfer_date",
+    "games": "date",
+    "appearances": "date",
+    "game_events": "date",
+}
+
+META_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {META_TABLE} (
+        table_name TEXT PRIMARY KEY,
+        source_file TEXT,
+        file_size INTEGER,
+        file_mtime_ns INTEGER,
+        file_sha256 TEXT,
+        version TEXT,
+        row_count INTEGER,
+        delta_rows INTEGER,
+        changed_since TEXT,
+        ingested_at TEXT
+    )
+"""
+
+# Rows per parsed chunk; peak memory is roughly (workers + queue depth) chunks.
+CHUNK_ROWS = 100_000
+# Rows inserted between commits.
+COMMIT_ROWS = 1_000_000
+
+# Load-time pragmas: the database is built in a scratch file that is only
+# moved into place once complete, so durability during the load is not needed.
+LOAD_PRAGMAS = [
+    "PRAGMA journal_mode=OFF",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA locking_mode=EXCLUSIVE",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",
+]
+
+# Same text format pandas.to_sql used, so string date comparisons keep working.
+SQL_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def coerce_chunk(table: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Apply the notebook's date and numeric coercions to one chunk."""
+    for col in DATE_COLUMNS.get(table, []):
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    for col in NUMERIC_COLUMNS.get(table, []):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def read_csv_chunks(table: str, path: Path, chunksize: int = CHUNK_ROWS):
+    """Yield coerced DataFrame chunks of one raw CSV file."""
+    for chunk in pd.read_csv(path, chunksize=chunksize, low_memory=False):
+        yield coerce_chunk(table, chunk)
+
+
+def sqlite_type(dtype) -> str:
+    """Map a pandas dtype to the SQLite column type pandas.to_sql would use."""
+    if pd.api.types.is_bool_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "TIMESTAMP"
+    return "TEXT"
+
+
+def chunk_schema(df: pd.DataFrame) -> list[tuple[str, str]]:
+    """Column names and SQLite types of a coerced chunk."""
+    return [(col, sqlite_type(dtype)) for col, dtype in df.dtypes.items()]
+
+
+# Widening order of column types; anything mixed with a timestamp is text
+_TYPE_RANK = {"INTEGER": 0, "REAL": 1, "TEXT": 2}
+
+
+def widen_schema(declared: list[tuple[str, str]],
+                 schema: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """Column types that hold both ``declared`` and a later chunk's ``schema``.
+
+    Chunks are typed on their own, so an integer column with a missing or
+    fractional value further down turns up as REAL only there. The widened
+    types are what pandas infers for the whole file: integers mixed with
+    floats become REAL, any other mix becomes TEXT.
+    """
+    types = dict(schema)
+    widened = []
+    for col, old in declared:
+        new = types.get(col, old)
+        if new != old:
+            if old in _TYPE_RANK and new in _TYPE_RANK:
+                new = max(old, new, key=_TYPE_RANK.get)
+            else:
+                new = "TEXT"
+        widened.append((col, new))
+    return widened
+
+
+def retype_table(conn: sqlite3.Connection, table: str, schema: list[tuple[str, str]]):
+    """Recreate an unindexed ``table`` with the column types of ``schema``, keeping its rows."""
+    conn.execute(f'ALTER TABLE "{table}" RENAME TO "_retype_{table}"')
+    conn.execute(create_table_sql(table, schema))
+    conn.execute(f'INSERT INTO "{table}" SELECT * FROM "_retype_{table}"')
+    conn.execute(f'DROP TABLE "_retype_{table}"')
+
+
+def chunk_rows(df: pd.DataFrame) -> list[tuple]:
+    """Convert a chunk to plain Python tuples ready for executemany()."""
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col].dtype):
+            df[col] = df[col].dt.strftime(SQL_DATETIME_FORMAT)
+    df = df.astype(object).where(df.notna(), None)
+    return list(df.itertuples(index=False, name=None))
+
+
+def create_table_sql(table: str, schema: list[tuple[str, str]]) -> str:
+    cols = ", ".join(f'"{name}" {sql_type}' for name, sql_type in schema)
+    return f'CREATE TABLE "{table}" ({cols})'
+
+
+def insert_sql(table: str, columns: list[str]) -> str:
+    names = ", ".join(f'"{c}"' for c in columns)
+    marks = ", ".join("?" for _ in columns)
+    return f'INSERT INTO "{table}" ({names}) VALUES ({marks})'
+
+
+def index_statements(ddl_path: Path = SCHEMA_SQL) -> list[str]:
+    """Extract the CREATE INDEX statements from the schema DDL file."""
+    text = ddl_path.read_text(encoding="utf-8")
+    text = re.sub(r"--[^\n]*", "", text)
+    return [s.strip() for s in text.split(";") if s.strip().upper().startswith("CREATE INDEX")]
+
+
+def _parse_worker(jobs, raw_dir, chunksize, queue):
+    """Worker process: parse the assigned CSVs and push row batches to the queue."""
+    try:
+        for table, filename in jobs:
+            for chunk in read_csv_chunks(table, Path(raw_dir) / filename, chunksize):
+                queue.put((table, chunk_schema(chunk), chunk_rows(chunk)))
+            queue.put((table, None, None))
+    except Exception:
+        queue.put(("__error__", None, traceback.format_exc()))
+
+
+def _assign_jobs(files: dict[str, Path], workers: int) -> list[list[tuple[str, str]]]:
+    """Spread files over workers, largest first, so big files run side by side."""
+    buckets = [[] for _ in range(workers)]
+    sizes = [0] * workers
+    for table, path in sorted(files.items(), key=lambda kv: -kv[1].stat().st_size):
+        i = sizes.index(min(sizes))
+        buckets[i].append((table, path.name))
+        sizes[i] += path.stat().st_size
+    return [b for b in buckets if b]
+
+
+def load_tables(conn: sqlite3.Connection, files: dict[str, Path],
+                workers: int | None = None, chunksize: int = CHUNK_ROWS,
+                replace: bool = True) -> dict[str, int]:
+    """Stream the given CSVs into ``conn`` using parallel parser processes.
+
+    Each table is created with the types of its first chunk and widened
+    (:func:`widen_schema`) when a later chunk needs wider ones.
+
+    Returns the number of rows loaded per table.
+    """
+    if not files:
+        return {}
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files)))
+    raw_dir = str(next(iter(files.values())).parent)
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue(maxsize=workers * 2)
+    procs = [
+        ctx.Process(target=_parse_worker, args=(jobs, raw_dir, chunksize, queue), daemon=True)
+        for jobs in _assign_jobs(files, workers)
+    ]
+    for p in procs:
+        p.start()
+
+    counts = {table: 0 for table in files}
+    declared = {}
+    pending = len(files)
+    since_commit = 0
+    try:
+        conn.execute("BEGIN")
+        while pending:
+            table, schema, rows = queue.get()
+            if table == "__error__":
+                raise RuntimeError(f"CSV parser failed:\n{rows}")
+            if schema is None:
+                pending -= 1
+                continue
+            if table not in declared:
+                if replace:
+                    conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+                conn.execute(create_table_sql(table, schema))
+                declared[table] = schema
+            elif schema != declared[table]:
+                wider = widen_schema(declared[table], schema)
+                if wider != declared[table]:
+                    retype_table(conn, table, wider)
+                    declared[table] = wider
+            conn.executemany(insert_sql(table, [c for c, _ in schema]), rows)
+            counts[table] += len(rows)
+            since_commit += len(rows)
+            if since_commit >= COMMIT_ROWS:
+                conn.execute("COMMIT")
+                conn.execute("BEGIN")
+                since_commit = 0
+        conn.execute("COMMIT")
+    finally:
+        for p in procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+    return counts
+
+
+def create_indexes(conn: sqlite3.Connection, ddl_path: Path = SCHEMA_SQL) -> int:
+    """Create the indexes from the schema DDL; skips tables that were not loaded.
+
+    Tables whose natural key no DDL index covers also get a key index, the
+    one incremental runs diff on, so full and incremental builds end up with
+    the same schema.
+    """
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    created = 0
+    for stmt in index_statements(ddl_path):
+        target = re.search(r"\bON\s+(\w+)", stmt, re.IGNORECASE)
+        if target and target.group(1) in tables:
+            conn.execute(stmt)
+            created += 1
+    for table, keys in NATURAL_KEYS.items():
+        if table in tables and set(keys) <= {c for c, _ in table_columns(conn, table)}:
+            created += ensure_key_index(conn, table, keys)
+    conn.commit()
+    return created
+
+
+def file_fingerprint(path: Path, known: dict | None = None) -> dict:
+    """Size, mtime and SHA-256 of a raw file.
+
+    The hash is reused from ``known`` when size and mtime are unchanged, so
+    untouched files are not re-read. When the file grew, ``appended_from`` is
+    the old size if the file up to there, ending in a complete line, still
+    hashes to the known SHA, i.e. rows were only appended.
+    """
+    st = path.stat()
+    appended_from = None
+    if known and known["file_size"] == st.st_size and known["file_mtime_ns"] == st.st_mtime_ns:
+        sha = known["file_sha256"]
+    else:
+        digest = hashlib.sha256()
+        cut = known["file_size"] if known and 0 < (known["file_size"] or 0) < st.st_size else None
+        done = 0
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                if cut is not None and done < cut <= done + len(block):
+                    at = cut - done
+                    digest.update(block[:at])
+                    if digest.hexdigest() == known["file_sha256"] and block[at - 1:at] == b"\n":
+                        appended_from = cut
+                    digest.update(block[at:])
+                else:
+                    digest.update(block)
+                done += len(block)
+        sha = digest.hexdigest()
+    return {
+        "source_file": path.name,
+        "file_size": st.st_size,
+        "file_mtime_ns": st.st_mtime_ns,
+        "file_sha256": sha,
+        "appended_from": appended_from,
+    }
+
+
+def read_meta(conn: sqlite3.Connection) -> dict[str, dict]:
+    """Ingestion metadata per table (empty if the table does not exist yet)."""
+    conn.execute(META_DDL)
+    cur = conn.execute(f"SELECT * FROM {META_TABLE}")
+    names = [d[0] for d in cur.description]
+    return {row[0]: dict(zip(names, row)) for row in cur.fetchall()}
+
+
+def write_meta(conn: sqlite3.Connection, table: str, fingerprint: dict | None,
+               version: str, delta_rows: int, changed_since: str | None = None):
+    """Record fingerprint, content version and watermark for one table."""
+    conn.execute(META_DDL)
+    fp = fingerprint or {"source_file": None, "file_size": None,
+                         "file_mtime_ns": None, "file_sha256": None}
+    row_count = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    conn.execute(
+        f"INSERT OR REPLACE INTO {META_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))",
+        (table, fp["source_file"], fp["file_size"], fp["file_mtime_ns"], fp["file_sha256"],
+         version, row_count, delta_rows, changed_since),
+    )
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> list[tuple[str, str]]:
+    """Column names and declared types of an existing table."""
+    return [(r[1], r[2]) for r in conn.execute(f'PRAGMA table_info("{table}")')]
+
+
+def ensure_key_index(conn: sqlite3.Connection, table: str, keys: list[str]) -> int:
+    """Make sure some index starts with the natural key columns.
+
+    Returns 1 if an index had to be created, else 0.
+    """
+    for idx in conn.execute(f'PRAGMA index_list("{table}")').fetchall():
+        cols = [r[2] for r in conn.execute(f'PRAGMA index_info("{idx[1]}")')]
+        if cols[:len(keys)] == keys:
+            return 0
+    cols = ", ".join(f'"{k}"' for k in keys)
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_natural_key" ON "{table}" ({cols})')
+    return 1
+
+
+class SchemaChanged(Exception):
+    """Raised when a raw file's columns or column types no longer fit the stored table."""
+
+
+def upsert_delta(conn: sqlite3.Connection, table: str, path: Path, keys: list[str],
+                 chunksize: int = CHUNK_ROWS) -> tuple[int, str | None]:
+    """Write only new or changed rows of ``path`` into ``table``.
+
+    The whole file is staged in a temp table first, then compared to the
+    stored rows per natural key as a multiset: a key whose rows differ in any
+    value or in how often a row occurs is replaced as a group. Keys need not
+    be unique (a player can have two transfers on one day). Rows whose key
+    disappeared from the raw file are kept.
+
+    Returns the number of rows written and the earliest changed watermark date.
+    """
+    stored = STORED_COLUMNS.get(table, [])
+    schema = [(c, t) for c, t in table_columns(conn, table) if c not in stored]
+    cols = [c for c, _ in schema]
+    names = ", ".join(f'"{c}"' for c in cols)
+    key_names = ", ".join(f'"{k}"' for k in keys)
+    wcol = WATERMARK_COLUMNS.get(table)
+    key_match = " AND ".join(f't."{k}" = s."{k}"' for k in keys)
+    value_match = " AND ".join(f't."{c}" IS s."{c}"' for c in cols if c not in keys)
+    same_row = f"{key_match} AND {value_match}" if value_match else key_match
+    delta_key = " AND ".join(f'd."{k}" = s."{k}"' for k in keys)
+    known_key = " AND ".join(f'"{k}" IS NOT NULL' for k in keys)
+    stage_keys = ", ".join(f's."{k}"' for k in keys)
+    count_key = " AND ".join(f'c."{k}" = s."{k}"' for k in keys)
+
+    for temp in ("_stage", "_counts", "_delta"):
+        conn.execute(f"DROP TABLE IF EXISTS temp.{temp}")
+    conn.execute(create_table_sql("_stage", schema).replace("CREATE TABLE", "CREATE TEMP TABLE"))
+    for chunk in read_csv_chunks(table, path, chunksize):
+        if list(chunk.columns) != cols or widen_schema(schema, chunk_schema(chunk)) != schema:
+            raise SchemaChanged(f"{path.name}: columns differ from table {table}")
+        conn.executemany(insert_sql("_stage", cols), chunk_rows(chunk))
+
+    # A key is unchanged when each of its staged rows is stored, the row
+    # counts match and, for repeated keys, each row occurs as often
+    conn.execute(f"CREATE INDEX temp._stage_key ON _stage ({key_names})")
+    conn.execute(f"""
+        CREATE TEMP TABLE _counts AS
+        SELECT {key_names}, COUNT(*) AS _n FROM temp._stage WHERE {known_key} GROUP BY {key_names}
+    """)
+    conn.execute(f"""
+        CREATE TEMP TABLE _delta AS
+        SELECT {key_names} FROM temp._stage s
+        WHERE {known_key} AND NOT EXISTS (SELECT 1 FROM "{table}" t WHERE {same_row})
+        UNION
+        SELECT {key_names} FROM temp._counts s
+        WHERE s._n != (SELECT COUNT(*) FROM "{table}" t WHERE {key_match})
+        UNION
+        SELECT {stage_keys} FROM temp._counts c JOIN temp._stage s ON {count_key}
+        WHERE c._n > 1
+          AND (SELECT COUNT(*) FROM temp._stage t WHERE {same_row})
+           != (SELECT COUNT(*) FROM "{table}" t WHERE {same_row})
+    """)
+    written, since = 0, None
+    if conn.execute("SELECT COUNT(*) FROM temp._delta").fetchone()[0]:
+        conn.execute(f"CREATE INDEX temp._delta_key ON _delta ({key_names})")
+        if wcol:
+            # Replaced stored rows count as changed too
+            since = conn.execute(f"""
+                SELECT MIN(w) FROM (
+                    SELECT s."{wcol}" AS w FROM temp._stage s
+                    WHERE EXISTS (SELECT 1 FROM temp._delta d WHERE {delta_key})
+                    UNION ALL
+                    SELECT s."{wcol}" FROM temp._delta d CROSS JOIN "{table}" s ON {delta_key}
+                )
+            """).fetchone()[0]
+        conn.execute(f"""
+            DELETE FROM "{table}" WHERE rowid IN (
+                SELECT t.rowid FROM temp._delta s JOIN "{table}" t ON {key_match}
+            )
+        """)
+        written = conn.execute(f"""
+            INSERT INTO "{table}" ({names})
+            SELECT s.* FROM temp._stage s
+            WHERE EXISTS (SELECT 1 FROM temp._delta d WHERE {delta_key})
+        """).rowcount
+    for temp in ("_stage", "_counts", "_delta"):
+        conn.execute(f"DROP TABLE IF EXISTS temp.{temp}")
+    return written, since
+
+
+def append_rows(conn: sqlite3.Connection, table: str, path: Path, offset: int,
+                chunksize: int = CHUNK_ROWS) -> tuple[int, str | None]:
+    """Insert the rows appended to ``path`` after byte ``offset``.
+
+    For files whose first ``offset`` bytes are the last ingested version
+    (``file_fingerprint``'s ``appended_from``): only the header and the new
+    tail are parsed, stored rows are left as they are.
+
+    Returns the number of rows written and the earliest appended watermark date.
+    """
+    stored = STORED_COLUMNS.get(table, [])
+    schema = [(c, t) for c, t in table_columns(conn, table) if c not in stored]
+    cols = [c for c, _ in schema]
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(offset)
+        tail = f.read()
+    last = conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+    written = 0
+    for chunk in read_csv_chunks(table, io.BytesIO(header + tail), chunksize):
+        if list(chunk.columns) != cols or widen_schema(schema, chunk_schema(chunk)) != schema:
+            raise SchemaChanged(f"{path.name}: columns differ from table {table}")
+        conn.executemany(insert_sql(table, cols), chunk_rows(chunk))
+        written += len(chunk)
+    wcol = WATERMARK_COLUMNS.get(table)
+    since = None
+    if wcol and written:
+        since = conn.execute(f'SELECT MIN("{wcol}") FROM "{table}" WHERE rowid > ?',
+                             (last,)).fetchone()[0]
+    return written, since
+
+
+_SKIP = object()
+
+
+def _refresh_since(sources: list[str], changes: dict[str, dict] | None):
+    """Refresh start date of a derived object: ``None`` rebuilds it fully,
+    ``_SKIP`` means none of its sources changed.
+    """
+    if changes is None:
+        return None
+    touched = [changes[s] for s in sources if changes.get(s, {}).get("mode", "unchanged") != "unchanged"]
+    if not touched:
+        return _SKIP
+    dates = [c["changed_since"] for c in touched]
+    if any(c["mode"] != "delta" for c in touched) or None in dates:
+        return None
+    return min(dates)
+
+
+def refresh_derived(conn: sqlite3.Connection,
+                    changes: dict[str, dict] | None = None) -> dict[str, int]:
+    """Refresh the stored derived columns whose source tables changed.
+
+    Same rules as :func:`refresh_materialized`; the columns must exist
+    (:func:`derived.add_derived_columns`). A refresh that wrote rows gives
+    the column's table a new version, made of its own and the other
+    sources' versions, so caches keyed on table versions see the change.
+    """
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    refreshed = {}
+    for name, (sources, refresh) in DERIVED.items():
+        since = _refresh_since(sources, changes)
+        if not set(sources) <= tables or since is _SKIP:
+            continue
+        owner = name.split(".")[0]
+        conn.execute("BEGIN")
+        try:
+            refreshed[name] = refresh(conn, since)
+            meta = read_meta(conn)
+            if refreshed[name] and owner in meta:
+                known = meta[owner]
+                # Raw table versions contain no '+': drop the previous refresh's part
+                own = str(known["version"]).split("+")[0]
+                version = "+".join([own] + [str(meta.get(s, {}).get("version")) for s in sources if s != owner])
+                write_meta(conn, owner, known, version, known["delta_rows"], known["changed_since"])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return refreshed
+
+
+def refresh_materialized(conn: sqlite3.Connection,
+                         changes: dict[str, dict] | None = None) -> dict[str, int]:
+    """Refresh the materialized tables whose source tables changed.
+
+    ``changes`` is the result of an ingest run; ``None`` rebuilds everything.
+    A table is refreshed from the earliest ``changed_since`` of its sources
+    when all of them were delta-loaded, and rebuilt fully otherwise.
+    """
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    meta = read_meta(conn)
+    refreshed = {}
+    for name, (sources, refresh) in MATERIALIZED.items():
+        if not set(sources) <= tables:
+            continue
+        since = None if name not in tables else _refresh_since(sources, changes)
+        if since is _SKIP:
+            continue
+        conn.execute("BEGIN")
+        try:
+            rows = refresh(conn, since)
+            version = "+".join(str(meta.get(s, {}).get("version")) for s in sources)
+            write_meta(conn, name, None, version, rows, since)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        refreshed[name] = rows
+    return refreshed
+
+
+def ingest_incremental(db_path: Path = DB_PATH, raw_dir: Path = DATA_RAW,
+                       chunksize: int = CHUNK_ROWS, verbose: bool = True) -> dict[str, dict]:
+    """Refresh an existing database with only what changed in ``raw_dir``.
+
+    Falls back to :func:`build_database` when no database exists yet, and to
+    a full reload of a single table when it has no usable natural key or its
+    columns changed.
+
+    Returns ``{table: {"mode", "rows", "changed_since"}}`` where mode is
+    ``"unchanged"``, ``"delta"`` or ``"full"``.
+    """
+    db_path = Path(db_path)
+    raw_dir = Path(raw_dir)
+    if not db_path.exists():
+        counts = build_database(db_path, raw_dir, chunksize=chunksize, verbose=verbose)
+        return {t: {"mode": "full", "rows": n, "changed_since": None} for t, n in counts.items()}
+
+    start = time.perf_counter()
+    conn = open_connection(db_path, "write", isolation_level=None)
+    changes = {}
+    try:
+        meta = read_meta(conn)
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        # Databases built before the derived columns existed get them now
+        upgraded = add_derived_columns(conn)
+        if upgraded:
+            create_indexes(conn)
+        for table, filename in CSV_FILES.items():
+            path = raw_dir / filename
+            if not path.exists():
+                continue
+            known = meta.get(table)
+            fp = file_fingerprint(path, known)
+            if known and table in tables and fp["file_sha256"] == known["file_sha256"]:
+                if fp["file_mtime_ns"] != known["file_mtime_ns"]:
+                    write_meta(conn, table, fp, known["version"], 0, known["changed_since"])
+                changes[table] = {"mode": "unchanged", "rows": 0, "changed_since": None}
+                continue
+
+            keys = NATURAL_KEYS.get(table)
+            mode, rows, since = "full", 0, None
+            conn.execute("BEGIN")
+            try:
+                if table in tables and keys and set(keys) <= {c for c, _ in table_columns(conn, table)}:
+                    ensure_key_index(conn, table, keys)
+                    try:
+                        if fp["appended_from"]:
+                            rows, since = append_rows(conn, table, path, fp["appended_from"], chunksize)
+                        else:
+                            rows, since = upsert_delta(conn, table, path, keys, chunksize)
+                        mode = "delta"
+                    except SchemaChanged:
+                        conn.execute("ROLLBACK")
+                        conn.execute("BEGIN")
+                if mode == "full":
+                    conn.execute("COMMIT")
+                    rows = load_tables(conn, {table: path}, workers=1, chunksize=chunksize)[table]
+                    add_derived_columns(conn)
+                    create_indexes(conn)
+                    conn.execute("BEGIN")
+                changed = rows > 0 or known is None
+                version = fp["file_sha256"][:16] if changed else known["version"]
+                write_meta(conn, table, fp, version, rows, since)
+                conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            changes[table] = {"mode": mode, "rows": rows, "changed_since": since}
+        columns = refresh_derived(conn, None if upgraded else changes)
+        derived = refresh_materialized(conn, changes)
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+
+    if verbose:
+        for table, info in changes.items():
+            since = f"  since {info['changed_since'][:10]}" if info["changed_since"] else ""
+            print(f"  {table:.<30} {info['mode']:<10} {info['rows']:>10,} rows{since}")
+        for column, n in columns.items():
+            print(f"  {column:.<30} {'refreshed':<10} {n:>10,} rows")
+        for table, n in derived.items():
+            print(f"  {table:.<30} {'refreshed':<10} {n:>10,} rows")
+        print(f"\nIncremental ingest finished in {time.perf_counter() - start:.1f}s")
+    return changes
+
+
+def finish_build(conn: sqlite3.Connection,
+                 meta: dict[str, tuple[dict | None, str, int]]) -> tuple[int, float, dict[str, int]]:
+    """Index, record metadata and materialize a freshly loaded scratch database.
+
+    ``meta`` maps each loaded table to ``(fingerprint, version, rows)``.
+    Returns the number of indexes created, the seconds spent creating them
+    and the materialized row counts.
+    """
+    add_derived_columns(conn)
+    conn.execute("BEGIN")
+    for table, (fp, version, rows) in meta.items():
+        write_meta(conn, table, fp, version, rows)
+    conn.execute("COMMIT")
+    # After the metadata, which the refresh versions from; before the indexes
+    refresh_derived(conn)
+    idx_start = time.perf_counter()
+    n_idx = create_indexes(conn)
+    idx_time = time.perf_counter() - idx_start
+    derived = refresh_materialized(conn)
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA journal_mode=WAL")
+    return n_idx, idx_time, derived
+
+
+def install_database(tmp_path: Path, db_path: Path):
+    """Atomically replace ``db_path`` with the finished scratch database."""
+    for suffix in ("-wal", "-shm"):
+        stale = Path(str(db_path) + suffix)
+        if stale.exists():
+            stale.unlink()
+    os.replace(tmp_path, db_path)
+
+
+def build_database(db_path: Path = DB_PATH, raw_dir: Path = DATA_RAW,
+                   workers: int | None = None, chunksize: int = CHUNK_ROWS,
+                   verbose: bool = True) -> dict[str, int]:
+    """Full rebuild of ``football.db`` from the raw CSVs.
+
+    The database is written to a scratch file next to ``db_path`` and only
+    replaces the existing database once loading and indexing succeeded.
+    """
+    db_path = Path(db_path)
+    raw_dir = Path(raw_dir)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    files = {t: raw_dir / f for t, f in CSV_FILES.items() if (raw_dir / f).exists()}
+    if verbose:
+        for t, f in CSV_FILES.items():
+            if t not in files:
+                print(f"  {t:.<30} FILE NOT FOUND: {raw_dir / f}")
+
+    tmp_path = db_path.with_suffix(".db.building")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    start = time.perf_counter()
+    conn = sqlite3.connect(tmp_path, isolation_level=None)
+    try:
+        for pragma in LOAD_PRAGMAS:
+            conn.execute(pragma)
+        counts = load_tables(conn, files, workers=workers, chunksize=chunksize)
+        fingerprints = {table: file_fingerprint(path) for table, path in files.items()}
+        n_idx, idx_time, derived = finish_build(conn, {
+            table: (fp, fp["file_sha256"][:16], counts[table]) for table, fp in fingerprints.items()
+        })
+    finally:
+        conn.close()
+    install_database(tmp_path, db_path)
+
+    if verbose:
+        for table, n in counts.items():
+            print(f"  {table:.<30} {n:>10,} rows loaded")
+        for table, n in derived.items():
+            print(f"  {table:.<30} {n:>10,} rows materialized")
+        print(f"\n{n_idx} indexes created in {idx_time:.1f}s")
+        print(f"Built in {time.perf_counter() - start:.1f}s")
+        print(f"Database size: {db_path.stat().st_size / 1024 / 1024:.1f} MB")
+    return counts
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or refresh football.db from data/raw CSVs.")
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    parser.add_argument("--raw", type=Path, default=DATA_RAW)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--incremental", action="store_true",
+                        help="only apply new or changed rows to an existing database")
+    args = parser.parse_args()
+    if args.incremental:
+        ingest_incremental(args.db, args.raw, chunksize=args.chunksize)
+    else:
+        build_database(args.db, args.raw, workers=args.workers, chunksize=args.chunksize)
@@ -0,0 +1,501 @@
+"""Materialized aggregate tables maintained at ingest time.
+
+Volatility, Sharpe and trend queries all start from the same per-league
+averages of ``player_valuations``. Instead of rescanning 430K+ valuations and
+calling ``strftime`` on every row in each query, the ingestion step keeps
+these reductions in small tables:
+
+- ``agg_league_month``: league x month (``'YYYY-MM'``)
+- ``agg_league_year``: league x year
+
+Both hold valuation count, sum and sum of squares of ``market_value_in_eur``
+and the number of distinct players over positive valuations, which is what
+most readers filter on. Averages are ``sum_value / n_valuations``; variances
+follow from ``sum_sq_value``. A group can have no positive valuation at all
+(``n_valuations = 0``), so those readers keep ``n_valuations > 0``. The
+``all_*`` columns cover the full population instead (``all_valuations``
+non-NULL values, ``all_sum_value`` and ``all_player_count`` distinct players
+with any valuation row), for queries that average every value.
+
+Depreciation, drawdown and player volatility work on each player's own
+series instead, and used to re-window the whole table per query. They read
+``fact_valuation_returns``: one row per positive valuation, keyed and stored
+in ``(player_id, date)`` order, with the player's previous positive valuation,
+simple and log return, days elapsed, age bracket, league, club and position.
+A player's first valuation has no previous one and NULL returns.
+
+The predictive feature matrix (``sql/06_predictive_features.sql``) used to
+re-aggregate all of ``appearances`` per run. ``feature_player`` keeps one row
+per player with the parts that only change when the player's own data does:
+career totals from ``appearances``, valuation and transfer counts, and
+``as_of``, the player's latest event date. An incremental refresh recomputes
+only the players with an appearance, valuation or transfer from ``since``
+onwards; ``features.py`` adds the date-dependent features when serving.
+
+Match-level performance lives in ``appearances`` and ``game_events`` (millions
+of rows); queries that set it against values read two season cubes instead:
+
+- ``cube_player_season``: player x season x competition x club, with games,
+  minutes, goals, assists and cards from ``appearances`` and the player's goal,
+  assist, card and substitution counts from ``game_events``
+- ``cube_club_season``: club x season x competition from ``club_games``, with
+  games, wins, draws, losses, goals for and against and home games
+
+The season is the one of the game (``games.season``). An incremental refresh
+rebuilds only the seasons of the games played from ``since`` onwards.
+
+Every table is registered in ``MATERIALIZED`` with the source tables it is
+derived from and a refresh function ``fn(conn, since) -> rows``. ``since`` is
+the earliest changed source date from incremental ingestion, or ``None`` for
+a full rebuild.
+"""
+
+import sqlite3
+
+from .sqlfuncs import register_functions
+
+AGG_LEAGUE_MONTH = "agg_league_month"
+AGG_LEAGUE_YEAR = "agg_league_year"
+FACT_VALUATION_RETURNS = "fact_valuation_returns"
+FEATURE_PLAYER = "feature_player"
+CUBE_PLAYER_SEASON = "cube_player_season"
+CUBE_CLUB_SEASON = "cube_club_season"
+
+
+_AGG_COLUMNS = """
+            n_valuations INTEGER NOT NULL,
+            sum_value REAL NOT NULL,
+            sum_sq_value REAL NOT NULL,
+            player_count INTEGER NOT NULL,
+            all_valuations INTEGER NOT NULL,
+            all_sum_value REAL NOT NULL,
+            all_player_count INTEGER NOT NULL"""
+
+# Positive-only measures first, then the full population: every non-NULL
+# value, and every player with a row in the group even without a value
+_AGG_SELECT = """
+            COUNT(CASE WHEN market_value_in_eur > 0 THEN 1 END),
+            TOTAL(CASE WHEN market_value_in_eur > 0 THEN market_value_in_eur END),
+            TOTAL(CASE WHEN market_value_in_eur > 0 THEN market_value_in_eur * market_value_in_eur END),
+            COUNT(DISTINCT CASE WHEN market_value_in_eur > 0 THEN player_id END),
+            COUNT(market_value_in_eur),
+            TOTAL(market_value_in_eur),
+            COUNT(DISTINCT player_id)
+        FROM player_valuations
+        WHERE player_club_domestic_competition_id IS NOT NULL"""
+
+
+def _drop_old_layout(conn: sqlite3.Connection, table: str, since: str | None) -> str | None:
+    """Drop ``table`` if it predates the full-population columns; a dropped
+    table is rebuilt fully, so ``None`` replaces ``since`` then."""
+    columns = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+    if columns and "all_player_count" not in columns:
+        conn.execute(f"DROP TABLE {table}")
+        return None
+    return since
+
+
+def refresh_league_month(conn: sqlite3.Connection, since: str | None = None) -> int:
+    """Rebuild ``agg_league_month`` (only months from ``since`` onwards if given)."""
+    since = _drop_old_layout(conn, AGG_LEAGUE_MONTH, since)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {AGG_LEAGUE_MONTH} (
+            league_id TEXT NOT NULL,
+            month TEXT NOT NULL,
+            year INTEGER NOT NULL,{_AGG_COLUMNS},
+            PRIMARY KEY (league_id, month)
+        )
+    """)
+    if since is None:
+        conn.execute(f"DELETE FROM {AGG_LEAGUE_MONTH}")
+        date_filter, params = "", ()
+    else:
+        conn.execute(f"DELETE FROM {AGG_LEAGUE_MONTH} WHERE month >= ?", (since[:7],))
+        # Plain range predicate on the raw column, so idx_pv_date can be used
+        date_filter, params = "AND date >= ?", (f"{since[:7]}-01",)
+    cur = conn.execute(f"""
+        INSERT INTO {AGG_LEAGUE_MONTH}
+        SELECT
+            player_club_domestic_competition_id,
+            substr(date, 1, 7),
+            CAST(substr(date, 1, 4) AS INTEGER),{_AGG_SELECT}
+          {date_filter}
+        GROUP BY 1, 2
+    """, params)
+    return cur.rowcount
+
+
+def refresh_league_year(conn: sqlite3.Connection, since: str | None = None) -> int:
+    """Rebuild ``agg_league_year`` (only years from ``since`` onwards if given).
+
+    Kept separately from the month grain because distinct player counts per
+    year cannot be derived from monthly distinct counts.
+    """
+    since = _drop_old_layout(conn, AGG_LEAGUE_YEAR, since)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {AGG_LEAGUE_YEAR} (
+            league_id TEXT NOT NULL,
+            year INTEGER NOT NULL,{_AGG_COLUMNS},
+            PRIMARY KEY (league_id, year)
+        )
+    """)
+    if since is None:
+        conn.execute(f"DELETE FROM {AGG_LEAGUE_YEAR}")
+        date_filter, params = "", ()
+    else:
+        conn.execute(f"DELETE FROM {AGG_LEAGUE_YEAR} WHERE year >= ?", (int(since[:4]),))
+        date_filter, params = "AND date >= ?", (f"{since[:4]}-01-01",)
+    cur = conn.execute(f"""
+        INSERT INTO {AGG_LEAGUE_YEAR}
+        SELECT
+            player_club_domestic_competition_id,
+            CAST(substr(date, 1, 4) AS INTEGER),{_AGG_SELECT}
+          {date_filter}
+        GROUP BY 1, 2
+    """, params)
+    return cur.rowcount
+
+
+def refresh_valuation_returns(conn: sqlite3.Connection, since: str | None = None) -> int:
+    """Rebuild ``fact_valuation_returns`` (only valuations from ``since`` onwards if given).
+
+    An incremental refresh seeds every affected player's series with their
+    last valuation before ``since``, so the first new row still gets its
+    previous value. Position and age bracket come from ``players``; a change
+    there rebuilds the table fully.
+    """
+    # LOG_RETURN; the bulk build runs on a plain connection
+    register_functions(conn)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {FACT_VALUATION_RETURNS} (
+            player_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            market_value_in_eur REAL NOT NULL,
+            prev_date TEXT,
+            prev_value REAL,
+            simple_return REAL,
+            log_return REAL,
+            days_elapsed INTEGER,
+            age_bracket TEXT,
+            league_id TEXT,
+            club_id INTEGER,
+            club_name TEXT,
+            position TEXT,
+            PRIMARY KEY (player_id, date)
+        ) WITHOUT ROWID
+    """)
+    if since is None:
+        conn.execute(f"DELETE FROM {FACT_VALUATION_RETURNS}")
+        seed, date_filter, params = "", "", ()
+    else:
+        conn.execute(f"DELETE FROM {FACT_VALUATION_RETURNS} WHERE date >= ?", (since,))
+        # Last kept valuation of each player with new ones, found on the
+        # primary key; it only feeds LAG and is filtered out again below
+        seed = f"""
+            UNION ALL
+            SELECT pv.player_id, pv.date, pv.market_value_in_eur, pv.valuation_epoch_day,
+                   NULL, NULL, NULL, NULL
+            FROM (
+                SELECT r.player_id, MAX(r.date) AS date
+                FROM {FACT_VALUATION_RETURNS} r
+                WHERE r.player_id IN (
+                    SELECT player_id FROM player_valuations
+                    WHERE date >= :since AND market_value_in_eur > 0
+                )
+                GROUP BY r.player_id
+            ) last
+            JOIN player_valuations pv ON pv.player_id = last.player_id AND pv.date = last.date
+            WHERE pv.market_value_in_eur > 0"""
+        date_filter, params = "AND pv.date >= :since", {"since": since}
+    # OR REPLACE: a duplicated (player_id, date) keeps a single row
+    cur = conn.execute(f"""
+        INSERT OR REPLACE INTO {FACT_VALUATION_RETURNS}
+        WITH series AS (
+            SELECT pv.player_id, pv.date, pv.market_value_in_eur, pv.valuation_epoch_day,
+                   pv.valuation_age_bracket, pv.player_club_domestic_competition_id,
+                   pv.current_club_id, pv.current_club_name
+            FROM player_valuations pv
+            WHERE pv.market_value_in_eur > 0 {date_filter}{seed}
+        ),
+        lagged AS (
+            SELECT s.*,
+                LAG(date) OVER w AS prev_date,
+                LAG(market_value_in_eur) OVER w AS prev_value,
+                LAG(valuation_epoch_day) OVER w AS prev_epoch_day
+            FROM series s
+            WINDOW w AS (PARTITION BY player_id ORDER BY date)
+        )
+        SELECT l.player_id, l.date, l.market_value_in_eur, l.prev_date, l.prev_value,
+            (l.market_value_in_eur - l.prev_value) * 1.0 / l.prev_value,
+            LOG_RETURN(l.market_value_in_eur, l.prev_value),
+            l.valuation_epoch_day - l.prev_epoch_day,
+            l.valuation_age_bracket,
+            l.player_club_domestic_competition_id,
+            l.current_club_id,
+            l.current_club_name,
+            p.position
+        FROM lagged l
+        LEFT JOIN (SELECT player_id, MAX(position) AS position FROM players GROUP BY player_id) p
+            ON p.player_id = l.player_id
+        {"" if since is None else "WHERE l.date >= :since"}
+    """, params)
+    return cur.rowcount
+
+
+def refresh_feature_player(conn: sqlite3.Connection, since: str | None = None) -> int:
+    """Rebuild ``feature_player`` (only players with events from ``since`` onwards if given).
+
+    A touched player's row is recomputed from the full history, found on the
+    ``player_id`` indexes, so the cost follows the number of touched players.
+    """
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {FEATURE_PLAYER} (
+            player_id INTEGER PRIMARY KEY,
+            as_of TEXT,
+            career_goals INTEGER NOT NULL,
+            career_assists INTEGER NOT NULL,
+            career_minutes INTEGER NOT NULL,
+            career_appearances INTEGER NOT NULL,
+            career_yellows INTEGER NOT NULL,
+            career_reds INTEGER NOT NULL,
+            competitions_played INTEGER NOT NULL,
+            career_start TEXT,
+            career_latest TEXT,
+            n_valuations INTEGER NOT NULL,
+            latest_valuation_date TEXT,
+            career_transfers INTEGER NOT NULL,
+            career_transfer_fees REAL NOT NULL,
+            last_transfer_date TEXT
+        )
+    """)
+    if since is None:
+        conn.execute(f"DELETE FROM {FEATURE_PLAYER}")
+        subset = ""
+    else:
+        conn.execute("DROP TABLE IF EXISTS temp._touched")
+        # Plain range predicates on the raw date columns, so the date indexes are used
+        conn.execute("""
+            CREATE TEMP TABLE _touched AS
+            SELECT player_id FROM appearances WHERE date >= :since
+            UNION SELECT player_id FROM player_valuations WHERE date >= :since
+            UNION SELECT player_id FROM transfers WHERE transfer_date >= :since
+        """, {"since": since})
+        conn.execute(f"DELETE FROM {FEATURE_PLAYER} WHERE player_id IN (SELECT player_id FROM temp._touched)")
+        subset = "WHERE player_id IN (SELECT player_id FROM temp._touched)"
+    cur = conn.execute(f"""
+        INSERT INTO {FEATURE_PLAYER}
+        WITH apps AS (
+            SELECT player_id,
+                SUM(goals) AS goals, SUM(assists) AS assists, SUM(minutes_played) AS minutes,
+                COUNT(*) AS games, SUM(yellow_cards) AS yellows, SUM(red_cards) AS reds,
+                COUNT(DISTINCT competition_id) AS competitions,
+                MIN(date) AS first_date, MAX(date) AS last_date
+            FROM appearances {subset}
+            GROUP BY player_id
+        ),
+        vals AS (
+            SELECT player_id, COUNT(*) AS n, MAX(date) AS last_date
+            FROM player_valuations {subset}
+            GROUP BY player_id
+        ),
+        moves AS (
+            SELECT player_id, COUNT(*) AS n, SUM(COALESCE(transfer_fee, 0)) AS fees,
+                MAX(transfer_date) AS last_date
+            FROM transfers {subset}
+            GROUP BY player_id
+        ),
+        ids AS (
+            SELECT player_id FROM apps UNION SELECT player_id FROM vals UNION SELECT player_id FROM moves
+        )
+        SELECT ids.player_id,
+            NULLIF(MAX(COALESCE(a.last_date, ''), COALESCE(v.last_date, ''), COALESCE(m.last_date, '')), ''),
+            COALESCE(a.goals, 0), COALESCE(a.assists, 0), COALESCE(a.minutes, 0),
+            COALESCE(a.games, 0), COALESCE(a.yellows, 0), COALESCE(a.reds, 0),
+            COALESCE(a.competitions, 0), a.first_date, a.last_date,
+            COALESCE(v.n, 0), v.last_date,
+            COALESCE(m.n, 0), COALESCE(m.fees, 0), m.last_date
+        FROM ids
+        LEFT JOIN apps a ON a.player_id = ids.player_id
+        LEFT JOIN vals v ON v.player_id = ids.player_id
+        LEFT JOIN moves m ON m.player_id = ids.player_id
+        WHERE ids.player_id IS NOT NULL
+    """)
+    conn.execute("DROP TABLE IF EXISTS temp._touched")
+    return cur.rowcount
+
+
+def _cube_games(conn: sqlite3.Connection, since: str | None) -> None:
+    """Fill ``temp._games`` with the games a cube refresh covers: all of them, or
+    every game of the seasons with games from ``since`` onwards."""
+    conn.execute("DROP TABLE IF EXISTS temp._games")
+    conn.execute("""
+        CREATE TEMP TABLE _games (
+            game_id INTEGER PRIMARY KEY, season INTEGER, competition_id TEXT, date TEXT
+        )
+    """)
+    # Plain range predicate on the raw column, so idx_games_date can be used
+    seasons = "" if since is None else "AND season IN (SELECT season FROM games WHERE date >= :since)"
+    conn.execute(f"""
+        INSERT OR IGNORE INTO temp._games
+        SELECT game_id, season, competition_id, date FROM games
+        WHERE season IS NOT NULL AND competition_id IS NOT NULL {seasons}
+    """, {"since": since})
+
+
+def _cube_delete(conn: sqlite3.Connection, table: str, since: str | None) -> None:
+    if since is None:
+        conn.execute(f"DELETE FROM {table}")
+    else:
+        conn.execute(f"DELETE FROM {table} WHERE season IN (SELECT DISTINCT season FROM temp._games)")
+
+
+def refresh_player_season(conn: sqlite3.Connection, since: str | None = None) -> int:
+    """Rebuild ``cube_player_season`` (only seasons with games from ``since`` onwards if given).
+
+    Appearance and event counts are reduced separately, then combined per key;
+    a player with events but no appearance row keeps zero games and minutes.
+    """
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CUBE_PLAYER_SEASON} (
+            player_id INTEGER NOT NULL,
+            season INTEGER NOT NULL,
+            competition_id TEXT NOT NULL,
+            club_id INTEGER NOT NULL,
+            games INTEGER NOT NULL,
+            minutes INTEGER NOT NULL,
+            goals INTEGER NOT NULL,
+            assists INTEGER NOT NULL,
+            yellow_cards INTEGER NOT NULL,
+            red_cards INTEGER NOT NULL,
+            goal_events INTEGER NOT NULL,
+            assist_events INTEGER NOT NULL,
+            card_events INTEGER NOT NULL,
+            subbed_on INTEGER NOT NULL,
+            subbed_off INTEGER NOT NULL,
+            first_date TEXT,
+            last_date TEXT,
+            PRIMARY KEY (player_id, season, competition_id, club_id)
+        ) WITHOUT ROWID
+    """)
+    _cube_games(conn, since)
+    _cube_delete(conn, CUBE_PLAYER_SEASON, since)
+    # Both sources are read per covered game on their game_id indexes (CROSS
+    # JOIN keeps temp._games, which has no statistics, outermost); an event
+    # counts for its player, a goal also for the assist provider and a
+    # substitution for the player coming on (player_in_id) as well as going off
+    cur = conn.execute(f"""
+        INSERT INTO {CUBE_PLAYER_SEASON}
+        WITH apps AS (
+            SELECT a.player_id, g.season, g.competition_id, a.player_club_id AS club_id,
+                COUNT(*) AS games, SUM(a.minutes_played) AS minutes,
+                SUM(a.goals) AS goals, SUM(a.assists) AS assists,
+                SUM(a.yellow_cards) AS yellow_cards, SUM(a.red_cards) AS red_cards,
+                MIN(a.date) AS first_date, MAX(a.date) AS last_date
+            FROM temp._games g
+            CROSS JOIN appearances a ON a.game_id = g.game_id
+            WHERE a.player_id IS NOT NULL AND a.player_club_id IS NOT NULL
+            GROUP BY 1, 2, 3, 4
+        ),
+        ev AS (
+            SELECT g.season, g.competition_id, g.date, e.club_id, e.type,
+                e.player_id, CAST(e.player_assist_id AS INTEGER) AS assist_id,
+                CAST(e.player_in_id AS INTEGER) AS in_id
+            FROM temp._games g
+            CROSS JOIN game_events e ON e.game_id = g.game_id
+            WHERE e.club_id IS NOT NULL
+        ),
+        roles AS (
+            SELECT player_id, season, competition_id, date, club_id,
+                CASE WHEN type = 'Substitutions' THEN 'off' ELSE type END AS role
+            FROM ev
+            UNION ALL
+            SELECT assist_id, season, competition_id, date, club_id, 'assist'
+            FROM ev WHERE type = 'Goals'
+            UNION ALL
+            SELECT in_id, season, competition_id, date, club_id, 'on'
+            FROM ev WHERE type = 'Substitutions'
+        ),
+        events AS (
+            SELECT player_id, season, competition_id, club_id,
+                SUM(role = 'Goals') AS goal_events,
+                SUM(role = 'assist') AS assist_events,
+                SUM(role = 'Cards') AS card_events,
+                SUM(role = 'on') AS subbed_on,
+                SUM(role = 'off') AS subbed_off,
+                MIN(date) AS first_date, MAX(date) AS last_date
+            FROM roles
+            WHERE player_id IS NOT NULL
+            GROUP BY 1, 2, 3, 4
+        ),
+        keyed AS (
+            SELECT player_id, season, competition_id, club_id,
+                games, minutes, goals, assists, yellow_cards, red_cards,
+                0 AS goal_events, 0 AS assist_events, 0 AS card_events, 0 AS subbed_on, 0 AS subbed_off,
+                first_date, last_date
+            FROM apps
+            UNION ALL
+            SELECT player_id, season, competition_id, club_id,
+                0, 0, 0, 0, 0, 0,
+                goal_events, assist_events, card_events, subbed_on, subbed_off,
+                first_date, last_date
+            FROM events
+        )
+        SELECT player_id, season, competition_id, club_id,
+            SUM(games), COALESCE(SUM(minutes), 0), COALESCE(SUM(goals), 0), COALESCE(SUM(assists), 0),
+            COALESCE(SUM(yellow_cards), 0), COALESCE(SUM(red_cards), 0),
+            SUM(goal_events), SUM(assist_events), SUM(card_events), SUM(subbed_on), SUM(subbed_off),
+            MIN(first_date), MAX(last_date)
+        FROM keyed
+        GROUP BY 1, 2, 3, 4
+    """)
+    conn.execute("DROP TABLE IF EXISTS temp._games")
+    return cur.rowcount
+
+
+def refresh_club_season(conn: sqlite3.Connection, since: str | None = None) -> int:
+    """Rebuild ``cube_club_season`` (only seasons with games from ``since`` onwards if given)."""
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CUBE_CLUB_SEASON} (
+            club_id INTEGER NOT NULL,
+            season INTEGER NOT NULL,
+            competition_id TEXT NOT NULL,
+            games INTEGER NOT NULL,
+            wins INTEGER NOT NULL,
+            draws INTEGER NOT NULL,
+            losses INTEGER NOT NULL,
+            goals_for INTEGER NOT NULL,
+            goals_against INTEGER NOT NULL,
+            home_games INTEGER NOT NULL,
+            PRIMARY KEY (club_id, season, competition_id)
+        ) WITHOUT ROWID
+    """)
+    _cube_games(conn, since)
+    _cube_delete(conn, CUBE_CLUB_SEASON, since)
+    cur = conn.execute(f"""
+        INSERT INTO {CUBE_CLUB_SEASON}
+        SELECT cg.club_id, g.season, g.competition_id,
+            COUNT(*),
+            SUM(cg.own_goals > cg.opponent_goals),
+            SUM(cg.own_goals = cg.opponent_goals),
+            SUM(cg.own_goals < cg.opponent_goals),
+            COALESCE(SUM(cg.own_goals), 0),
+            COALESCE(SUM(cg.opponent_goals), 0),
+            SUM(cg.hosting = 'Home')
+        FROM temp._games g
+        CROSS JOIN club_games cg ON cg.game_id = g.game_id
+        WHERE cg.club_id IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+    conn.execute("DROP TABLE IF EXISTS temp._games")
+    return cur.rowcount
+
+
+# name -> (source tables, refresh function)
+MATERIALIZED = {
+    AGG_LEAGUE_MONTH: (["player_valuations"], refresh_league_month),
+    AGG_LEAGUE_YEAR: (["player_valuations"], refresh_league_year),
+    FACT_VALUATION_RETURNS: (["player_valuations", "players"], refresh_valuation_returns),
+    FEATURE_PLAYER: (["appearances", "player_valuations", "transfers"], refresh_feature_player),
+    CUBE_PLAYER_SEASON: (["appearances", "game_events", "games"], refresh_player_season),
+    CUBE_CLUB_SEASON: (["club_games", "games"], refresh_club_season),
+}
@@ -0,0 +1,231 @@
+"""Headless refresh pipeline: ingestion, analysis, models and dashboard export.
+
+Runs the same SQL as notebooks 01-05 as plain functions, without a Jupyter
+kernel. Heavy libraries are imported inside the stage that needs them
+(pandas for the SQL stages, scikit-learn only for ``models``, pyarrow only
+for ``columnar`` and ``features``; the plotting stack never), so an export-only run starts
+in well under a second.
+
+Usage:
+    python -m notebooks.utils.pipeline                        # analysis, models, export
+    python -m notebooks.utils.pipeline --stages export        # dashboard JSON only
+    python -m notebooks.utils.pipeline --stages ingest,export --incremental
+    python -m notebooks.utils.pipeline --stages ingest,columnar  # + Parquet mirror
+    python -m notebooks.utils.pipeline --stages ingest,features --incremental  # daily features
+    python -m notebooks.utils.pipeline --trace                # + per-statement SQL trace
+    python -m notebooks.utils.pipeline --backend auto         # DuckDB where it pays off
+
+Results of ``analysis`` and ``models`` are written as JSON to
+``data/processed/analysis``; ``export`` writes ``dashboard/public/data``.
+Like the export, both stages skip outputs whose inputs are unchanged.
+``--trace`` records every SQL statement of the run (latency, rows, query
+plan flags) to ``data/processed/traces`` and prints a per-statement summary.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+ANALYSIS_DIR = PROJECT_ROOT / "data" / "processed" / "analysis"
+TRACE_DIR = PROJECT_ROOT / "data" / "processed" / "traces"
+
+STAGES = ["ingest", "columnar", "features", "analysis", "models", "export"]
+DEFAULT_STAGES = ["analysis", "models", "export"]
+POSITIONS = ["Attack", "Midfield", "Defender", "Goalkeeper"]
+TIERS = ["Elite", "Top-Mid", "Mid", "Lower-Mid"]
+
+
+def _records(df):
+    return df.to_dict("records")
+
+
+# ── Stages ────────────────────────────────────────────────────────────────────
+
+def run_ingest(incremental: bool = False, workers: int | None = None, **_):
+    """Notebook 01: (re)build ``football.db`` from ``data/raw``."""
+    from .ingest import build_database, ingest_incremental
+
+    if incremental:
+        ingest_incremental()
+    else:
+        build_database(workers=workers)
+
+
+def run_columnar(force: bool = False, **_):
+    """Sync the Parquet mirror of ``football.db`` (tables changed since the last sync)."""
+    from .columnar import sync_mirror
+
+    sync_mirror(force=force)
+
+
+def run_features(force: bool = False, **_):
+    """Refresh the predictive feature matrix file (utils/features.py) for today."""
+    from .features import load_features, matrix_path
+
+    df = load_features(force=force)
+    print(f"  {len(df):,} players x {df.shape[1]} features -> {matrix_path()}")
+
+
+def analysis_graph():
+    """Notebook 03: the SQL analysis tables plus multi-horizon transfer ROI."""
+    from .dag import TaskGraph
+    from .queries import SQL_NET_SPEND, SQL_PEAK_AGE, SQL_ROI, SQL_SHARPE, SQL_YOY
+
+    g = TaskGraph()
+    for name, sql in [("yoy_growth", SQL_YOY), ("transfer_roi_1yr", SQL_ROI),
+                      ("peak_age", SQL_PEAK_AGE), ("league_sharpe", SQL_SHARPE),
+                      ("club_net_spend", SQL_NET_SPEND)]:
+        g.output(f"{name}.json", g.step(name, _records, [g.query(f"q_{name}", sql)]))
+    g.output("transfer_roi_horizons.json",
+             g.step("transfer_roi_horizons", roi_horizon_summary,
+                    tables=["transfers", "player_valuations"]))
+    return g
+
+
+def roi_horizon_summary() -> list[dict]:
+    """Distribution of ROI after 6/12/24 months over all transfers with a fee."""
+    from .asof import transfer_roi
+    from .db_helpers import connection
+
+    with connection("read") as conn:
+        roi = transfer_roi(conn, horizons=(6, 12, 24))
+    cols = ["roi_6m_pct", "roi_12m_pct", "roi_24m_pct"]
+    return _records(roi[cols].describe().round(1).reset_index(names="stat"))
+
+
+def age_value_regression() -> list[dict]:
+    """Quadratic fit of log(value) on age per position: R² and peak age.
+
+    ``SQL_REG`` is streamed through :class:`utils.reducers.PolyFit`, so the
+    valuations are never held in memory at once.
+    """
+    import numpy as np
+
+    from .db_helpers import reduce_query
+    from .queries import SQL_REG
+    from .reducers import PolyFit
+
+    fits = reduce_query(SQL_REG, {"fit": PolyFit("position", "age", "log_value")})["fit"]
+    fits = fits.set_index("position")
+    ages = np.arange(17, 39)
+    out = []
+    for pos in POSITIONS:
+        if pos not in fits.index:
+            continue
+        fit = fits.loc[pos]
+        out.append({
+            "position": pos,
+            "r2": round(float(fit["r2"]), 3),
+            "peak_age": int(ages[np.argmax(PolyFit.predict(fit["coef"], ages))]),
+            "n": int(fit["n"]),
+        })
+    return out
+
+
+def club_tiers(df) -> list[dict]:
+    """K-Means (K=4) club segmentation, tiers ordered by average squad value."""
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import StandardScaler
+
+    df = df.dropna().copy()
+    features = ["squad_value_m", "average_age", "squad_size", "transfer_activity"]
+    X_scaled = StandardScaler().fit_transform(df[features].fillna(0))
+    df["cluster"] = KMeans(n_clusters=4, random_state=42, n_init=10).fit_predict(X_scaled)
+    avg_vals = df.groupby("cluster")["squad_value_m"].mean().sort_values(ascending=False)
+    df["tier"] = df["cluster"].map(dict(zip(avg_vals.index, TIERS)))
+    return _records(df.drop(columns="cluster"))
+
+
+def models_graph():
+    """Notebook 04: age-value regression and club tier clustering."""
+    from .dag import TaskGraph
+    from .queries import SQL_CLUSTERS
+
+    g = TaskGraph()
+    g.output("age_value_regression.json",
+             g.step("age_value_regression", age_value_regression,
+                    tables=["player_valuations", "players"]))
+    g.output("club_tiers.json",
+             g.step("club_tiers", club_tiers, [g.query("q_clusters", SQL_CLUSTERS)]))
+    return g
+
+
+def run_analysis(workers: int | None = None, force: bool = False, **_):
+    analysis_graph().run(ANALYSIS_DIR, workers=workers, force=force)
+
+
+def run_models(workers: int | None = None, force: bool = False, **_):
+    models_graph().run(ANALYSIS_DIR, workers=workers, force=force)
+
+
+def run_export(workers: int | None = None, force: bool = False, **_):
+    """Notebook 05: dashboard JSON files."""
+    from .dashboard_export import export_dashboard
+
+    export_dashboard(workers=workers, force=force)
+
+
+RUNNERS = {
+    "ingest": run_ingest,
+    "columnar": run_columnar,
+    "features": run_features,
+    "analysis": run_analysis,
+    "models": run_models,
+    "export": run_export,
+}
+
+
+def run_pipeline(stages=DEFAULT_STAGES, **options):
+    """Run the selected stages in pipeline order."""
+    unknown = [s for s in stages if s not in RUNNERS]
+    if unknown:
+        raise ValueError(f"Unknown stages {unknown}; expected some of {STAGES}")
+    for stage in [s for s in STAGES if s in stages]:
+        start = time.perf_counter()
+        print(f"[{stage}]")
+        RUNNERS[stage](**options)
+        print(f"[{stage}] done in {time.perf_counter() - start:.1f}s\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh database, analyses and dashboard data")
+    parser.add_argument("--stages", default=",".join(DEFAULT_STAGES),
+                        help=f"comma-separated subset of {','.join(STAGES)} (or 'all')")
+    parser.add_argument("--incremental", action="store_true",
+                        help="ingest only new or changed rows")
+    parser.add_argument("--workers", type=int, default=None, help="parallel workers per stage")
+    parser.add_argument("--force", action="store_true", help="rewrite unchanged outputs too")
+    parser.add_argument("--trace", nargs="?", type=Path, const=TRACE_DIR, default=None,
+                        help="trace SQL statements to a .jsonl file or directory "
+                             "(default data/processed/traces)")
+    parser.add_argument("--backend", choices=["sqlite", "duckdb", "auto"], default=None,
+                        help="query engine for the SQL stages (see utils/backends.py)")
+    args = parser.parse_args(argv)
+    stages = STAGES if args.stages == "all" else [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in RUNNERS]
+    if unknown:
+        parser.error(f"unknown stages {unknown}; expected some of {STAGES}")
+    options = dict(incremental=args.incremental, workers=args.workers, force=args.force)
+    if args.backend:
+        from . import db_helpers
+
+        db_helpers.BACKEND = args.backend
+    if args.trace is None:
+        run_pipeline(stages, **options)
+        return
+
+    from .tracing import report, tracing
+
+    path = args.trace
+    if path.suffix != ".jsonl":
+        path = path / f"pipeline-{time.strftime('%Y%m%d-%H%M%S')}.jsonl"
+    with tracing(path) as tracer:
+        run_pipeline(stages, **options)
+    report(tracer.events, path.with_suffix(".summary.json"))
+    print(f"Trace: {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""Pooled SQLite connections with per-workload profiles.
+
+Opening a connection and re-issuing PRAGMAs for every query is cheap once,
+but analysis scripts call ``run_query`` hundreds of times per run and each
+fresh connection also starts with a cold page cache. A pool keeps a few
+configured connections per database and profile and hands them out to
+concurrent callers:
+
+- ``read``: analytical profile. Opened with URI ``mode=ro`` and
+  ``query_only``, large page cache and memory map, temp tables in memory.
+- ``write``: ingestion profile. WAL journal, ``synchronous=NORMAL``,
+  foreign keys on and a busy timeout so readers and the writer coexist.
+
+Connections are revalidated on checkout: ingestion rebuilds replace the
+database file atomically, and a pooled connection still pointing at the old
+file is closed and reopened instead of serving stale data.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from .sqlfuncs import register_functions
+from .tracing import connection_factory
+
+PROFILES = {
+    "read": {
+        "mode": "ro",
+        "pragmas": [
+            "PRAGMA query_only=ON",
+            "PRAGMA temp_store=MEMORY",
+            "PRAGMA cache_size=-131072",      # 128 MB page cache per connection
+            "PRAGMA mmap_size=1073741824",    # map up to 1 GB of the file
+        ],
+    },
+    "write": {
+        "mode": "rwc",
+        "pragmas": [
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            "PRAGMA foreign_keys=ON",
+            "PRAGMA temp_store=MEMORY",
+            "PRAGMA cache_size=-65536",
+            "PRAGMA busy_timeout=30000",
+        ],
+    },
+}
+
+
+def _file_id(db_path: Path):
+    try:
+        st = os.stat(db_path)
+    except FileNotFoundError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+def open_connection(db_path: Path, profile: str = "write", **kwargs) -> sqlite3.Connection:
+    """Open a new connection to ``db_path`` configured for ``profile``.
+
+    The statistical SQL functions of ``utils/sqlfuncs.py`` are registered
+    on every connection; while a trace is active the connection is traced
+    (``utils/tracing.py``).
+    """
+    settings = PROFILES[profile]
+    db_path = Path(db_path)
+    if settings["mode"] == "rwc":
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+    uri = f"{db_path.resolve().as_uri()}?mode={settings['mode']}"
+    kwargs.setdefault("factory", connection_factory())
+    conn = sqlite3.connect(uri, uri=True, **kwargs)
+    for pragma in settings["pragmas"]:
+        conn.execute(pragma)
+    return register_functions(conn)
+
+
+class ConnectionPool:
+    """Thread-safe pool of connections to one database with one profile."""
+
+    def __init__(self, db_path: Path, profile: str = "read", max_size: int = 8,
+                 timeout: float = 60.0):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown connection profile {profile!r}; expected one of {sorted(PROFILES)}")
+        self.db_path = Path(db_path)
+        self.profile = profile
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._file_ids = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _open(self) -> sqlite3.Connection:
+        conn = open_connection(self.db_path, self.profile, check_same_thread=False)
+        with self._lock:
+            self._file_ids[id(conn)] = _file_id(self.db_path)
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._file_ids.pop(id(conn), None)
+        conn.close()
+
+    def _checkout(self) -> sqlite3.Connection:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No {self.profile} connection free after {self.timeout}s")
+        try:
+            current = _file_id(self.db_path)
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._open()
+                if self._file_ids.get(id(conn)) == current:
+                    return conn
+                self._discard(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _checkin(self, conn: sqlite3.Connection):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed:
+                self._discard(conn)
+            else:
+                self._idle.put(conn)
+        except sqlite3.Error:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of the ``with`` block."""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    def close(self):
+        """Close all idle connections; busy ones are closed when returned."""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
@@ -0,0 +1,231 @@
+"""Point-in-time squad portfolios: every club's squad as of any date.
+
+``sql/07_club_financials.sql`` values squads "now" (``players.current_club_id``,
+ages from ``julianday('now')``), so a historical view means re-running its
+joins per date. Here each player's club history is rebuilt once from two
+event streams, merged per player in date order:
+
+- valuations (``fact_valuation_returns``): the club the player was at on the
+  valuation date, and the value
+- transfers: a move to ``to_club_id`` on the transfer date; the value carries
+  over from the player's last valuation
+
+Every event opens a *spell* (player, club, value) lasting until the player's
+next event, or ``STALE_DAYS`` after the player's last valuation (retired or no longer
+covered). Spells never overlap, so as of any date a player is in at most one
+squad. A batch of as-of dates is answered in one sweep: each spell is
+expanded to the dates it covers (two ``searchsorted`` calls over the sorted
+dates) and the club x date metrics are ``bincount`` reductions over those
+rows, instead of one query per date.
+
+Metrics per club and date, as in ``sql/07``: player count, squad value,
+average and top player value, star dependency (top player as % of the
+squad), over-30 exposure (% of value in players aged 30+ on that date),
+average age and value per position.
+"""
+
+import json
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from .timeseries import POSITIONS
+
+BIG5 = ("GB1", "ES1", "IT1", "L1", "FR1")
+# A player without a new valuation for this long has left the data
+STALE_DAYS = 365
+HISTORY_START = "2012-07-01"
+
+_FAR_FUTURE = np.datetime64("9999-12-31", "D")
+
+
+def monthly_dates(start, end) -> np.ndarray:
+    """First day of every month from ``start`` to ``end`` (inclusive)."""
+    months = np.arange(np.datetime64(start, "M"), np.datetime64(end, "M") + 1)
+    return months.astype("datetime64[D]")
+
+
+def _days(values) -> np.ndarray:
+    """Dates, or days since 1970-01-01 (the ``*_epoch_day`` columns), as ``datetime64[D]``."""
+    values = pd.Series(values)
+    unit = {"unit": "D"} if pd.api.types.is_numeric_dtype(values) else {}
+    return pd.to_datetime(values, errors="coerce", **unit).to_numpy().astype("datetime64[D]")
+
+
+class SquadHistory:
+    """Non-overlapping club spells of every player, with the attributes the metrics need."""
+
+    def __init__(self, player_id, club_id, start, end, value, birth, position):
+        self.player_id = np.asarray(player_id, dtype=np.int64)
+        self.club_id = np.asarray(club_id, dtype=np.int64)
+        self.start = np.asarray(start, dtype="datetime64[D]")     # first day in the squad
+        self.end = np.asarray(end, dtype="datetime64[D]")         # first day no longer in it
+        self.value = np.asarray(value, dtype=np.float64)
+        self.birth = np.asarray(birth, dtype="datetime64[D]")
+        self.position = np.asarray(position, dtype=np.int8)      # index into POSITIONS, -1 other
+
+    @classmethod
+    def from_frames(cls, valuations: pd.DataFrame, transfers: pd.DataFrame,
+                    players: pd.DataFrame, stale_days: int = STALE_DAYS) -> "SquadHistory":
+        """Spells from valuations (``player_id, date, club_id, value``), transfers
+        (``player_id, date, club_id``) and players (``player_id, date_of_birth, position``)."""
+        pid = np.concatenate([valuations["player_id"].to_numpy(np.int64),
+                              transfers["player_id"].to_numpy(np.int64)])
+        day = np.concatenate([_days(valuations["date"]), _days(transfers["date"])])
+        club = np.concatenate([valuations["club_id"].to_numpy(np.float64),
+                               transfers["club_id"].to_numpy(np.float64)])
+        value = np.concatenate([valuations["value"].to_numpy(np.float64),
+                                np.full(len(transfers), np.nan)])
+        # A transfer sorts after a valuation of the same day: the move wins
+        kind = np.repeat([0, 1], [len(valuations), len(transfers)])
+        keep = ~np.isnat(day)
+        order = np.lexsort((kind[keep], day[keep], pid[keep]))
+        pid, day, club, value, kind = (a[keep][order] for a in (pid, day, club, value, kind))
+
+        # Value and date of the player's latest valuation up to each event
+        n = len(pid)
+        first = np.flatnonzero(np.diff(pid, prepend=pid[:1] - 1))
+        player_start = np.repeat(first, np.diff(np.append(first, n)))
+        last_val = np.maximum.accumulate(np.where(kind == 0, np.arange(n), -1))
+        has_val = last_val >= player_start
+        last_val = np.where(has_val, last_val, 0)
+        value = np.where(has_val, value[last_val], np.nan)
+        expires = np.where(has_val, day[last_val], day) + np.timedelta64(stale_days, "D")
+
+        same_player = np.append(pid[1:] == pid[:-1], False)
+        next_day = np.where(same_player, np.append(day[1:], _FAR_FUTURE), _FAR_FUTURE)
+        end = np.minimum(next_day, expires)
+        spell = has_val & ~np.isnan(club) & (end > day)
+
+        # Birth date and position once per player, then gathered per spell
+        info = players.drop_duplicates("player_id").sort_values("player_id")
+        ids = info["player_id"].to_numpy(np.int64)
+        birth = np.append(_days(info["date_of_birth"]), np.datetime64("NaT", "D"))
+        position = np.append(info["position"].map({p: i for i, p in enumerate(POSITIONS)})
+                             .fillna(-1).to_numpy(np.int8), -1)
+        slot = np.searchsorted(ids, pid[spell])
+        found = slot < len(ids)
+        found[found] = ids[slot[found]] == pid[spell][found]
+        slot = np.where(found, slot, len(ids))      # the appended NaT / -1
+        return cls(pid[spell], club[spell], day[spell], end[spell], value[spell],
+                   birth[slot], position[slot])
+
+    @classmethod
+    def from_connection(cls, conn: sqlite3.Connection, clubs=None,
+                        stale_days: int = STALE_DAYS) -> "SquadHistory":
+        """Spells from ``fact_valuation_returns`` and ``transfers``, of every player
+        or only of those who were ever at one of ``clubs``."""
+        subset, params = "", []
+        if clubs is not None:
+            clubs = [int(c) for c in clubs]
+            marks = ",".join("?" * len(clubs))
+            # Found once, then passed as a JSON array to the three reads below
+            ids = [r[0] for r in conn.execute(
+                f"SELECT player_id FROM fact_valuation_returns WHERE club_id IN ({marks}) "
+                f"UNION SELECT player_id FROM transfers WHERE to_club_id IN ({marks})", clubs * 2)]
+            subset = "AND player_id IN (SELECT value FROM json_each(?))"
+            params = [json.dumps(ids)]
+        # Dates as epoch days: integers fetch and convert much faster than text
+        valuations = pd.read_sql_query(
+            "SELECT player_id, CAST(julianday(substr(date, 1, 10)) - 2440587.5 AS INTEGER) AS date, "
+            "club_id, market_value_in_eur AS value FROM fact_valuation_returns "
+            f"WHERE market_value_in_eur > 0 {subset}",
+            conn, params=params,
+        )
+        transfers = pd.read_sql_query(
+            "SELECT player_id, transfer_epoch_day AS date, to_club_id AS club_id FROM transfers "
+            f"WHERE to_club_id IS NOT NULL {subset}",
+            conn, params=params,
+        )
+        players = pd.read_sql_query(
+            f"SELECT player_id, date_of_birth, position FROM players WHERE player_id IS NOT NULL {subset}",
+            conn, params=params,
+        )
+        return cls.from_frames(valuations, transfers, players, stale_days)
+
+    def __len__(self):
+        return len(self.player_id)
+
+    def members(self, dates, clubs=None) -> tuple[np.ndarray, np.ndarray]:
+        """(spell, date) index pairs: spell ``i`` is in its club's squad on ``dates[j]``.
+
+        ``dates`` must be sorted; ``clubs`` restricts the spells to those clubs.
+        """
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        spells = np.arange(len(self)) if clubs is None else np.flatnonzero(np.isin(self.club_id, clubs))
+        lo = np.searchsorted(dates, self.start[spells], side="left")
+        hi = np.searchsorted(dates, self.end[spells], side="left")
+        counts = hi - lo
+        spell = np.repeat(spells, counts)
+        date = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return spell, date
+
+    def squads(self, date, clubs=None) -> pd.DataFrame:
+        """Every squad as of one date: ``club_id, player_id, value``."""
+        spell, _ = self.members(np.array([date], dtype="datetime64[D]"), clubs)
+        return pd.DataFrame({"club_id": self.club_id[spell], "player_id": self.player_id[spell],
+                             "value": self.value[spell]}).sort_values(
+            ["club_id", "value"], ascending=[True, False], ignore_index=True)
+
+    def portfolios(self, dates, clubs=None) -> pd.DataFrame:
+        """Portfolio metrics of every club (or ``clubs``) on every date, in one sweep.
+
+        One row per club and date with a non-empty squad.
+        """
+        dates = np.unique(np.asarray(dates, dtype="datetime64[D]"))
+        spell, date = self.members(dates, clubs)
+        club_ids, club = np.unique(self.club_id[spell], return_inverse=True)
+        size = len(club_ids) * len(dates)
+        cell = club * len(dates) + date
+        value = self.value[spell]
+
+        def total(weights=None):
+            return np.bincount(cell, weights, minlength=size)
+
+        count = total()
+        squad_value = total(value)
+        top = np.zeros(size)
+        np.maximum.at(top, cell, value)
+        age = np.floor((dates[date] - self.birth[spell]).astype(np.float64) / 365.25)
+        known_age = ~np.isnan(age)
+        age_sum = total(np.where(known_age, age, 0.0))
+        age_count = total(known_age.astype(np.float64))
+        over_30 = total(np.where(age >= 30, value, 0.0))
+        by_position = {p: total(np.where(self.position[spell] == i, value, 0.0))
+                       for i, p in enumerate(POSITIONS)}
+
+        filled = np.flatnonzero(count > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            df = pd.DataFrame({
+                "club_id": club_ids[filled // len(dates)],
+                "date": dates[filled % len(dates)],
+                "player_count": count[filled].astype(np.int64),
+                "total_squad_value": squad_value[filled],
+                "avg_player_value": np.round(squad_value[filled] / count[filled], 0),
+                "max_player_value": top[filled],
+                "star_dependency_pct": np.round(top[filled] * 100.0 / squad_value[filled], 2),
+                "over_30_value_pct": np.round(over_30[filled] * 100.0 / squad_value[filled], 2),
+                "average_age": np.round(age_sum[filled] / age_count[filled], 1),
+            })
+        for p, values in by_position.items():
+            df[f"{p.lower()}_value"] = values[filled]
+        return df
+
+
+def club_portfolios(conn: sqlite3.Connection, dates=None, leagues=BIG5,
+                    history: SquadHistory | None = None) -> pd.DataFrame:
+    """Squad portfolio of every club in ``leagues`` on every date (default: monthly
+    from ``HISTORY_START`` to the latest valuation), with club name and league."""
+    clubs = pd.read_sql_query(
+        f"SELECT club_id, name AS club_name, domestic_competition_id AS league_id FROM clubs "
+        f"WHERE domestic_competition_id IN ({','.join('?' * len(leagues))})",
+        conn, params=list(leagues),
+    )
+    if history is None:
+        history = SquadHistory.from_connection(conn, clubs["club_id"])
+    if dates is None:
+        last = conn.execute("SELECT MAX(date) FROM fact_valuation_returns").fetchone()[0]
+        dates = monthly_dates(HISTORY_START, last[:10] if last else HISTORY_START)
+    df = history.portfolios(dates, clubs["club_id"].to_numpy())
+    return clubs.merge(df, on="club_id").sort_values(["club_id", "date"], ignore_index=True)
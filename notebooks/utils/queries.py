@@ -0,0 +1,583 @@
+"""SQL shared by the analysis notebooks, the dashboard export and the CLI pipeline.
+
+``build_notebooks.py`` embeds these strings in notebooks 02-05;
+``utils/pipeline.py`` and ``utils/dashboard_export.py`` run them headless.
+"""
+
+# ── 02 EDA ──
+SQL_TRANSFERS = '''
+    SELECT transfer_fee, market_value_in_eur, player_name,
+           from_club_name, to_club_name, transfer_season
+    FROM transfers
+    WHERE transfer_fee > 1000000
+'''
+
+SQL_MV_TREND = '''
+    SELECT
+        year,
+        league_id,
+        player_count,
+        sum_value / 1e9 as total_value_bn,
+        sum_value / n_valuations / 1e6 as avg_value_m
+    FROM agg_league_year
+    WHERE league_id IN ('GB1','ES1','IT1','L1','FR1')
+      AND n_valuations > 0
+      AND year >= 2012
+    ORDER BY year, league_id
+'''
+
+# Median per position and age taken in SQLite (MEDIAN, utils/sqlfuncs.py).
+# Notebook 02 takes the same medians from the columnar mirror (utils/columnar.py)
+SQL_AGE_EDA = '''
+    SELECT
+        p.position,
+        pv.valuation_age as age,
+        MEDIAN(pv.market_value_in_eur / 1e6) as value_m
+    FROM player_valuations pv
+    JOIN players p ON pv.player_id = p.player_id
+    WHERE p.position IN ('Attack', 'Midfield', 'Defender', 'Goalkeeper')
+      AND p.date_of_birth IS NOT NULL
+      AND pv.market_value_in_eur > 0
+      AND pv.date >= '2015-01-01'
+      AND pv.valuation_age BETWEEN 16 AND 40
+    GROUP BY p.position, pv.valuation_age
+    ORDER BY p.position, age
+'''
+
+SQL_VALS_DIST = '''
+    SELECT market_value_in_eur / 1e6 as value_m
+    FROM player_valuations
+    WHERE market_value_in_eur > 0
+      AND date >= '2023-01-01'
+'''
+
+# ── 03 SQL analysis ──
+SQL_YOY = '''
+    WITH yearly AS (
+        SELECT
+            year,
+            league_id,
+            sum_value / 1e9 as total_value_bn
+        FROM agg_league_year
+        WHERE league_id IN ('GB1','ES1','IT1','L1','FR1')
+          AND n_valuations > 0
+          AND year >= 2012
+    )
+    SELECT year, league_id,
+        ROUND(total_value_bn, 2) as total_value_bn,
+        ROUND(
+            (total_value_bn - LAG(total_value_bn) OVER (PARTITION BY league_id ORDER BY year))
+            * 100.0
+            / NULLIF(LAG(total_value_bn) OVER (PARTITION BY league_id ORDER BY year), 0),
+        1) as yoy_growth_pct
+    FROM yearly
+    ORDER BY league_id, year DESC
+    LIMIT 25
+'''
+
+SQL_ROI = '''
+    WITH transfer_roi AS (
+        SELECT
+            t.player_name, t.transfer_fee, t.transfer_date,
+            t.from_club_name, t.to_club_name,
+            (SELECT pv.market_value_in_eur
+             FROM player_valuations pv
+             WHERE pv.player_id = t.player_id
+               AND pv.date > t.transfer_date
+               AND pv.date <= DATE(t.transfer_date, '+365 days')
+             ORDER BY pv.date DESC LIMIT 1) AS mv_after_1yr
+        FROM transfers t
+        WHERE t.transfer_fee > 10000000
+    )
+    SELECT
+        player_name,
+        ROUND(transfer_fee / 1e6, 1) as fee_m,
+        ROUND(mv_after_1yr / 1e6, 1) as value_1yr_m,
+        ROUND((mv_after_1yr - transfer_fee) * 100.0 / transfer_fee, 1) as roi_pct,
+        CASE
+            WHEN mv_after_1yr > transfer_fee * 1.5 THEN 'Excellent (>50%)'
+            WHEN mv_after_1yr > transfer_fee THEN 'Positive'
+            WHEN mv_after_1yr > transfer_fee * 0.7 THEN 'Moderate Loss'
+            ELSE 'Significant Loss'
+        END as roi_category
+    FROM transfer_roi
+    WHERE mv_after_1yr IS NOT NULL
+    ORDER BY fee_m DESC LIMIT 20
+'''
+
+SQL_PEAK_AGE = '''
+    WITH age_values AS (
+        SELECT
+            p.position,
+            pv.valuation_age as age,
+            AVG(pv.market_value_in_eur) as avg_value
+        FROM player_valuations pv
+        JOIN players p ON pv.player_id = p.player_id
+        WHERE p.position IN ('Attack', 'Midfield', 'Defender', 'Goalkeeper')
+          AND p.date_of_birth IS NOT NULL
+          AND pv.market_value_in_eur > 0
+          AND pv.date >= '2015-01-01'
+        GROUP BY p.position, age
+        HAVING age BETWEEN 17 AND 38
+    ),
+    ranked AS (
+        SELECT position, age,
+            ROUND(avg_value / 1e6, 2) as avg_value_m,
+            ROUND(PERCENT_RANK() OVER (PARTITION BY position ORDER BY avg_value) * 100, 1) as value_pct_rank,
+            ROW_NUMBER() OVER (PARTITION BY position ORDER BY avg_value DESC) as value_rank
+        FROM age_values
+    )
+    SELECT position, age, avg_value_m, value_pct_rank
+    FROM ranked WHERE value_rank = 1
+    ORDER BY avg_value_m DESC
+'''
+
+SQL_SHARPE = '''
+    WITH monthly_values AS (
+        SELECT
+            league_id,
+            month,
+            sum_value / n_valuations as avg_value
+        FROM agg_league_month
+        WHERE league_id IN ('GB1','ES1','IT1','L1','FR1')
+          AND n_valuations > 0
+          AND month >= '2015-01'
+    ),
+    monthly_returns AS (
+        SELECT league_id, month,
+            (avg_value - LAG(avg_value) OVER (PARTITION BY league_id ORDER BY month))
+            * 100.0 / NULLIF(LAG(avg_value) OVER (PARTITION BY league_id ORDER BY month), 0)
+            as monthly_return_pct
+        FROM monthly_values
+    )
+    SELECT league_id,
+        ROUND(AVG(monthly_return_pct), 3) as avg_monthly_return,
+        ROUND(STDDEV_POP(monthly_return_pct), 3) as volatility,
+        ROUND(AVG(monthly_return_pct) / NULLIF(STDDEV_POP(monthly_return_pct), 0), 3) as sharpe_ratio
+    FROM monthly_returns
+    WHERE monthly_return_pct IS NOT NULL
+    GROUP BY league_id
+    ORDER BY sharpe_ratio DESC
+'''
+
+# Keyed by club ID (names differ between transfers and clubs); the dashboard's
+# per-season net spend comes from utils/transfer_network.py.
+SQL_NET_SPEND = '''
+    -- NOT INDEXED: one sequential scan beats fetching most rows through a date or club index
+    WITH club_spend AS (
+        SELECT to_club_id as club_id, SUM(transfer_fee) as total_spent
+        FROM transfers NOT INDEXED WHERE transfer_fee > 0 AND transfer_date >= '2018-01-01'
+        GROUP BY club_id
+    ),
+    club_receipts AS (
+        SELECT from_club_id as club_id, SUM(transfer_fee) as total_received
+        FROM transfers NOT INDEXED WHERE transfer_fee > 0 AND transfer_date >= '2018-01-01'
+        GROUP BY club_id
+    ),
+    net AS (
+        SELECT COALESCE(s.club_id, r.club_id) as club_id,
+            COALESCE(s.total_spent, 0) as total_spent,
+            COALESCE(r.total_received, 0) as total_received
+        FROM club_spend s
+        FULL OUTER JOIN club_receipts r ON s.club_id = r.club_id
+        WHERE COALESCE(s.club_id, r.club_id) IS NOT NULL
+    )
+    SELECT COALESCE(c.name, CAST(n.club_id AS TEXT)) as club,
+        ROUND(n.total_spent / 1e6, 1) as spent_m,
+        ROUND(n.total_received / 1e6, 1) as received_m,
+        ROUND((n.total_received - n.total_spent) / 1e6, 1) as net_spend_m
+    FROM net n
+    LEFT JOIN clubs c ON c.club_id = n.club_id
+    ORDER BY spent_m DESC LIMIT 20
+'''
+
+# Performance against value: season rows of the cube (materialized.py) instead
+# of every appearance; a season's value is the player's last valuation before
+# 1 July of its end year, found on the (player_id, date) key
+SQL_VALUE_PER_GOAL = '''
+    WITH scorers AS (
+        SELECT player_id, season, competition_id as league_id, SUM(goals) as goals
+        FROM cube_player_season
+        WHERE competition_id IN ('GB1','ES1','IT1','L1','FR1')
+          AND season >= 2015
+        GROUP BY player_id, season, competition_id
+        HAVING SUM(goals) > 0
+    ),
+    valued AS (
+        SELECT s.*,
+            (SELECT r.market_value_in_eur
+             FROM fact_valuation_returns r
+             WHERE r.player_id = s.player_id
+               AND r.date < printf('%d-07-01', s.season + 1)
+             ORDER BY r.date DESC LIMIT 1) as season_value
+        FROM scorers s
+    )
+    SELECT league_id, season,
+        COUNT(*) as scorers,
+        SUM(goals) as goals,
+        ROUND(SUM(season_value) / 1e6, 1) as scorer_value_m,
+        ROUND(SUM(season_value) / SUM(goals) / 1e6, 2) as value_per_goal_m
+    FROM valued
+    WHERE season_value IS NOT NULL
+    GROUP BY league_id, season
+    ORDER BY league_id, season
+'''
+
+SQL_MINUTES_VALUE = '''
+    WITH player_seasons AS (
+        SELECT player_id, season, SUM(minutes) as minutes, SUM(goals + assists) as contributions
+        FROM cube_player_season
+        WHERE competition_id IN ('GB1','ES1','IT1','L1','FR1')
+          AND season BETWEEN 2015 AND 2023
+        GROUP BY player_id, season
+    ),
+    valued AS (
+        SELECT s.*,
+            (SELECT r.market_value_in_eur FROM fact_valuation_returns r
+             WHERE r.player_id = s.player_id AND r.date < printf('%d-07-01', s.season)
+             ORDER BY r.date DESC LIMIT 1) as value_start,
+            (SELECT r.market_value_in_eur FROM fact_valuation_returns r
+             WHERE r.player_id = s.player_id AND r.date < printf('%d-07-01', s.season + 1)
+             ORDER BY r.date DESC LIMIT 1) as value_end
+        FROM player_seasons s
+    )
+    SELECT
+        CASE
+            WHEN minutes < 900 THEN '0-899'
+            WHEN minutes < 1800 THEN '900-1799'
+            WHEN minutes < 2700 THEN '1800-2699'
+            ELSE '2700+'
+        END as minutes_band,
+        COUNT(*) as player_seasons,
+        ROUND(AVG(minutes), 0) as avg_minutes,
+        ROUND(AVG(contributions * 90.0 / NULLIF(minutes, 0)), 3) as contributions_per_90,
+        ROUND(AVG((value_end - value_start) * 100.0 / value_start), 1) as avg_value_change_pct,
+        ROUND(SUM(value_end - value_start) * 1000.0 / NULLIF(SUM(minutes), 0) / 1e6, 3) as value_change_per_1000_min_m
+    FROM valued
+    WHERE value_start > 0 AND value_end IS NOT NULL
+    GROUP BY minutes_band
+    ORDER BY MIN(minutes)
+'''
+
+# ── 04 Statistical models ──
+# Streamed through reducers.PolyFit (sufficient statistics per position)
+SQL_REG = '''
+    SELECT
+        p.position,
+        pv.valuation_age as age,
+        LOG(pv.market_value_in_eur) as log_value
+    FROM player_valuations pv
+    JOIN players p ON pv.player_id = p.player_id
+    WHERE p.position IN ('Attack', 'Midfield', 'Defender', 'Goalkeeper')
+      AND p.date_of_birth IS NOT NULL
+      AND pv.market_value_in_eur > 100000
+      AND pv.date >= '2015-01-01'
+      AND pv.valuation_age BETWEEN 17 AND 38
+'''
+
+# Joined on club IDs
+SQL_CLUSTERS = '''
+    WITH club_mv AS (
+        SELECT
+            pv.current_club_id as club_id,
+            MAX(pv.current_club_name) as club,
+            pv.player_club_domestic_competition_id as league,
+            SUM(pv.market_value_in_eur) / 1e6 as squad_value_m,
+            COUNT(DISTINCT pv.player_id) as squad_size
+        FROM player_valuations pv
+        WHERE pv.player_club_domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
+          AND pv.market_value_in_eur > 0
+          AND pv.valuation_month = '2023-06'
+        GROUP BY pv.current_club_id, pv.player_club_domestic_competition_id
+        HAVING squad_size >= 10
+    ),
+    club_transfers AS (
+        -- NOT INDEXED as in SQL_NET_SPEND: a sequential scan beats the date and club indexes
+        SELECT to_club_id as club_id, COUNT(DISTINCT player_id) as transfer_activity
+        FROM transfers NOT INDEXED WHERE transfer_date >= '2020-01-01' GROUP BY club_id
+    ),
+    club_age AS (
+        SELECT pv.current_club_id as club_id,
+            AVG(pv.valuation_age) as avg_age
+        FROM player_valuations pv
+        WHERE pv.player_club_domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
+          AND pv.valuation_age IS NOT NULL
+          AND pv.valuation_month = '2023-06'
+        GROUP BY pv.current_club_id
+    )
+    SELECT m.club, m.league, m.squad_value_m, m.squad_size,
+        COALESCE(a.avg_age, 26.0) as average_age,
+        COALESCE(t.transfer_activity, 0) as transfer_activity
+    FROM club_mv m
+    LEFT JOIN club_transfers t ON m.club_id = t.club_id
+    LEFT JOIN club_age a ON m.club_id = a.club_id
+    WHERE m.squad_value_m > 0
+    ORDER BY m.squad_value_m DESC
+'''
+
+SQL_TS = '''
+    SELECT month || '-01' as date, league_id,
+        sum_value / n_valuations / 1e6 as avg_value_m
+    FROM agg_league_month
+    WHERE league_id IN ('GB1','ES1','IT1','L1','FR1')
+      AND n_valuations > 0
+      AND month >= '2015-01'
+    ORDER BY date, league_id
+'''
+
+# ── 05 Dashboard export ──
+
+# ── market_overview / league_comparison / top_transfers / age_curves ──
+SQL_MKT_OVR = '''
+    WITH yearly AS (
+        SELECT
+            year,
+            league_id,
+            sum_value as total_market_value,
+            player_count,
+            sum_value / n_valuations as avg_player_value
+        FROM agg_league_month
+        WHERE league_id IN ('GB1','ES1','IT1','L1','FR1')
+          AND n_valuations > 0
+          AND substr(month, 6, 2) = '01'
+    )
+    SELECT year, league_id, total_market_value, player_count, avg_player_value,
+        ROUND(
+            (total_market_value - LAG(total_market_value) OVER (PARTITION BY league_id ORDER BY year))
+            * 100.0
+            / NULLIF(LAG(total_market_value) OVER (PARTITION BY league_id ORDER BY year), 0),
+        1) as yoy_growth_pct
+    FROM yearly
+    WHERE year BETWEEN 2012 AND 2025
+    ORDER BY year, league_id
+'''
+
+SQL_LGC = '''
+    WITH latest_year AS (
+        SELECT MAX(valuation_year) - 1 as yr
+        FROM player_valuations
+        WHERE player_club_domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
+    ),
+    league_totals AS (
+        SELECT pv.player_club_domestic_competition_id as league_id,
+            SUM(pv.market_value_in_eur) as total_value,
+            AVG(pv.market_value_in_eur) as avg_value,
+            COUNT(DISTINCT pv.player_id) as player_count
+        FROM player_valuations pv, latest_year ly
+        WHERE pv.player_club_domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
+          AND pv.market_value_in_eur > 0
+          AND pv.valuation_year = ly.yr
+        GROUP BY pv.player_club_domestic_competition_id
+    ),
+    club_vals AS (
+        SELECT c.domestic_competition_id as league_id, c.name as club_name,
+            c.total_market_value,
+            ROW_NUMBER() OVER (PARTITION BY c.domestic_competition_id ORDER BY c.total_market_value DESC) as rn
+        FROM clubs c
+        WHERE c.domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
+          AND c.total_market_value > 0
+    )
+    SELECT lt.league_id, lt.total_value, lt.avg_value, lt.player_count,
+        cv.club_name as top_club, cv.total_market_value as top_club_value
+    FROM league_totals lt
+    LEFT JOIN club_vals cv ON lt.league_id = cv.league_id AND cv.rn = 1
+    ORDER BY lt.total_value DESC
+'''
+
+SQL_TOPTRANS = '''
+    SELECT player_name, from_club_name as from_club, to_club_name as to_club,
+        ROUND(transfer_fee) as fee, transfer_season as season, transfer_date
+    FROM transfers
+    WHERE transfer_fee > 0
+    ORDER BY transfer_fee DESC LIMIT 15
+'''
+
+# Like SQL_AGE_EDA, median per age and position in SQLite
+SQL_AGECURVES = '''
+    SELECT
+        pv.valuation_age as age,
+        p.position,
+        MEDIAN(pv.market_value_in_eur / 1e6) as value_m
+    FROM player_valuations pv
+    JOIN players p ON pv.player_id = p.player_id
+    WHERE p.position IN ('Attack', 'Midfield', 'Defender', 'Goalkeeper')
+      AND p.date_of_birth IS NOT NULL
+      AND pv.market_value_in_eur > 0
+      AND pv.date >= '2015-01-01'
+      AND pv.valuation_age BETWEEN 17 AND 38
+    GROUP BY pv.valuation_age, p.position
+    ORDER BY age, p.position
+'''
+
+# ── risk_metrics ──
+SQL_VOL_HEAT = '''
+    WITH monthly AS (
+        SELECT league_id,
+            substr(month, 1, 4) as season, month,
+            sum_value / n_valuations as avg_val
+        FROM agg_league_month
+        WHERE league_id IN ('GB1','ES1','IT1','L1','FR1')
+          AND n_valuations > 0
+          AND month >= '2015-01'
+    ),
+    returns AS (
+        SELECT league_id, season,
+            (avg_val - LAG(avg_val) OVER (PARTITION BY league_id ORDER BY month))
+            * 100.0 / NULLIF(LAG(avg_val) OVER (PARTITION BY league_id ORDER BY month), 0)
+            as monthly_ret
+        FROM monthly
+    )
+    SELECT league_id, season,
+        ROUND(STDDEV_POP(monthly_ret), 2) as volatility
+    FROM returns
+    WHERE monthly_ret IS NOT NULL
+    GROUP BY league_id, season HAVING COUNT(*) >= 6
+    ORDER BY season, league_id
+'''
+
+# Reference SQL for drawdown_by_position; the export computes it with
+# utils/timeseries.py in one pass over sorted arrays instead.
+SQL_DRAWDOWN = '''
+    WITH player_peak AS (
+        SELECT player_id, position, market_value_in_eur,
+            MAX(market_value_in_eur) OVER (
+                PARTITION BY player_id ORDER BY date
+                ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+            ) as running_max
+        FROM fact_valuation_returns
+        WHERE position IN ('Attack', 'Midfield', 'Defender', 'Goalkeeper')
+    ),
+    drawdown AS (
+        SELECT player_id, position,
+            ROUND((market_value_in_eur - running_max) * 100.0 / running_max, 2) as drawdown_pct
+        FROM player_peak WHERE running_max > 0
+    ),
+    player_max_dd AS (
+        SELECT player_id, position, MIN(drawdown_pct) as max_drawdown
+        FROM drawdown GROUP BY player_id, position
+    )
+    SELECT position,
+        ROUND(AVG(max_drawdown), 1) as avg_max_drawdown,
+        ROUND(MIN(max_drawdown), 1) as worst_drawdown,
+        COUNT(*) as player_count
+    FROM player_max_dd GROUP BY position ORDER BY avg_max_drawdown
+'''
+
+SQL_DEPR = '''
+    WITH age_brackets AS (
+        SELECT position, age_bracket, simple_return * 100.0 as change_pct
+        FROM fact_valuation_returns
+        WHERE position IN ('Attack', 'Midfield', 'Defender', 'Goalkeeper')
+          AND age_bracket IS NOT NULL
+    )
+    SELECT position, age_bracket,
+        ROUND(AVG(change_pct), 2) as avg_change_pct,
+        ROUND(AVG(CASE WHEN change_pct < 0 THEN change_pct ELSE NULL END), 2) as depreciation_rate
+    FROM age_brackets
+    WHERE change_pct IS NOT NULL AND ABS(change_pct) < 200
+    GROUP BY position, age_bracket ORDER BY position, age_bracket
+'''
+
+SQL_SHARPE2 = '''
+    WITH monthly_vals AS (
+        SELECT league_id, month, sum_value / n_valuations as avg_val
+        FROM agg_league_month
+        WHERE league_id IN ('GB1','ES1','IT1','L1','FR1')
+          AND n_valuations > 0
+          AND month >= '2015-01'
+    ),
+    monthly_rets AS (
+        SELECT league_id, month,
+            (avg_val - LAG(avg_val) OVER (PARTITION BY league_id ORDER BY month))
+            * 100.0 / NULLIF(LAG(avg_val) OVER (PARTITION BY league_id ORDER BY month), 0)
+            as ret
+        FROM monthly_vals
+    )
+    SELECT league_id,
+        ROUND(AVG(ret) * 12, 2) as avg_return,
+        ROUND(STDDEV_POP(ret) * SQRT(12), 2) as volatility,
+        ROUND(AVG(ret) / NULLIF(STDDEV_POP(ret), 0), 3) as sharpe_ratio
+    FROM monthly_rets
+    WHERE ret IS NOT NULL GROUP BY league_id ORDER BY sharpe_ratio DESC
+'''
+
+
+# ── transfer_analytics ──
+SQL_FEE_TRANSFERS = '''
+    SELECT
+        t.player_id,
+        t.player_name,
+        t.transfer_fee,
+        t.transfer_date,
+        t.to_club_name,
+        t.from_club_name,
+        p.date_of_birth,
+        p.position
+    FROM transfers t
+    JOIN players p ON t.player_id = p.player_id
+    WHERE t.transfer_fee > 5000000
+      AND t.transfer_date >= '2015-01-01'
+      AND t.transfer_date <= '2024-01-01'
+'''
+
+# ── club_financials ──
+SQL_CLUB_LEAGUE = '''
+    SELECT name AS club_name, domestic_competition_id AS league_id
+    FROM clubs
+    WHERE domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
+'''
+
+SQL_CLUB_AGE_GROUPS = '''
+    SELECT
+        cl.name AS club_name,
+        CASE
+            WHEN CAST((julianday('now') - julianday(p.date_of_birth)) / 365.25 AS INTEGER) < 21 THEN 'U21'
+            WHEN CAST((julianday('now') - julianday(p.date_of_birth)) / 365.25 AS INTEGER) < 25 THEN '21-24'
+            WHEN CAST((julianday('now') - julianday(p.date_of_birth)) / 365.25 AS INTEGER) < 29 THEN '25-28'
+            WHEN CAST((julianday('now') - julianday(p.date_of_birth)) / 365.25 AS INTEGER) < 33 THEN '29-32'
+            ELSE '33+'
+        END AS age_group,
+        COUNT(*) AS count,
+        SUM(p.market_value_in_eur) AS value
+    FROM players p
+    JOIN clubs cl ON p.current_club_id = cl.club_id
+    WHERE cl.domestic_competition_id IN ('GB1','ES1','IT1','L1','FR1')
+      AND p.date_of_birth IS NOT NULL
+      AND p.market_value_in_eur > 0
+    GROUP BY cl.name, age_group
+    ORDER BY cl.name, age_group
+'''
+
+# ── player_positions ──
+SQL_POS_TREEMAP = '''
+    SELECT
+        sub_position AS name,
+        position,
+        SUM(market_value_in_eur) AS size
+    FROM players
+    WHERE market_value_in_eur > 0
+      AND sub_position IS NOT NULL
+      AND position IS NOT NULL
+    GROUP BY sub_position, position
+    ORDER BY size DESC
+'''
+
+SQL_VALUE_HIST = '''
+    SELECT
+        CASE
+            WHEN market_value_in_eur < 1000000 THEN '<1M'
+            WHEN market_value_in_eur < 5000000 THEN '1-5M'
+            WHEN market_value_in_eur < 10000000 THEN '5-10M'
+            WHEN market_value_in_eur < 20000000 THEN '10-20M'
+            WHEN market_value_in_eur < 50000000 THEN '20-50M'
+            WHEN market_value_in_eur < 100000000 THEN '50-100M'
+            ELSE '>100M'
+        END AS range,
+        COUNT(*) AS count
+    FROM players
+    WHERE market_value_in_eur > 0
+    GROUP BY range
+    ORDER BY MIN(market_value_in_eur)
+'''
+
+SQL_TOTAL_PLAYERS = 'SELECT COUNT(*) as n FROM players WHERE market_value_in_eur > 0'
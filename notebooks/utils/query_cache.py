@@ -0,0 +1,193 @@
+"""Persistent, invalidation-aware cache for query results.
+
+Results of read-only queries are stored on disk next to the database they
+came from (``football.db`` -> ``football.query_cache``). The cache key combines the normalized SQL
+text, the parameters and the content version (see ``ingest_meta``) of every
+table the query mentions, so any data change in those tables makes old
+entries unreachable. Entries are evicted least-recently-used once the cache
+exceeds ``max_bytes``.
+
+Results are stored as uncompressed Arrow IPC (Feather) files, one contiguous
+buffer per column that is memory-mapped on load. Without ``pyarrow``, or for
+the rare result Arrow cannot represent (an object column mixing types, which
+SQLite's dynamic typing allows), the DataFrame is pickled instead.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Queries whose result depends on the clock or randomness are never cached.
+_VOLATILE = re.compile(r"'now'|\brandom\s*\(|\bcurrent_(date|time|timestamp)\b", re.IGNORECASE)
+_READ_ONLY = re.compile(r"^\s*(select|with|values)\b", re.IGNORECASE)
+_TOKENS = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/|\s+|[^\s'"\-/]+|.""", re.S)
+
+
+def normalize_sql(query: str) -> str:
+    """Strip comments and collapse whitespace outside of string literals."""
+    out = []
+    for tok in _TOKENS.findall(query):
+        if tok.startswith("--") or tok.startswith("/*"):
+            out.append(" ")
+        elif tok.isspace():
+            out.append(" ")
+        else:
+            out.append(tok)
+    return re.sub(r" +", " ", "".join(out)).strip().rstrip(";").strip()
+
+
+def is_cacheable(query: str) -> bool:
+    """Only deterministic read-only statements are cached."""
+    return bool(_READ_ONLY.match(normalize_sql(query))) and not _VOLATILE.search(query)
+
+
+def referenced_tables(query: str, tables) -> list[str]:
+    """Known table names that appear as identifiers in the query."""
+    words = {w.lower() for w in re.findall(r"[A-Za-z_][A-Za-z0-9_]*", query)}
+    return sorted(t for t in tables if t.lower() in words)
+
+
+def _write_frame(df: pd.DataFrame, path: Path) -> str:
+    """Write ``df`` to ``path`` as Arrow IPC, else as a pickle; returns the entry suffix."""
+    try:
+        from pyarrow import ArrowException, feather
+    except ImportError:
+        feather = None
+    if feather is not None:
+        try:
+            feather.write_feather(df, path, compression="uncompressed")
+            return ".arrow"
+        except (ArrowException, TypeError, ValueError):
+            pass
+    df.to_pickle(path, protocol=5)
+    return ".pkl"
+
+
+def _read_frame(path: Path) -> pd.DataFrame:
+    if path.suffix == ".arrow":
+        from pyarrow import feather
+
+        return feather.read_feather(path, memory_map=True)
+    return pd.read_pickle(path)
+
+
+class QueryCache:
+    """On-disk LRU cache of DataFrame results keyed by SQL and table versions."""
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with self._index() as idx:
+            idx.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    tables TEXT,
+                    bytes INTEGER,
+                    created REAL,
+                    last_used REAL,
+                    hits INTEGER DEFAULT 0
+                )
+            """)
+
+    @contextmanager
+    def _index(self):
+        """Short-lived connection to the cache index, committed on exit."""
+        conn = sqlite3.connect(self.cache_dir / "index.sqlite", timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _paths(self, key: str) -> list[Path]:
+        """Possible entry files of ``key``, Arrow first."""
+        return [self.cache_dir / f"{key}{suffix}" for suffix in (".arrow", ".pkl")]
+
+    def key(self, query: str, params, versions: dict[str, str]) -> str:
+        payload = json.dumps(
+            {"sql": normalize_sql(query), "params": [repr(p) for p in params], "versions": versions},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> pd.DataFrame | None:
+        df = None
+        for path in self._paths(key):
+            try:
+                df = _read_frame(path)
+                break
+            except (FileNotFoundError, EOFError, OSError):
+                continue
+        if df is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        with self._index() as idx:
+            idx.execute("UPDATE entries SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                        (time.time(), key))
+        return df
+
+    def put(self, key: str, df: pd.DataFrame, tables: list[str]):
+        tmp = self.cache_dir / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        path = self.cache_dir / f"{key}{_write_frame(df, tmp)}"
+        os.replace(tmp, path)
+        now = time.time()
+        with self._index() as idx:
+            idx.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, 0)",
+                        (key, ",".join(tables), path.stat().st_size, now, now))
+        self.evict()
+
+    def evict(self):
+        """Drop least-recently-used entries until the cache fits ``max_bytes``."""
+        with self._index() as idx:
+            total = idx.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, size in idx.execute("SELECT key, bytes FROM entries ORDER BY last_used").fetchall():
+                for path in self._paths(key):
+                    path.unlink(missing_ok=True)
+                idx.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def clear(self):
+        with self._index() as idx:
+            for (key,) in idx.execute("SELECT key FROM entries").fetchall():
+                for path in self._paths(key):
+                    path.unlink(missing_ok=True)
+            idx.execute("DELETE FROM entries")
+        self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        """Hit/miss counts of this process plus size of the on-disk cache."""
+        with self._index() as idx:
+            entries, size = idx.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
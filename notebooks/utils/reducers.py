@@ -0,0 +1,154 @@
+"""Chunk-wise reducers for query results too large to hold in memory.
+
+``db_helpers.reduce_query`` streams a query through one or more reducers,
+one chunk at a time; each keeps only a compact state and returns its result
+at the end:
+
+=====================================  =========================================
+``GroupMedian(by, column)``            exact median per group, from value counts
+``Histogram(column, edges)``           counts over fixed bin edges
+``PolyFit(by, x, y, degree)``          least-squares polynomial per group, from
+                                       sufficient statistics (power sums)
+``GroupSample(by, n, seed)``           uniform sample of ``n`` rows per group
+=====================================  =========================================
+
+Market values are quoted in steps (25k, 50k, ...) and ages are whole years, so
+the counts behind ``GroupMedian`` stay small however many rows stream past.
+``PolyFit`` keeps ``2 * degree + 1`` power sums of ``x``, ``degree + 1``
+cross sums and the sum of squares of ``y`` per group, enough for the normal
+equations and R².
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _keys(by) -> list[str]:
+    return [by] if isinstance(by, str) else list(by)
+
+
+def _plain(df: pd.DataFrame, columns) -> pd.DataFrame:
+    """Categorical group keys as plain values, so chunks whose categories differ
+    combine cleanly and results sort by value rather than by category order."""
+    for col in columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+    return df
+
+
+class GroupMedian:
+    """Median of ``column`` per ``by`` group, like the ``MEDIAN`` SQL function."""
+
+    def __init__(self, by, column: str):
+        self.by = _keys(by)
+        self.column = column
+        self._counts = None
+
+    def update(self, chunk: pd.DataFrame):
+        keys = self.by + [self.column]
+        counts = _plain(chunk.groupby(keys, observed=True).size().rename("n").reset_index(), self.by)
+        if self._counts is not None:
+            counts = pd.concat([self._counts, counts], ignore_index=True)
+            counts = counts.groupby(keys, observed=True, as_index=False)["n"].sum()
+        self._counts = counts
+
+    def result(self) -> pd.DataFrame:
+        if self._counts is None:
+            return pd.DataFrame(columns=self.by + [self.column])
+        df = self._counts.sort_values(self.by + [self.column], ignore_index=True)
+        grouped = df.groupby(self.by, observed=True, sort=False)["n"]
+        cum = grouped.cumsum()
+        total = grouped.transform("sum")
+        # 0-based ranks of the middle value(s); interpolated like sqlfuncs.Quantile
+        lo = df[cum > (total - 1) // 2].groupby(self.by, observed=True)[self.column].first()
+        hi = df[cum > total // 2].groupby(self.by, observed=True)[self.column].first()
+        frac = np.where(df.groupby(self.by, observed=True)["n"].sum() % 2 == 0, 0.5, 0.0)
+        return (lo + (hi - lo) * frac).rename(self.column).reset_index()
+
+
+class Histogram:
+    """Counts of ``column`` over the bin ``edges`` (e.g. ``np.logspace(-2, 3, 101)``)."""
+
+    def __init__(self, column: str, edges):
+        self.column = column
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+
+    def update(self, chunk: pd.DataFrame):
+        values = chunk[self.column].dropna().to_numpy(dtype=np.float64)
+        self.counts += np.histogram(values, self.edges)[0]
+
+    def result(self) -> pd.DataFrame:
+        return pd.DataFrame({"left": self.edges[:-1], "right": self.edges[1:], "count": self.counts})
+
+
+class PolyFit:
+    """Least-squares fit of ``y`` on ``1, x, ..., x**degree`` per ``by`` group.
+
+    Rows with a missing ``x`` or ``y`` are skipped. The coefficients and R²
+    equal an ordinary least-squares fit on all rows at once.
+    """
+
+    def __init__(self, by, x: str, y: str, degree: int = 2):
+        self.by = _keys(by)
+        self.x, self.y, self.degree = x, y, degree
+        self._sums = None
+
+    def update(self, chunk: pd.DataFrame):
+        chunk = chunk.dropna(subset=[self.x, self.y])
+        x = chunk[self.x].to_numpy(dtype=np.float64)
+        y = chunk[self.y].to_numpy(dtype=np.float64)
+        terms = {f"x{k}": x ** k for k in range(2 * self.degree + 1)}
+        terms.update({f"x{k}y": x ** k * y for k in range(self.degree + 1)})
+        terms["yy"] = y * y
+        sums = _plain(chunk[self.by].assign(**terms).groupby(self.by, observed=True, as_index=False).sum(),
+                      self.by)
+        if self._sums is not None:
+            sums = pd.concat([self._sums, sums], ignore_index=True)
+            sums = sums.groupby(self.by, observed=True, as_index=False).sum()
+        self._sums = sums
+
+    def result(self) -> pd.DataFrame:
+        """One row per group: ``n``, ``coef`` (lowest power first) and ``r2``."""
+        rows = []
+        for _, s in ([] if self._sums is None else self._sums.iterrows()):
+            d = self.degree
+            xtx = np.array([[s[f"x{i + j}"] for j in range(d + 1)] for i in range(d + 1)])
+            xty = np.array([s[f"x{k}y"] for k in range(d + 1)])
+            n = s["x0"]
+            coef = np.linalg.lstsq(xtx, xty, rcond=None)[0]
+            sse = s["yy"] - 2 * coef @ xty + coef @ xtx @ coef
+            sst = s["yy"] - xty[0] ** 2 / n
+            rows.append({**s[self.by].to_dict(), "n": int(n), "coef": coef,
+                         "r2": 1 - sse / sst if sst > 0 else np.nan})
+        return pd.DataFrame(rows, columns=self.by + ["n", "coef", "r2"])
+
+    @staticmethod
+    def predict(coef, x) -> np.ndarray:
+        return np.polynomial.polynomial.polyval(np.asarray(x, dtype=np.float64), coef)
+
+
+class GroupSample:
+    """Uniform random sample of up to ``n`` rows per ``by`` group (e.g. for scatter plots).
+
+    Every row draws a random key and the ``n`` smallest keys per group are
+    kept, so the sample does not depend on how the stream is chunked.
+    """
+
+    def __init__(self, by, n: int, seed: int = 42):
+        self.by = _keys(by)
+        self.n = n
+        self._rng = np.random.default_rng(seed)
+        self._sample = None
+
+    def update(self, chunk: pd.DataFrame):
+        chunk = chunk.assign(_key=self._rng.random(len(chunk)))
+        if self._sample is not None:
+            chunk = pd.concat([self._sample, chunk], ignore_index=True)
+        self._sample = (chunk.sort_values("_key")
+                        .groupby(self.by, observed=True, sort=False).head(self.n))
+
+    def result(self) -> pd.DataFrame:
+        if self._sample is None:
+            return pd.DataFrame()
+        return self._sample.sort_values(self.by, kind="stable").drop(columns="_key").reset_index(drop=True)
@@ -0,0 +1,199 @@
+"""Run the ``sql/`` files statement by statement, concurrently.
+
+Each file is split into statements (``db_helpers.split_statements``), and
+every statement is named after its ``-- Query N: <title>`` comment
+(``market_value_volatility_by_league``), else ``query_<n>``. Consecutive
+read-only statements are independent and run in parallel through
+``run_query`` (pooled read connections, result cache); any other statement
+(DDL, INSERT, ...) is a barrier that runs alone on a write connection once
+everything before it has finished.
+
+A directory run schedules the statements of all files together and reports
+per statement: rows, wall time and the error, if any; a failing statement
+does not stop the others. With ``--out`` each result is saved as CSV next to
+a ``summary.json``, which is what the nightly reporting job keeps.
+
+Usage:
+    python -m notebooks.utils.sql_runner                          # sql/01-07
+    python -m notebooks.utils.sql_runner sql/05_risk_analysis.sql
+    python -m notebooks.utils.sql_runner --out --no-cache         # nightly job
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from . import db_helpers
+from .query_cache import normalize_sql
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+SQL_DIR = PROJECT_ROOT / "sql"
+REPORT_DIR = db_helpers.DATA_PROCESSED / "sql_reports"
+# Analysis files; 00_create_tables.sql is the schema, run by the loader
+SQL_FILES = "[0-9][0-9]_*.sql"
+SKIP_FILES = {"00_create_tables.sql"}
+
+_QUERY_TITLE = re.compile(r"^--\s*Query\s+\d+\s*:\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+_READ_ONLY = re.compile(r"^(select|with|values|explain)\b", re.IGNORECASE)
+
+
+def _slug(title: str) -> str:
+    title = title.split(" -- ")[0]
+    return re.sub(r"[^a-z0-9]+", "_", title.lower()).strip("_")
+
+
+def statements(path: Path) -> list[dict]:
+    """The statements of one ``.sql`` file with their names."""
+    path = Path(path)
+    out, names = [], set()
+    for i, sql in enumerate(db_helpers.split_statements(path.read_text(encoding="utf-8")), 1):
+        title = _QUERY_TITLE.search(sql)
+        name = _slug(title.group(1)) if title else ""
+        if not name or name in names:
+            name = f"query_{i}"
+        names.add(name)
+        out.append({"file": path.stem, "index": i, "name": name, "sql": sql,
+                    "read_only": bool(_READ_ONLY.match(normalize_sql(sql)))})
+    return out
+
+
+def _phases(stmts: list[dict]) -> list[list[dict]]:
+    """Runs of read-only statements; every other statement is a phase of its own."""
+    phases = []
+    for stmt in stmts:
+        if stmt["read_only"] and phases and phases[-1][0]["read_only"]:
+            phases[-1].append(stmt)
+        else:
+            phases.append([stmt])
+    return phases
+
+
+def _execute(stmt: dict, use_cache: bool, backend: str | None) -> dict:
+    rec = {k: stmt[k] for k in ("file", "index", "name", "sql")}
+    rec.update(result=None, rows=None, error=None)
+    start = time.perf_counter()
+    try:
+        if stmt["read_only"]:
+            rec["result"] = db_helpers.run_query(stmt["sql"], use_cache=use_cache, backend=backend)
+            rec["rows"] = len(rec["result"])
+        else:
+            conn = db_helpers.get_connection("write")
+            try:
+                count = conn.execute(stmt["sql"]).rowcount
+                rec["rows"] = count if count >= 0 else None     # -1 for DDL
+                conn.commit()
+            finally:
+                conn.close()
+    except Exception as e:  # reported per statement; the batch goes on
+        rec["error"] = e
+    rec["elapsed_s"] = round(time.perf_counter() - start, 4)
+    return rec
+
+
+def run_statements(stmts: list[dict], workers: int | None = None, use_cache: bool = True,
+                   backend: str | None = None) -> list[dict]:
+    """Execute statements (from :func:`statements`), independent ones concurrently.
+
+    Returns one record per statement, in input order, with ``result`` (a
+    DataFrame for queries), ``rows``, ``elapsed_s`` and ``error``.
+    """
+    records = []
+    with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1)) as pool:
+        for phase in _phases(stmts):
+            records += pool.map(lambda s: _execute(s, use_cache, backend), phase)
+    return records
+
+
+def run_file(path: Path, workers: int | None = None, use_cache: bool = True,
+             backend: str | None = None) -> dict[str, pd.DataFrame]:
+    """Results of every statement in one ``.sql`` file, by statement name.
+
+    Raises the first error; use :func:`run_statements` to collect them instead.
+    """
+    records = run_statements(statements(path), workers, use_cache, backend)
+    for rec in records:
+        if rec["error"] is not None:
+            raise rec["error"]
+    return {rec["name"]: rec["result"] for rec in records}
+
+
+def sql_files(sql_dir: Path = SQL_DIR) -> list[Path]:
+    return [p for p in sorted(Path(sql_dir).glob(SQL_FILES)) if p.name not in SKIP_FILES]
+
+
+def run_directory(sql_dir: Path = SQL_DIR, workers: int | None = None, use_cache: bool = True,
+                  backend: str | None = None) -> list[dict]:
+    """Run every analysis file in ``sql_dir`` as one batch (see :func:`run_statements`)."""
+    stmts = [s for path in sql_files(sql_dir) for s in statements(path)]
+    return run_statements(stmts, workers, use_cache, backend)
+
+
+def summary(records: list[dict]) -> pd.DataFrame:
+    """One row per statement: file, name, rows, wall time and error."""
+    df = pd.DataFrame(records, columns=["file", "index", "name", "rows", "elapsed_s", "error"])
+    df["error"] = df["error"].map(lambda e: None if e is None else f"{type(e).__name__}: {e}")
+    return df.astype({"rows": "Int64"})
+
+
+def save_report(records: list[dict], out_dir: Path, wall_s: float | None = None) -> Path:
+    """Write each query result as ``<file>.<name>.csv`` plus ``summary.json`` to ``out_dir``."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for rec in records:
+        if isinstance(rec["result"], pd.DataFrame):
+            rec["result"].to_csv(out_dir / f"{rec['file']}.{rec['name']}.csv", index=False)
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "db": str(db_helpers.DB_PATH),
+        "wall_s": round(wall_s, 3) if wall_s is not None else None,
+        "statements": summary(records).astype(object).where(lambda d: d.notna(), None).to_dict("records"),
+    }
+    path = out_dir / "summary.json"
+    path.write_text(json.dumps(report, indent=2))
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run SQL files statement by statement")
+    parser.add_argument("paths", nargs="*", type=Path, help=".sql files (default: sql/01-07)")
+    parser.add_argument("--workers", type=int, default=None, help="concurrent statements")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the query result cache")
+    parser.add_argument("--backend", choices=["sqlite", "duckdb", "auto"], default=None,
+                        help="query engine (see utils/backends.py)")
+    parser.add_argument("--out", nargs="?", type=Path, const=REPORT_DIR, default=None,
+                        help="save results and summary to a directory "
+                             "(default data/processed/sql_reports/<timestamp>)")
+    args = parser.parse_args(argv)
+
+    if not db_helpers.DB_PATH.exists():
+        sys.exit(f"Database not found: {db_helpers.DB_PATH}")
+    paths = args.paths or sql_files()
+    start = time.perf_counter()
+    records = run_statements([s for p in paths for s in statements(p)], args.workers,
+                             use_cache=not args.no_cache, backend=args.backend)
+    wall = time.perf_counter() - start
+
+    pd.set_option("display.width", 200)
+    table = summary(records)
+    print(table.drop(columns="error").to_string(index=False))
+    failed = table[table["error"].notna()]
+    for _, row in failed.iterrows():
+        print(f"  ERROR {row['file']} {row['name']}: {row['error']}")
+    print(f"\n{len(records) - len(failed)}/{len(records)} statements in {wall:.2f}s "
+          f"(sum of statement times {table['elapsed_s'].sum():.2f}s)")
+    if args.out is not None:
+        out = args.out / time.strftime("%Y%m%d-%H%M%S") if args.out == REPORT_DIR else args.out
+        print(f"Report: {save_report(records, out, wall)}")
+    return 1 if len(failed) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
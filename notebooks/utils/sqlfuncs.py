@@ -0,0 +1,171 @@
+"""Statistical SQL functions registered on every project connection.
+
+SQLite has no median, percentile or standard deviation, so queries used to
+pull raw rows into pandas for ``groupby().median()`` or hand-roll
+``SQRT(SUM(x*x)/COUNT(*) - AVG(x)*AVG(x))``, which loses precision through
+cancellation when the mean is large relative to the spread. These
+functions keep the reduction inside SQLite:
+
+==========================  ====================================================
+``MEDIAN(x)``               median (average of the middle two for even counts)
+``QUANTILE(x, q)``          ``q``-quantile, linear interpolation like pandas
+``VAR_POP(x)``              population variance (Welford's online algorithm)
+``VAR_SAMP(x)``             sample variance; ``VARIANCE`` is an alias
+``STDDEV_POP(x)``           population standard deviation
+``STDDEV_SAMP(x)``          sample standard deviation; ``STDDEV`` is an alias
+``LOG_RETURN(cur, prev)``   ``ln(cur / prev)``, NULL unless both are positive
+==========================  ====================================================
+
+All aggregates ignore NULLs and also work as window functions
+(``STDDEV_POP(ret) OVER (PARTITION BY league_id ORDER BY month ROWS 11
+PRECEDING)``). Registered by ``utils.pool.open_connection``, i.e. on every
+connection from ``db_helpers``.
+"""
+
+import math
+import sqlite3
+from bisect import bisect_left, insort
+
+
+class _Moments:
+    """Running count, mean and sum of squared deviations (Welford)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def step(self, x):
+        if x is None:
+            return
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def inverse(self, x):
+        if x is None:
+            return
+        self.n -= 1
+        if self.n == 0:
+            self.mean = self.m2 = 0.0
+            return
+        delta = x - self.mean
+        self.mean -= delta / self.n
+        self.m2 = max(self.m2 - delta * (x - self.mean), 0.0)
+
+    def finalize(self):
+        return self.value()
+
+
+class VarPop(_Moments):
+    def value(self):
+        return self.m2 / self.n if self.n else None
+
+
+class VarSamp(_Moments):
+    def value(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else None
+
+
+class StddevPop(_Moments):
+    def value(self):
+        return math.sqrt(self.m2 / self.n) if self.n else None
+
+
+class StddevSamp(_Moments):
+    def value(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else None
+
+
+class Quantile:
+    """Linearly interpolated quantile over a sorted buffer of the window's values.
+
+    New values are appended and sorted only when a result or an ``inverse``
+    needs the order: a plain aggregate sorts once, instead of shifting the
+    buffer on every row.
+    """
+
+    def __init__(self):
+        self.values = []
+        self.unsorted = 0  # values appended since the buffer was last sorted
+        self.q = None
+
+    def step(self, x, q=0.5):
+        if q is not None:
+            self.q = float(q)
+        if x is not None:
+            self.values.append(x)
+            self.unsorted += 1
+
+    def _sorted(self) -> list:
+        if self.unsorted == 1:
+            # A sliding window adds one row per frame
+            insort(self.values, self.values.pop())
+        elif self.unsorted:
+            self.values.sort()
+        self.unsorted = 0
+        return self.values
+
+    def inverse(self, x, q=0.5):
+        if x is not None:
+            values = self._sorted()
+            del values[bisect_left(values, x)]
+
+    def value(self):
+        values = self._sorted()
+        n = len(values)
+        if not n or self.q is None or not 0.0 <= self.q <= 1.0:
+            return None
+        pos = (n - 1) * self.q
+        lo = math.floor(pos)
+        hi = min(lo + 1, n - 1)
+        return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+    def finalize(self):
+        return self.value()
+
+
+class Median(Quantile):
+    def __init__(self):
+        super().__init__()
+        self.q = 0.5
+
+    def step(self, x):
+        if x is not None:
+            self.values.append(x)
+            self.unsorted += 1
+
+    def inverse(self, x):
+        super().inverse(x)
+
+
+def log_return(cur, prev):
+    if cur is None or prev is None or cur <= 0 or prev <= 0:
+        return None
+    return math.log(cur / prev)
+
+
+AGGREGATES = {
+    "MEDIAN": (1, Median),
+    "QUANTILE": (2, Quantile),
+    "VAR_POP": (1, VarPop),
+    "VAR_SAMP": (1, VarSamp),
+    "VARIANCE": (1, VarSamp),
+    "STDDEV_POP": (1, StddevPop),
+    "STDDEV_SAMP": (1, StddevSamp),
+    "STDDEV": (1, StddevSamp),
+}
+
+
+def register_functions(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Register the statistical functions above on ``conn``."""
+    window = hasattr(conn, "create_window_function") and sqlite3.sqlite_version_info >= (3, 25, 0)
+    for name, (nargs, cls) in AGGREGATES.items():
+        if window:
+            # A window function doubles as a plain aggregate
+            conn.create_window_function(name, nargs, cls)
+        else:
+            conn.create_aggregate(name, nargs, cls)
+    conn.create_function("LOG_RETURN", 2, log_return, deterministic=True)
+    return conn
@@ -0,0 +1,747 @@
+"""Synthetic Transfermarkt-shaped data for load and regression testing.
+
+The Kaggle dataset cannot be shipped to CI or test machines, and the real
+data only ever exercises ``football.db`` at today's size. This module
+generates every table of ``data/README.md`` with referential integrity and
+roughly the real distributions, multiplied by a scale factor:
+
+=================  ==========  ================================================
+table              rows at 1x  shape
+=================  ==========  ================================================
+competitions       15          14 domestic leagues + Champions League (fixed)
+clubs              420         30 per league, strength skewed to the top 5
+players            30K         careers from age ~18 to 30-38, within 2004-2025
+player_valuations  ~460K       every ~8 months: age curve x random walk
+transfers          ~85K        summer/winter windows, fees around market value
+games              ~70K        seasons 2012-2024, 38 rounds per league season
+club_games         ~140K       two rows per game
+appearances        ~1.9M       11 starters + substitutes from the club's squad
+game_events        ~720K       goals, assists, cards and substitutions
+=================  ==========  ================================================
+
+Clubs, players and everything derived from them grow linearly with
+``scale``; competitions and seasons stay fixed, so at 10x a league season
+has 200 clubs. Players move between clubs of similar strength, valuations
+and appearances always belong to the club the player was at on that date,
+and match goals add up to the scores in ``games``. Output is deterministic
+for a given scale and seed.
+
+Tables are written directly into a scratch SQLite database with the
+schema, indexes, ``ingest_meta`` rows and materialized tables that
+``utils/ingest.py`` produces, or as CSVs for the ingestion loader itself.
+
+Usage:
+    python -m notebooks.utils.synthetic --scale 10             # data/processed/football_synthetic_x10.db
+    python -m notebooks.utils.synthetic --scale 1 --raw /tmp/raw   # CSVs instead
+    FOOTBALL_DB=data/processed/football_synthetic_x10.db \\
+        python -m notebooks.utils.dashboard_export --out /tmp/dash
+"""
+
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .db_helpers import DATA_PROCESSED
+from .ingest import (COMMIT_ROWS, CSV_FILES, LOAD_PRAGMAS, chunk_rows, chunk_schema,
+                     coerce_chunk, create_table_sql, finish_build, insert_sql,
+                     install_database, retype_table, widen_schema)
+
+# Base sizes at scale 1
+CLUBS_PER_LEAGUE = 30
+CLUBS_PER_SEASON = 20
+PLAYERS = 30_000
+# Players generated (and written) per block
+PLAYER_BLOCK = 50_000
+
+SEASONS = range(2012, 2025)   # 2012 = season 2012/13
+FIRST_DATE = "2004-01-01"
+LAST_DATE = "2025-06-30"
+
+# competition_id, name, country, strength multiplier of its clubs
+LEAGUES = [
+    ("GB1", "premier-league", "England", 3.0),
+    ("ES1", "laliga", "Spain", 2.4),
+    ("IT1", "serie-a", "Italy", 2.0),
+    ("L1", "bundesliga", "Germany", 2.0),
+    ("FR1", "ligue-1", "France", 1.6),
+    ("PO1", "liga-portugal-bwin", "Portugal", 0.9),
+    ("NL1", "eredivisie", "Netherlands", 0.8),
+    ("TR1", "super-lig", "Turkey", 0.7),
+    ("BE1", "jupiler-pro-league", "Belgium", 0.6),
+    ("RU1", "premier-liga", "Russia", 0.6),
+    ("UKR1", "premier-liga", "Ukraine", 0.4),
+    ("GR1", "super-league-1", "Greece", 0.35),
+    ("SC1", "scottish-premiership", "Scotland", 0.35),
+    ("DK1", "superligaen", "Denmark", 0.3),
+]
+CUP_ID, CUP_NAME, CUP_CLUBS = "CL", "uefa-champions-league", 32
+
+# position: (share of players, sub positions, weight as goal scorer)
+POSITIONS = {
+    "Attack": (0.26, ["Centre-Forward", "Left Winger", "Right Winger", "Second Striker"], 3.0),
+    "Midfield": (0.31, ["Central Midfield", "Defensive Midfield", "Attacking Midfield",
+                        "Left Midfield", "Right Midfield"], 1.6),
+    "Defender": (0.33, ["Centre-Back", "Left-Back", "Right-Back"], 0.6),
+    "Goalkeeper": (0.10, ["Goalkeeper"], 0.0),
+}
+
+OTHER_COUNTRIES = [
+    "Brazil", "Argentina", "Nigeria", "Senegal", "Croatia", "Serbia", "Poland", "Austria",
+    "Switzerland", "Sweden", "Norway", "Colombia", "Uruguay", "Japan", "United States",
+    "Ghana", "Cameroon", "Cote d'Ivoire", "Czech Republic", "Morocco",
+]
+FIRST_NAMES = [
+    "Adam", "Alex", "Andre", "Bruno", "Carlos", "Daniel", "David", "Diego", "Emil", "Felix",
+    "Gabriel", "Hugo", "Ivan", "Jakub", "Jan", "Joao", "Jonas", "Jose", "Juan", "Kevin",
+    "Lucas", "Luis", "Marco", "Mario", "Mateo", "Max", "Mohamed", "Nicolas", "Oliver", "Omar",
+    "Paul", "Pedro", "Rafael", "Samuel", "Sergio", "Stefan", "Thomas", "Tom", "Victor", "Yusuf",
+]
+SYLLABLES = [
+    "ar", "ber", "ca", "den", "el", "fen", "gar", "hol", "is", "jen", "kor", "lin", "mar",
+    "nor", "os", "pel", "quin", "ros", "sal", "tor", "ul", "ven", "wes", "yor", "zan", "bra",
+    "cas", "dor", "fal", "gran", "hal", "lan", "mon", "ran", "sten", "tal", "val", "wil",
+    "bur", "ton",
+]
+SURNAME_ENDINGS = ["", "son", "ez", "ini", "ov", "er", "ic", "sen", "o", "es", "ski", "man"]
+CITY_ENDINGS = ["", "burg", "ton", "heim", "ford", "ville", "stad", "ia", "hem", "ona"]
+CLUB_PATTERNS = ["FC {}", "{} United", "Sporting {}", "Real {}", "{} City", "Athletic {}",
+                 "{} Rovers", "SV {}", "AC {}", "{} Wanderers"]
+GOAL_TYPES = ["Right-footed shot", "Left-footed shot", "Header", "Penalty"]
+
+# Composite (player, day) keys for sorted lookups: player_id * DAY_SPAN + day offset
+DAY_SPAN = 1 << 16
+DAY_ZERO = -7305   # 1950-01-01 as days since the epoch
+
+# Child column -> parent key, checked by check_integrity()
+FOREIGN_KEYS = [
+    ("clubs", "domestic_competition_id", "competitions", "competition_id"),
+    ("players", "current_club_id", "clubs", "club_id"),
+    ("player_valuations", "player_id", "players", "player_id"),
+    ("player_valuations", "current_club_id", "clubs", "club_id"),
+    ("transfers", "player_id", "players", "player_id"),
+    ("transfers", "from_club_id", "clubs", "club_id"),
+    ("transfers", "to_club_id", "clubs", "club_id"),
+    ("games", "competition_id", "competitions", "competition_id"),
+    ("games", "home_club_id", "clubs", "club_id"),
+    ("games", "away_club_id", "clubs", "club_id"),
+    ("club_games", "game_id", "games", "game_id"),
+    ("club_games", "club_id", "clubs", "club_id"),
+    ("appearances", "game_id", "games", "game_id"),
+    ("appearances", "player_id", "players", "player_id"),
+    ("appearances", "player_club_id", "clubs", "club_id"),
+    ("game_events", "game_id", "games", "game_id"),
+    ("game_events", "player_id", "players", "player_id"),
+]
+
+
+def _day(date: str) -> int:
+    return int(np.datetime64(date, "D").astype(np.int64))
+
+
+def _dates(days, valid=None) -> np.ndarray:
+    """Day numbers to ``datetime64``, NaT where ``valid`` is False."""
+    out = np.asarray(days, dtype=np.int64).astype("datetime64[D]")
+    if valid is not None:
+        out[~valid] = np.datetime64("NaT")
+    return out.astype("datetime64[ns]")
+
+
+def _year(days: np.ndarray) -> np.ndarray:
+    return days.astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64) + 1970
+
+
+def _season_start(days: np.ndarray) -> np.ndarray:
+    """Start year of the July-June season a day falls in."""
+    month = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) % 12
+    return _year(days) - (month < 6)
+
+
+def _words(rng, n: int, endings: list[str]) -> pd.Series:
+    """Random two-syllable capitalized words like ``Venburg``."""
+    syl = np.array(SYLLABLES)
+    words = (pd.Series(syl[rng.integers(0, len(syl), n)])
+             + syl[rng.integers(0, len(syl), n)]
+             + np.array(endings)[rng.integers(0, len(endings), n)])
+    return words.str.capitalize()
+
+
+def _lookup(keys: np.ndarray, values: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Value of the last sorted key at or before each query key."""
+    return values[np.searchsorted(keys, query, side="right") - 1]
+
+
+def _key(player_ids, days) -> np.ndarray:
+    return np.asarray(player_ids, dtype=np.int64) * DAY_SPAN + (np.asarray(days) - DAY_ZERO)
+
+
+def _pick(rng, offsets: np.ndarray, sizes: np.ndarray, groups: np.ndarray, k: int = 1) -> np.ndarray:
+    """``k`` random positions per entry of ``groups`` inside CSR segments."""
+    draws = rng.random((len(groups), k))
+    return offsets[groups][:, None] + (draws * sizes[groups][:, None]).astype(np.int64)
+
+
+class _SQLiteSink:
+    """Bulk-inserts generated chunks into a scratch database."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.counts = {}
+        self._schemas = {}
+        self._since_commit = 0
+        conn.execute("BEGIN")
+
+    def write(self, table: str, df: pd.DataFrame):
+        if df.empty:
+            return
+        df = coerce_chunk(table, df)
+        schema = chunk_schema(df)
+        if table not in self.counts:
+            self.conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+            self.conn.execute(create_table_sql(table, schema))
+            self._schemas[table] = schema
+            self.counts[table] = 0
+        elif schema != self._schemas[table]:
+            wider = widen_schema(self._schemas[table], schema)
+            if wider != self._schemas[table]:
+                retype_table(self.conn, table, wider)
+                self._schemas[table] = wider
+        self.conn.executemany(insert_sql(table, list(df.columns)), chunk_rows(df))
+        self.counts[table] += len(df)
+        self._since_commit += len(df)
+        if self._since_commit >= COMMIT_ROWS:
+            self.conn.execute("COMMIT")
+            self.conn.execute("BEGIN")
+            self._since_commit = 0
+
+    def close(self):
+        self.conn.execute("COMMIT")
+
+
+class _CSVSink:
+    """Appends generated chunks to ``<raw_dir>/<table>.csv``."""
+
+    def __init__(self, raw_dir: Path):
+        self.raw_dir = Path(raw_dir)
+        self.raw_dir.mkdir(parents=True, exist_ok=True)
+        self.counts = {}
+
+    def write(self, table: str, df: pd.DataFrame):
+        if df.empty:
+            return
+        path = self.raw_dir / CSV_FILES[table]
+        first = table not in self.counts
+        df.to_csv(path, mode="w" if first else "a", header=first, index=False,
+                  date_format="%Y-%m-%d")
+        self.counts[table] = self.counts.get(table, 0) + len(df)
+
+    def close(self):
+        pass
+
+
+class _Generator:
+    """Generates the tables block by block into a sink, keeping only the
+    per-player and per-club arrays that later tables depend on."""
+
+    def __init__(self, sink, scale: float, seed: int):
+        self.sink = sink
+        self.rng = np.random.default_rng(seed)
+        self.n_per_league = max(2, round(CLUBS_PER_LEAGUE * scale))
+        self.n_per_season = max(2, min(self.n_per_league, round(CLUBS_PER_SEASON * scale)))
+        self.n_players = max(100, round(PLAYERS * scale))
+        self.first_day = _day(FIRST_DATE)
+        self.last_day = _day(LAST_DATE)
+
+    # ── competitions and clubs ───────────────────────────────────────────────
+
+    def competitions(self):
+        ids, names, countries, _ = zip(*LEAGUES)
+        self.sink.write("competitions", pd.DataFrame({
+            "competition_id": list(ids) + [CUP_ID],
+            "competition_code": list(names) + [CUP_NAME],
+            "name": list(names) + [CUP_NAME],
+            "sub_type": ["first_tier"] * len(ids) + ["uefa_champions_league"],
+            "type": ["domestic_league"] * len(ids) + ["international_cup"],
+            "country_name": list(countries) + [None],
+            "domestic_league_code": list(ids) + [None],
+            "confederation": "europa",
+        }))
+
+    def clubs(self):
+        """Club attributes as arrays indexed by ``club_id`` (index 0 unused)."""
+        rng = self.rng
+        n = self.n_per_league * len(LEAGUES)
+        league = np.repeat(np.arange(len(LEAGUES)), self.n_per_league)
+        strength = np.array([lg[3] for lg in LEAGUES])[league] * rng.lognormal(0, 0.6, n)
+        city = _words(rng, n, CITY_ENDINGS)
+        pattern = np.array(CLUB_PATTERNS)[rng.integers(0, len(CLUB_PATTERNS), n)]
+        name = pd.Series([p.format(c) for p, c in zip(pattern, city)])
+        dup = name.groupby(name).cumcount()
+        name = name.where(dup == 0, name + " " + (dup + 1).astype(str))
+
+        pad = lambda a, fill: np.concatenate([[fill], a])  # noqa: E731
+        self.club_league = pad(league, -1)
+        self.club_strength = pad(strength, 1.0)
+        self.club_name = pad(name.to_numpy(dtype=object), None)
+        self.club_seats = pad(((8_000 + 30_000 * np.sqrt(strength / 3))
+                               * rng.lognormal(0, 0.25, n)).astype(np.int64), 0)
+        # Clubs from weakest to strongest, for matching players to clubs of their level
+        self.club_by_level = np.argsort(strength) + 1
+        # Current squads, filled in while players are generated
+        self.squad_size = np.zeros(n + 1, dtype=np.int64)
+        self.squad_age = np.zeros(n + 1)
+        self.squad_value = np.zeros(n + 1)
+        self.squad_foreign = np.zeros(n + 1, dtype=np.int64)
+
+    def write_clubs(self):
+        ids = np.arange(1, len(self.club_league))
+        size = self.squad_size[ids]
+        name = pd.Series(self.club_name[ids])
+        self.sink.write("clubs", pd.DataFrame({
+            "club_id": ids,
+            "club_code": name.str.lower().str.replace(" ", "-").to_numpy(),
+            "name": name.to_numpy(),
+            "domestic_competition_id": np.array([lg[0] for lg in LEAGUES])[self.club_league[ids]],
+            "total_market_value": np.where(size > 0, self.squad_value[ids], np.nan),
+            "squad_size": size,
+            "average_age": np.round(self.squad_age[ids] / np.maximum(size, 1), 1),
+            "foreigners_number": self.squad_foreign[ids],
+            "stadium_seats": self.club_seats[ids],
+        }))
+
+    def _clubs_for(self, level: np.ndarray) -> np.ndarray:
+        """A club of similar rank for each standard-normal player ``level``.
+
+        Level plus noise is mapped to a uniform percentile (logistic
+        approximation of the normal CDF), so every club gets a similar
+        number of players and better players land at stronger clubs.
+        """
+        z = (level + self.rng.normal(0, 0.6, len(level))) / np.sqrt(1.36)
+        pct = 1 / (1 + np.exp(-1.702 * z))
+        n = len(self.club_by_level)
+        return self.club_by_level[np.minimum((pct * n).astype(np.int64), n - 1)]
+
+    # ── players, valuations and transfers ────────────────────────────────────
+
+    def players(self):
+        self.p_start, self.p_end, self.p_level = [], [], []
+        self.p_pos, self.p_club, self.p_name = [], [], []
+        stints = []
+        for lo in range(1, self.n_players + 1, PLAYER_BLOCK):
+            ids = np.arange(lo, min(lo + PLAYER_BLOCK, self.n_players + 1))
+            stints.append(self._player_block(ids))
+        s_pid, s_day, s_club = (np.concatenate(a) for a in zip(*stints))
+        self.stint_key = _key(s_pid, s_day)
+        self.stint_club = s_club
+        for attr in ("p_start", "p_end", "p_level", "p_pos", "p_club", "p_name"):
+            setattr(self, attr, np.concatenate([[0]] + getattr(self, attr)))
+        self.p_name = self.p_name.astype(object)
+
+    def _player_block(self, ids: np.ndarray):
+        rng = self.rng
+        n = len(ids)
+        birth = rng.integers(_day("1974-01-01"), _day("2006-12-31"), n)
+        start = birth + (365.25 * rng.uniform(17, 19.5, n)).astype(np.int64)
+        end = birth + (365.25 * rng.uniform(30, 38, n)).astype(np.int64)
+        start = np.clip(start, self.first_day, self.last_day - 365)
+        end = np.clip(end, start + 365, self.last_day)
+        level = rng.standard_normal(n)
+        pos_names = list(POSITIONS)
+        pos = rng.choice(len(pos_names), n, p=[POSITIONS[p][0] for p in pos_names])
+
+        # Club stints: one at career start plus one per transfer
+        years = (end - start) / 365.25
+        n_moves = rng.poisson(0.3 * years)
+        mover = np.repeat(np.arange(n), n_moves)
+        raw = start[mover] + (rng.random(len(mover)) * (end - start)[mover]).astype(np.int64)
+        summer = rng.random(len(mover)) < 0.7
+        jan1 = raw.astype("datetime64[D]").astype("datetime64[Y]").astype("datetime64[D]").astype(np.int64)
+        move_day = np.where(summer, jan1 + 181 + rng.integers(0, 62, len(mover)),
+                            jan1 + rng.integers(0, 31, len(mover)))
+        ok = (move_day > start[mover]) & (move_day < end[mover])
+        s_idx = np.concatenate([np.arange(n), mover[ok]])
+        s_day = np.concatenate([start, move_day[ok]])
+        order = np.lexsort((s_day, s_idx))
+        s_idx, s_day = s_idx[order], s_day[order]
+        keep = np.ones(len(s_idx), dtype=bool)
+        keep[1:] = (s_idx[1:] != s_idx[:-1]) | (s_day[1:] != s_day[:-1])
+        s_idx, s_day = s_idx[keep], s_day[keep]
+        s_club = self._clubs_for(level[s_idx])
+        for _ in range(3):
+            same = np.zeros(len(s_idx), dtype=bool)
+            same[1:] = (s_idx[1:] == s_idx[:-1]) & (s_club[1:] == s_club[:-1])
+            if not same.any():
+                break
+            s_club[same] = s_club[same] % (len(self.club_league) - 1) + 1
+        s_pid = ids[s_idx]
+        stint_key = _key(s_pid, s_day)
+        first_club = s_club[np.searchsorted(s_idx, np.arange(n))]
+        current_club = s_club[np.searchsorted(s_idx, np.arange(n), side="right") - 1]
+
+        # Valuations: every ~8 months, base value x age curve x random walk x club level
+        n_val = np.maximum(1, np.round((end - start) / rng.uniform(200, 280, n))).astype(np.int64)
+        v_idx = np.repeat(np.arange(n), n_val)
+        u = np.sort(v_idx + rng.random(len(v_idx))) - v_idx
+        v_day = start[v_idx] + (u * (end - start)[v_idx]).astype(np.int64)
+        keep = np.ones(len(v_idx), dtype=bool)
+        keep[1:] = (v_idx[1:] != v_idx[:-1]) | (v_day[1:] != v_day[:-1])
+        v_idx, v_day = v_idx[keep], v_day[keep]
+        v_pid = ids[v_idx]
+        v_club = _lookup(stint_key, s_club, _key(v_pid, v_day))
+        age = (v_day - birth[v_idx]) / 365.25
+        curve = np.exp(-((age - 27) / np.where(age < 27, 6.0, 5.0)) ** 2)
+        walk = np.cumsum(rng.normal(0, 0.12, len(v_idx)))
+        first = np.searchsorted(v_idx, np.arange(n))
+        walk -= walk[first][v_idx]
+        base = np.exp(np.log(1_500_000) + 1.0 * level)
+        value = base[v_idx] * curve * np.exp(walk) * self.club_strength[v_club] ** 0.3
+        value = np.clip(np.round(value / 25_000) * 25_000, 25_000, 200_000_000)
+        self.sink.write("player_valuations", pd.DataFrame({
+            "player_id": v_pid,
+            "date": _dates(v_day),
+            "market_value_in_eur": value,
+            "current_club_name": self.club_name[v_club],
+            "current_club_id": v_club,
+            "player_club_domestic_competition_id":
+                np.array([lg[0] for lg in LEAGUES])[self.club_league[v_club]],
+        }))
+
+        # Names, nationality and profile
+        first_name = np.array(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), n)]
+        last_name = _words(rng, n, SURNAME_ENDINGS).to_numpy(dtype=object)
+        name = first_name.astype(object) + " " + last_name
+        countries = np.array([lg[2] for lg in LEAGUES], dtype=object)
+        citizenship = np.where(rng.random(n) < 0.6, countries[self.club_league[first_club]],
+                               np.array(OTHER_COUNTRIES)[rng.integers(0, len(OTHER_COUNTRIES), n)])
+        sub_position = np.empty(n, dtype=object)
+        for p, pos_name in enumerate(pos_names):
+            mask = pos == p
+            sub_position[mask] = rng.choice(POSITIONS[pos_name][1], mask.sum())
+        height = np.round(rng.normal(np.where(pos == 3, 190, 181), 6)).clip(160, 205)
+        foot = np.array(["right", "left", "both"], dtype=object)[rng.choice(3, n, p=[0.7, 0.25, 0.05])]
+        foot[rng.random(n) < 0.03] = None
+
+        active = end >= self.last_day
+        last_val = np.searchsorted(v_idx, np.arange(n), side="right") - 1
+        market_value = value[last_val]
+        highest = np.maximum.reduceat(value, first)
+        contract_day = np.array([_day(f"{y}-06-30") for y in range(2026, 2031)])[rng.integers(0, 5, n)]
+        self.sink.write("players", pd.DataFrame({
+            "player_id": ids,
+            "first_name": first_name,
+            "last_name": last_name,
+            "name": name,
+            "last_season": _season_start(end),
+            "current_club_id": current_club,
+            "country_of_citizenship": citizenship,
+            "date_of_birth": _dates(birth),
+            "sub_position": sub_position,
+            "position": np.array(pos_names, dtype=object)[pos],
+            "foot": foot,
+            "height_in_cm": height,
+            "contract_expiration_date": _dates(contract_day, active),
+            "current_club_domestic_competition_id":
+                np.array([lg[0] for lg in LEAGUES])[self.club_league[current_club]],
+            "current_club_name": self.club_name[current_club],
+            "market_value_in_eur": market_value,
+            "highest_market_value_in_eur": highest,
+        }))
+
+        # Transfers: every stint after the first, valued at the last valuation before it
+        moved = np.flatnonzero(np.r_[False, s_idx[1:] == s_idx[:-1]])
+        t_idx, t_day = s_idx[moved], s_day[moved]
+        v_key = _key(v_pid, v_day)
+        at = np.searchsorted(v_key, _key(ids[t_idx], t_day), side="right") - 1
+        has_value = (at >= 0) & (v_idx[np.maximum(at, 0)] == t_idx)
+        mv = np.where(has_value, value[np.maximum(at, 0)], np.nan)
+        kind = rng.random(len(moved))
+        fee = np.round(mv * rng.lognormal(0, 0.4, len(moved)) / 50_000) * 50_000
+        fee = np.where(kind < 0.40, 0.0, np.where(kind < 0.50, np.nan, fee))
+        fee = np.where(np.isnan(mv) & (kind >= 0.50), 0.0, fee)
+        season = _season_start(t_day)
+        from_club, to_club = s_club[moved - 1], s_club[moved]
+        self.sink.write("transfers", pd.DataFrame({
+            "player_id": ids[t_idx],
+            "transfer_date": _dates(t_day),
+            "transfer_season": [f"{y % 100:02d}/{(y + 1) % 100:02d}" for y in season],
+            "from_club_id": from_club,
+            "to_club_id": to_club,
+            "from_club_name": self.club_name[from_club],
+            "to_club_name": self.club_name[to_club],
+            "transfer_fee": fee,
+            "market_value_in_eur": mv,
+            "player_name": name[t_idx],
+        }))
+
+        # Current squads of active players
+        age_now = (self.last_day - birth) / 365.25
+        foreign = citizenship != countries[self.club_league[current_club]]
+        np.add.at(self.squad_size, current_club[active], 1)
+        np.add.at(self.squad_age, current_club[active], age_now[active])
+        np.add.at(self.squad_value, current_club[active], market_value[active])
+        np.add.at(self.squad_foreign, current_club[active], foreign[active])
+
+        self.p_start.append(start)
+        self.p_end.append(end)
+        self.p_level.append(level)
+        self.p_pos.append(pos)
+        self.p_club.append(current_club)
+        self.p_name.append(name)
+        return s_pid, s_day, s_club
+
+    # ── games, appearances and events ────────────────────────────────────────
+
+    def seasons(self):
+        self.next_game_id = 1
+        self.next_event_id = 1
+        for season in SEASONS:
+            self._squads(_day(f"{season}-10-01"))
+            for lg, (comp_id, *_rest) in enumerate(LEAGUES):
+                clubs = np.flatnonzero(self.club_league == lg)
+                rank = self.club_strength[clubs] * self.rng.lognormal(0, 0.5, len(clubs))
+                playing = clubs[np.argsort(-rank)[:self.n_per_season]]
+                self._fixtures(comp_id, season, playing, rounds=2 * (CLUBS_PER_SEASON - 1),
+                               first_day=_day(f"{season}-08-10"), spacing=7,
+                               label=lambda r: r.astype(str) + ". Matchday")
+            top = np.argsort(-self.club_strength[1:])[:2 * CUP_CLUBS] + 1
+            cup = self.rng.choice(top, min(CUP_CLUBS, len(top)), replace=False)
+            self._fixtures(CUP_ID, season, cup, rounds=6, first_day=_day(f"{season}-09-15"),
+                           spacing=14, label=lambda r: np.full(len(r), "Group Stage", dtype=object))
+
+    def _squads(self, day: int):
+        """CSR squads (players grouped by club) of all players active on ``day``."""
+        pids = np.flatnonzero((self.p_start <= day) & (self.p_end >= day) & (np.arange(len(self.p_start)) > 0))
+        club = _lookup(self.stint_key, self.stint_club, _key(pids, day))
+        order = np.argsort(club, kind="stable")
+        self.squad_pid = pids[order]
+        self.squad_count = np.bincount(club, minlength=len(self.club_league))
+        self.squad_offset = np.concatenate([[0], np.cumsum(self.squad_count)[:-1]])
+
+    def _fixtures(self, comp_id: str, season: int, clubs: np.ndarray, rounds: int,
+                  first_day: int, spacing: int, label):
+        rng = self.rng
+        n = len(clubs) - len(clubs) % 2
+        if n < 2:
+            return
+        perms = rng.permuted(np.tile(clubs, (rounds, 1)), axis=1)[:, :n]
+        home, away = perms[:, 0::2].ravel(), perms[:, 1::2].ravel()
+        rnd = np.repeat(np.arange(1, rounds + 1), n // 2)
+        day = first_day + (rnd - 1) * spacing + rng.integers(0, 3, len(rnd))
+        g = len(home)
+        game_id = np.arange(self.next_game_id, self.next_game_id + g)
+        self.next_game_id += g
+        ratio = self.club_strength[home] / self.club_strength[away]
+        home_goals = rng.poisson(1.45 * ratio ** 0.25)
+        away_goals = rng.poisson(1.15 * ratio ** -0.25)
+        attendance = np.round(self.club_seats[home] * rng.uniform(0.55, 1.0, g)).astype(float)
+        attendance[rng.random(g) < 0.04] = np.nan
+        comp_type = "international_cup" if comp_id == CUP_ID else "domestic_league"
+        self.sink.write("games", pd.DataFrame({
+            "game_id": game_id,
+            "competition_id": comp_id,
+            "season": season,
+            "round": label(rnd),
+            "date": _dates(day),
+            "home_club_id": home,
+            "away_club_id": away,
+            "home_club_goals": home_goals,
+            "away_club_goals": away_goals,
+            "home_club_name": self.club_name[home],
+            "away_club_name": self.club_name[away],
+            "attendance": attendance,
+            "competition_type": comp_type,
+        }))
+
+        # club_games: home rows then away rows; cg indexes both
+        cg_game = np.concatenate([game_id, game_id])
+        cg_club = np.concatenate([home, away])
+        cg_opp = np.concatenate([away, home])
+        cg_goals = np.concatenate([home_goals, away_goals])
+        cg_opp_goals = np.concatenate([away_goals, home_goals])
+        cg_day = np.concatenate([day, day])
+        self.sink.write("club_games", pd.DataFrame({
+            "game_id": cg_game,
+            "club_id": cg_club,
+            "own_goals": cg_goals,
+            "opponent_id": cg_opp,
+            "opponent_goals": cg_opp_goals,
+            "hosting": np.repeat(np.array(["Home", "Away"], dtype=object), g),
+            "is_win": (cg_goals > cg_opp_goals).astype(np.int64),
+        }))
+        self._appearances(comp_id, cg_game, cg_club, cg_goals, cg_day)
+
+    def _appearances(self, comp_id, cg_game, cg_club, cg_goals, cg_day):
+        rng = self.rng
+        n_cg = len(cg_game)
+        size = self.squad_count[cg_club]
+        slots = np.where(size > 0, 11 + rng.binomial(5, 0.5, n_cg), 0)
+        # Best of two random squad members, so stronger players play more;
+        # three draws per slot leave enough after dropping repeats
+        cg = np.repeat(np.arange(n_cg), 3 * slots)
+        cand = self.squad_pid[_pick(rng, self.squad_offset, self.squad_count, cg_club[cg], 2)]
+        pid = np.where(self.p_level[cand[:, 0]] >= self.p_level[cand[:, 1]], cand[:, 0], cand[:, 1])
+        dup = pd.DataFrame({"cg": cg, "pid": pid}).duplicated().to_numpy()
+        cg, pid = cg[~dup], pid[~dup]
+        rank = np.arange(len(cg)) - np.searchsorted(cg, np.arange(n_cg))[cg]
+        keep = rank < slots[cg]
+        cg, pid, rank = cg[keep], pid[keep], rank[keep]
+        m = len(cg)
+        a_off = np.searchsorted(cg, np.arange(n_cg))
+        a_cnt = np.bincount(cg, minlength=n_cg)
+
+        # Substitute k (rank 11 + k) replaces starter 10 - k at minute_in
+        minutes = np.full(m, 90)
+        on_from = np.ones(m, dtype=np.int64)
+        sub = np.flatnonzero(rank >= 11)
+        replaced = a_off[cg[sub]] + 10 - (rank[sub] - 11)
+        minute_in = rng.integers(46, 90, len(sub))
+        minutes[replaced] = minute_in
+        minutes[sub] = 90 - minute_in
+        on_from[sub] = minute_in + 1
+        on_to = np.where(rank >= 11, 90, minutes)
+
+        # Goals go to players on the pitch, weighted toward attackers
+        goal_cg = np.repeat(np.arange(n_cg), np.where(a_cnt > 0, cg_goals, 0))
+        cand = _pick(rng, a_off, a_cnt, goal_cg, 3)
+        weight = np.array([POSITIONS[p][2] for p in POSITIONS])[self.p_pos[pid[cand]]]
+        scorer = cand[np.arange(len(goal_cg)), np.argmax(weight * rng.random(cand.shape), axis=1)]
+        assist = _pick(rng, a_off, a_cnt, goal_cg)[:, 0]
+        has_assist = (rng.random(len(goal_cg)) < 0.7) & (assist != scorer)
+        goal_min = on_from[scorer] + (rng.random(len(scorer)) * (on_to[scorer] - on_from[scorer] + 1)).astype(np.int64)
+
+        yellow = (rng.random(m) < 0.11).astype(np.int64)
+        red = (rng.random(m) < 0.004).astype(np.int64)
+        day = cg_day[cg]
+        game = cg_game[cg]
+        club = cg_club[cg]
+        self.sink.write("appearances", pd.DataFrame({
+            "appearance_id": pd.Series(game).astype(str) + "_" + pd.Series(pid).astype(str),
+            "game_id": game,
+            "player_id": pid,
+            "player_club_id": club,
+            "player_current_club_id": self.p_club[pid],
+            "date": _dates(day),
+            "player_name": self.p_name[pid],
+            "competition_id": comp_id,
+            "yellow_cards": yellow,
+            "red_cards": red,
+            "goals": np.bincount(scorer, minlength=m),
+            "assists": np.bincount(assist[has_assist], minlength=m),
+            "minutes_played": minutes,
+        }))
+
+        card = np.flatnonzero((yellow + red) > 0)
+        card_min = on_from[card] + (rng.random(len(card)) * (on_to[card] - on_from[card] + 1)).astype(np.int64)
+        events = pd.concat([
+            pd.DataFrame({
+                "row": scorer, "minute": goal_min, "type": "Goals",
+                "description": np.array(GOAL_TYPES, dtype=object)[rng.integers(0, len(GOAL_TYPES), len(scorer))],
+                "player_in_id": np.nan,
+                "player_assist_id": np.where(has_assist, pid[assist], np.nan),
+            }),
+            pd.DataFrame({
+                "row": card, "minute": card_min, "type": "Cards",
+                "description": np.where(red[card] > 0, "Red card", "Yellow card").astype(object),
+                "player_in_id": np.nan, "player_assist_id": np.nan,
+            }),
+            pd.DataFrame({
+                "row": replaced, "minute": minute_in, "type": "Substitutions",
+                "description": None,
+                "player_in_id": pid[sub].astype(float), "player_assist_id": np.nan,
+            }),
+        ], ignore_index=True)
+        events = events.iloc[np.lexsort((events["minute"], cg[events["row"]]))]
+        rows = events.pop("row").to_numpy()
+        events.insert(0, "game_event_id", np.arange(self.next_event_id, self.next_event_id + len(events)))
+        self.next_event_id += len(events)
+        # Not a coerced date column in ingest, so stored as text like the CSV
+        events.insert(1, "date", np.datetime_as_string(day[rows].astype("datetime64[D]")))
+        events.insert(2, "game_id", game[rows])
+        events.insert(5, "club_id", club[rows])
+        events.insert(6, "player_id", pid[rows])
+        self.sink.write("game_events", events)
+
+
+def generate(db_path: Path | None = None, scale: float = 1, seed: int = 42,
+             raw_dir: Path | None = None, verbose: bool = True) -> dict[str, int]:
+    """Generate a synthetic dataset at ``scale`` and return rows per table.
+
+    Writes ``db_path`` (default ``data/processed/football_synthetic_x<scale>.db``)
+    the same way ``ingest.build_database`` does, or CSVs into ``raw_dir``
+    when given. Never touches ``football.db`` unless asked to.
+    """
+    start = time.perf_counter()
+    if raw_dir is not None:
+        sink = _CSVSink(raw_dir)
+        conn = tmp_path = None
+    else:
+        db_path = Path(db_path or DATA_PROCESSED / f"football_synthetic_x{scale:g}.db")
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = db_path.with_suffix(".db.building")
+        if tmp_path.exists():
+            tmp_path.unlink()
+        conn = sqlite3.connect(tmp_path, isolation_level=None)
+        for pragma in LOAD_PRAGMAS:
+            conn.execute(pragma)
+        sink = _SQLiteSink(conn)
+
+    try:
+        gen = _Generator(sink, scale, seed)
+        gen.competitions()
+        gen.clubs()
+        gen.players()
+        gen.write_clubs()
+        gen.seasons()
+        sink.close()
+        counts = dict(sink.counts)
+        if conn is not None:
+            version = f"synthetic-x{scale:g}-s{seed}"
+            n_idx, idx_time, derived = finish_build(conn, {t: (None, version, n) for t, n in counts.items()})
+            orphans = check_integrity(conn)
+    finally:
+        if conn is not None:
+            conn.close()
+    if conn is not None:
+        install_database(tmp_path, db_path)
+
+    if verbose:
+        for table, n in counts.items():
+            print(f"  {table:.<30} {n:>12,} rows")
+        if conn is not None:
+            for table, n in derived.items():
+                print(f"  {table:.<30} {n:>12,} rows materialized")
+            bad = {k: v for k, v in orphans.items() if v}
+            print(f"\n{n_idx} indexes in {idx_time:.1f}s, {'no orphan keys' if not bad else f'ORPHAN KEYS: {bad}'}")
+            print(f"Database: {db_path} ({db_path.stat().st_size / 1024 / 1024:.1f} MB)")
+        else:
+            print(f"\nCSV files written to {raw_dir}")
+        print(f"Generated in {time.perf_counter() - start:.1f}s")
+    return counts
+
+
+def check_integrity(conn: sqlite3.Connection) -> dict[str, int]:
+    """Number of rows per foreign key whose value has no parent row."""
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    orphans = {}
+    for child, col, parent, key in FOREIGN_KEYS:
+        if child in tables and parent in tables:
+            orphans[f"{child}.{col}"] = conn.execute(
+                f'SELECT COUNT(*) FROM "{child}" WHERE "{col}" IS NOT NULL '
+                f'AND "{col}" NOT IN (SELECT "{key}" FROM "{parent}")'
+            ).fetchone()[0]
+    return orphans
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Transfermarkt-shaped dataset.")
+    parser.add_argument("--scale", type=float, default=1, help="size multiplier, e.g. 1, 10, 100")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", type=Path, default=None,
+                        help="output database (default data/processed/football_synthetic_x<scale>.db)")
+    parser.add_argument("--raw", type=Path, default=None,
+                        help="write CSVs into this directory instead of a database")
+    args = parser.parse_args()
+    generate(args.db, scale=args.scale, seed=args.seed, raw_dir=args.raw)
@@ -0,0 +1,322 @@
+"""Vectorized per-player time-series metrics over the valuation history.
+
+Valuations are loaded once into contiguous NumPy arrays sorted by
+``(player_id, date)`` with one offset per player, the layout of a CSR
+matrix. Per-player reductions then become a single pass over the arrays
+(``ufunc.accumulate`` / ``ufunc.reduceat``) instead of a SQL window over the
+whole history joined to ``players``.
+
+Drawdown terms, per player:
+
+- running max: highest value seen so far (the current peak)
+- drawdown: ``value / running max - 1`` in percent (0 at a new high)
+- max drawdown: the lowest drawdown
+- drawdown duration: days from a peak until the value first gets back to
+  it (or until the last valuation if it never does)
+- time to recovery: the duration of the max drawdown episode, NaN while
+  the player is still below that peak
+
+The same layout answers point-in-time lookups: ``(player, date)`` pairs are
+ordered like the arrays, so a batch of lookups is one ``searchsorted`` over
+a combined key, O(log n) per lookup. ``value_asof`` (latest valuation on or
+before a date, or first on or after it), ``nearest`` and ``value_shifted``
+(N days before or after) replace ``ORDER BY date LIMIT 1`` subqueries and
+``FIRST_VALUE(...) OVER (ORDER BY ABS(julianday(date) - ...))`` windows.
+``ValuationSeries.cached`` keeps the arrays as ``.npy`` files next to the
+database (``football.db`` -> ``football.valuation_index/``), rebuilt when
+``fact_valuation_returns`` changes and memory-mapped on load.
+"""
+
+import json
+import shutil
+import sqlite3
+import tempfile
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import db_helpers
+
+POSITIONS = ("Attack", "Midfield", "Defender", "Goalkeeper")
+INDEX_SUFFIX = ".valuation_index"
+SOURCE_TABLE = "fact_valuation_returns"
+# Lookup keys: player slot in the high 32 bits, epoch day (offset to >= 0) below
+_DAY_BIAS = 2 ** 31
+_ARRAYS = ("players", "offsets", "date", "value")
+
+
+def index_dir(db_path: Path | None = None) -> Path:
+    """Directory of the cached index of ``db_path``: ``football.db`` -> ``football.valuation_index``."""
+    return Path(db_path or db_helpers.DB_PATH).with_suffix(INDEX_SUFFIX)
+
+
+def _segment_cummax(values: np.ndarray, group: np.ndarray) -> np.ndarray:
+    """Running max of ``values`` restarted at every ``group`` change.
+
+    Values are replaced by their dense rank and offset by ``group * n_ranks``
+    so one global ``maximum.accumulate`` never carries across players, with
+    exact integer arithmetic.
+    """
+    uniq, rank = np.unique(values, return_inverse=True)
+    shift = group.astype(np.int64) * len(uniq)
+    return uniq[np.maximum.accumulate(rank + shift) - shift]
+
+
+class ValuationSeries:
+    """All players' valuation histories as sorted arrays plus per-player offsets."""
+
+    def __init__(self, player_ids, dates, values):
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        values = np.asarray(values, dtype=np.float64)
+        order = np.lexsort((dates, player_ids))
+        player_ids = player_ids[order]
+        self.date = dates[order]
+        self.value = values[order]
+        starts = np.flatnonzero(np.diff(player_ids, prepend=player_ids[:1] - 1))
+        self.offsets = np.append(starts, len(self.value))   # player k: offsets[k]:offsets[k+1]
+        self.players = player_ids[starts]
+        self.player_id = player_ids
+
+    @classmethod
+    def _from_arrays(cls, players, offsets, date, value) -> "ValuationSeries":
+        series = cls.__new__(cls)
+        series.players, series.offsets, series.date, series.value = players, offsets, date, value
+        return series
+
+    @cached_property
+    def player_id(self) -> np.ndarray:
+        return np.repeat(self.players, np.diff(self.offsets))
+
+    @cached_property
+    def group(self) -> np.ndarray:
+        """Player slot (0 .. len - 1) of every valuation."""
+        return np.repeat(np.arange(len(self.players)), np.diff(self.offsets))
+
+    @cached_property
+    def _key(self) -> np.ndarray:
+        return (self.group.astype(np.int64) << 32) + (self.date.astype(np.int64) + _DAY_BIAS)
+
+    @classmethod
+    def from_connection(cls, conn: sqlite3.Connection) -> "ValuationSeries":
+        """Positive valuations of every player, from ``fact_valuation_returns``."""
+        # Stored in (player_id, date) order, so the lexsort finds it sorted
+        df = pd.read_sql_query(
+            "SELECT player_id, date, market_value_in_eur FROM fact_valuation_returns",
+            conn,
+        )
+        dates = pd.to_datetime(df["date"], errors="coerce")
+        keep = dates.notna().to_numpy()
+        return cls(df["player_id"].to_numpy()[keep], dates.to_numpy()[keep],
+                   df["market_value_in_eur"].to_numpy()[keep])
+
+    @classmethod
+    def cached(cls, conn: sqlite3.Connection, db_path: Path | None = None) -> "ValuationSeries":
+        """:meth:`from_connection`, stored on disk until ``fact_valuation_returns`` changes."""
+        version = db_helpers.table_versions(conn).get(SOURCE_TABLE)
+        path = index_dir(db_path)
+        meta = path / "meta.json"
+        if version and meta.exists() and json.loads(meta.read_text()).get("version") == version:
+            return cls.load(path)
+        series = cls.from_connection(conn)
+        if version:
+            series.save(path, version)
+        return series
+
+    def save(self, path: Path, version: str | None = None):
+        """Write the arrays as ``.npy`` files to ``path``, replacing it atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{path.name}.", dir=path.parent))
+        for name in _ARRAYS:
+            np.save(tmp / f"{name}.npy", getattr(self, name))
+        (tmp / "meta.json").write_text(json.dumps({"version": version, "valuations": len(self.value),
+                                                   "players": len(self.players)}))
+        old = Path(f"{tmp}.old")
+        if path.exists():
+            path.rename(old)
+        tmp.rename(path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "ValuationSeries":
+        """Arrays saved by :meth:`save`, memory-mapped unless ``mmap=False``."""
+        mode = "r" if mmap else None
+        return cls._from_arrays(*(np.load(Path(path) / f"{name}.npy", mmap_mode=mode) for name in _ARRAYS))
+
+    def __len__(self):
+        return len(self.players)
+
+    # ── Point-in-time lookups ──
+
+    def _query(self, player_ids, dates):
+        """Player slots, lookup keys and a validity mask for a batch of lookups."""
+        pid = np.asarray(player_ids, dtype=np.int64)
+        day = np.asarray(dates, dtype="datetime64[D]")
+        pid, day = np.broadcast_arrays(pid, day)
+        slot = np.searchsorted(self.players, pid)
+        slot = np.minimum(slot, max(len(self.players) - 1, 0))
+        valid = ~np.isnat(day)
+        if len(self.players):
+            valid &= self.players[slot] == pid
+        else:
+            valid &= False
+        key = (slot.astype(np.int64) << 32) + (np.where(valid, day.astype(np.int64), 0) + _DAY_BIAS)
+        return slot, key, valid
+
+    def rows(self, player_ids, dates, direction: str = "backward", exact: bool = True) -> np.ndarray:
+        """Index of each player's valuation as of each date, -1 where there is none.
+
+        ``direction`` follows ``pandas.merge_asof``: ``"backward"`` is the
+        latest valuation on or before the date, ``"forward"`` the first on or
+        after it, ``"nearest"`` the closer of the two (the earlier on ties).
+        ``exact=False`` skips valuations dated exactly on the date.
+        """
+        slot, key, valid = self._query(player_ids, dates)
+        if not len(self.value):
+            return np.full(key.shape, -1)
+        if direction == "nearest":
+            back = self.rows(player_ids, dates, "backward", exact)
+            fwd = self.rows(player_ids, dates, "forward", exact)
+            day = np.asarray(dates, dtype="datetime64[D]")
+            d_back = np.where(back >= 0, (day - self.date[back]).astype(np.int64), np.iinfo(np.int64).max)
+            d_fwd = np.where(fwd >= 0, (self.date[fwd] - day).astype(np.int64), np.iinfo(np.int64).max)
+            return np.where(d_fwd < d_back, fwd, back)
+        if direction == "backward":
+            pos = np.searchsorted(self._key, key, side="right" if exact else "left") - 1
+            found = valid & (pos >= self.offsets[slot])
+        elif direction == "forward":
+            pos = np.searchsorted(self._key, key, side="left" if exact else "right")
+            found = valid & (pos < self.offsets[slot + 1])
+        else:
+            raise ValueError(f"direction must be backward, forward or nearest, not {direction!r}")
+        return np.where(found, pos, -1)
+
+    def value_asof(self, player_ids, dates, direction: str = "backward", exact: bool = True,
+                   after=None) -> np.ndarray:
+        """Value as of each date (see :meth:`rows`), NaN where there is none.
+
+        With ``after``, only valuations strictly after those dates count, i.e.
+        ``pv.date > t.date AND pv.date <= t.date + horizon ORDER BY pv.date DESC``.
+        """
+        rows = self.rows(player_ids, dates, direction, exact)
+        if not len(self.value):
+            return np.full(rows.shape, np.nan)
+        found = rows >= 0
+        if after is not None:
+            after = np.asarray(after, dtype="datetime64[D]")
+            found &= ~np.isnat(after) & (self.date[rows] > after)
+        return np.where(found, self.value[rows], np.nan)
+
+    def nearest(self, player_ids, dates) -> np.ndarray:
+        """Value of the valuation closest to each date (the earlier on ties)."""
+        return self.value_asof(player_ids, dates, direction="nearest")
+
+    def value_shifted(self, player_ids, dates, days, direction: str = "backward") -> np.ndarray:
+        """Value as of ``days`` after each date (negative: before)."""
+        shifted = np.asarray(dates, dtype="datetime64[D]") + np.asarray(days, dtype="timedelta64[D]")
+        return self.value_asof(player_ids, shifted, direction)
+
+    def latest(self, player_ids) -> np.ndarray:
+        """Each player's most recent value, NaN for players without valuations."""
+        return self.value_asof(player_ids, np.datetime64("9999-12-31"))
+
+    def running_max(self) -> np.ndarray:
+        return _segment_cummax(self.value, self.group)
+
+    def drawdown(self) -> np.ndarray:
+        """Drawdown of every valuation from its player's running max, in percent."""
+        runmax = self.running_max()
+        return (self.value - runmax) * 100.0 / runmax
+
+    def player_drawdowns(self) -> pd.DataFrame:
+        """One row per player with peak, max drawdown, recovery and duration metrics."""
+        n = len(self.value)
+        if n == 0:
+            return pd.DataFrame(columns=[
+                "player_id", "n_valuations", "peak_value", "max_drawdown_pct",
+                "current_drawdown_pct", "peak_date", "trough_date",
+                "time_to_recovery_days", "max_drawdown_duration_days",
+            ])
+        starts, ends = self.offsets[:-1], self.offsets[1:] - 1
+        runmax = self.running_max()
+        # Same arithmetic as SQL_DRAWDOWN, so rounded values match it exactly
+        dd = (self.value - runmax) * 100.0 / runmax
+
+        # Episodes: each new high opens one, lasting until the next new high.
+        # A player's first valuation is always a peak, so episodes never span players.
+        peaks = np.flatnonzero(self.value >= runmax)
+        ep_group = self.group[peaks]
+        ep_trough = np.minimum.reduceat(dd, peaks)
+        nxt = np.append(peaks[1:], n)
+        recovered = np.append(ep_group[1:] == ep_group[:-1], False)
+        ep_end = np.where(recovered, nxt, ends[ep_group])
+        ep_days = (self.date[ep_end] - self.date[peaks]).astype(np.int64)
+        ep_days = np.where(ep_trough < 0, ep_days, 0)
+
+        # Trough row of every episode: position of the minimum inside [peak, next)
+        ep_start_of = np.repeat(np.arange(len(peaks)), np.diff(np.append(peaks, n)))
+        row_order = np.lexsort((dd, ep_start_of))
+        first_row = np.searchsorted(ep_start_of[row_order], np.arange(len(peaks)))
+        ep_trough_row = row_order[first_row]
+
+        # Max drawdown episode per player (earliest on ties)
+        ep_order = np.lexsort((peaks, ep_trough, ep_group))
+        worst = ep_order[np.searchsorted(ep_group[ep_order], np.arange(len(starts)))]
+        ttr = np.where(recovered[worst], ep_days[worst], np.nan)
+        ttr = np.where(ep_trough[worst] < 0, ttr, 0)
+
+        ep_offsets = np.searchsorted(ep_group, np.arange(len(starts)))
+        return pd.DataFrame({
+            "player_id": self.players,
+            "n_valuations": np.diff(self.offsets),
+            "peak_value": np.maximum.reduceat(self.value, starts),
+            "max_drawdown_pct": np.minimum.reduceat(dd, starts),
+            "current_drawdown_pct": dd[ends],
+            "peak_date": self.date[peaks[worst]],
+            "trough_date": self.date[ep_trough_row[worst]],
+            "time_to_recovery_days": ttr,
+            "max_drawdown_duration_days": np.maximum.reduceat(ep_days, ep_offsets),
+        })
+
+
+def value_momentum(series: ValuationSeries, player_ids, as_of=None, days: int = 180) -> pd.DataFrame:
+    """Latest value, value nearest to ``days`` before ``as_of`` (default today) and
+    the change between them in percent, per player (``value_momentum_6m_pct`` of
+    ``sql/06_predictive_features.sql``)."""
+    as_of = np.datetime64(as_of or pd.Timestamp.now(), "D")
+    latest = series.latest(player_ids)
+    before = series.nearest(player_ids, as_of - np.timedelta64(days, "D"))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.where(before > 0, np.round((latest - before) * 100.0 / before, 2), np.nan)
+    return pd.DataFrame({"player_id": np.asarray(player_ids), "latest_value": latest,
+                         f"value_{days}d_ago": before, "value_momentum_pct": change})
+
+
+def round_half_away(values, digits: int = 0):
+    """Round like SQLite's ``ROUND``: halves away from zero (numpy and pandas
+    round them to even)."""
+    scale = 10.0 ** digits
+    return np.sign(values) * np.floor(np.abs(values) * scale + 0.5) / scale
+
+
+def drawdown_by_position(conn: sqlite3.Connection,
+                         series: ValuationSeries | None = None) -> pd.DataFrame:
+    """Average and worst max drawdown per position (``drawdown_by_position`` export)."""
+    if series is None:
+        series = ValuationSeries.cached(conn)
+    players = pd.read_sql_query(
+        f"SELECT player_id, position FROM players WHERE position IN ({','.join('?' * len(POSITIONS))})",
+        conn, params=POSITIONS,
+    )
+    df = series.player_drawdowns().merge(players, on="player_id")
+    df["max_drawdown_pct"] = round_half_away(df["max_drawdown_pct"], 2)
+    out = df.groupby("position").agg(
+        avg_max_drawdown=("max_drawdown_pct", "mean"),
+        worst_drawdown=("max_drawdown_pct", "min"),
+        player_count=("player_id", "size"),
+    ).reset_index()
+    out[["avg_max_drawdown", "worst_drawdown"]] = round_half_away(out[["avg_max_drawdown", "worst_drawdown"]], 1)
+    return out.sort_values("avg_max_drawdown", ignore_index=True)
@@ -0,0 +1,372 @@
+"""Statement-level tracing of database access.
+
+While a trace is active, every connection opened through
+``utils.pool.open_connection`` records the statements it runs. That covers
+pooled ``run_query`` connections, ``get_connection()`` in the notebooks,
+the analysis modules and incremental ingestion. For each statement the
+trace holds:
+
+- latency (execute plus fetch time) and rows fetched
+- the ``EXPLAIN QUERY PLAN`` of each distinct read-only statement
+- ``full_scans``: tables read by ``SCAN <table>`` without any index
+- ``temp_btrees``: ``USE TEMP B-TREE FOR ORDER BY/GROUP BY/DISTINCT`` steps
+
+Events are appended to a JSONL file as they happen; ``summary()`` folds
+them into one row per statement, slowest first. The flags show directly
+when, e.g., a ``strftime('%Y', date) = ...`` predicate scans
+``player_valuations`` instead of searching ``idx_pv_date``. Query cache
+hits are recorded too (``cache_hit``), with the lookup latency.
+
+Enable with ``FOOTBALL_TRACE=<file.jsonl>`` in the environment,
+``with tracing(path): ...`` or ``python -m notebooks.utils.pipeline --trace``.
+Connections are only traced when opened while a trace is active, which is
+why ``start_trace()`` closes the shared pools. With no trace, connections
+are plain ``sqlite3.Connection`` objects and cost nothing extra.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import cached_property
+from pathlib import Path
+
+import pandas as pd
+
+from .query_cache import normalize_sql
+
+_READ_ONLY = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+_SCAN = re.compile(r"^SCAN (\w+)")
+_TEMP_BTREE = re.compile(r"^USE TEMP B-TREE FOR (.+)$")
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN)\s+[\[\"`]?(\w+)[\]\"`]?(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_NOT_ALIAS = {"where", "on", "join", "left", "right", "inner", "outer", "cross", "natural",
+              "group", "order", "limit", "union", "using", "as", "having", "window", "full"}
+
+_active = None
+_active_lock = threading.Lock()
+
+
+def _statement_id(sql: str) -> str:
+    return hashlib.sha1(sql.encode("utf-8")).hexdigest()[:12]
+
+
+def analyze_plan(details: list[str], sql: str, tables) -> dict:
+    """Full-table scans and temp B-tree steps of an ``EXPLAIN QUERY PLAN``.
+
+    Plans name tables by their alias, so aliases are resolved from the
+    ``FROM``/``JOIN`` clauses; scans of CTEs and subqueries are not flagged.
+    """
+    tables = {t.lower() for t in tables}
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        if table.lower() in tables:
+            aliases[table.lower()] = table
+            if alias and alias.lower() not in _NOT_ALIAS:
+                aliases[alias.lower()] = table
+    full_scans, temp_btrees = [], []
+    for detail in details:
+        m = _SCAN.match(detail)
+        if m and "INDEX" not in detail and m.group(1).lower() in aliases:
+            full_scans.append(aliases[m.group(1).lower()])
+        m = _TEMP_BTREE.match(detail)
+        if m:
+            temp_btrees.append(m.group(1))
+    return {"full_scans": sorted(set(full_scans)), "temp_btrees": temp_btrees}
+
+
+class Tracer:
+    """Collects statement events in memory and appends them to a JSONL file."""
+
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path) if path else None
+        self.events = []
+        self._plans = {}
+        self._tables = {}
+        self._lock = threading.Lock()
+        self._file = None
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def record(self, event: dict):
+        with self._lock:
+            self.events.append(event)
+            if self._file:
+                self._file.write(json.dumps(event, default=str) + "\n")
+                self._file.flush()
+
+    def plan(self, conn: sqlite3.Connection, sql: str, params) -> dict | None:
+        """Plan details and flags of a read-only statement, once per statement."""
+        key = normalize_sql(sql)
+        if key in self._plans:
+            return self._plans[key]
+        info = None
+        if _READ_ONLY.match(key):
+            try:
+                # Base-class cursor, so the EXPLAIN itself is not traced
+                cur = sqlite3.Cursor(conn)
+                details = [r[3] for r in cur.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+                cur.close()
+                db = conn.db_name
+                if db not in self._tables:
+                    self._tables[db] = [r[0] for r in sqlite3.Cursor(conn).execute(
+                        "SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")]
+                info = {"plan": details, **analyze_plan(details, key, self._tables[db])}
+            except sqlite3.Error:
+                info = None
+        with self._lock:
+            self._plans[key] = info
+        return info
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def summary(self) -> pd.DataFrame:
+        return summarize(self.events)
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement to the active tracer when it is done."""
+
+    _event = None
+
+    def _begin(self, kind: str, sql: str, params, elapsed: float, rows: int = 0):
+        tracer = _active
+        if tracer is None:
+            return
+        normalized = normalize_sql(sql)
+        info = tracer.plan(self.connection, sql, params) if kind == "execute" else None
+        event = {
+            "ts": round(time.time(), 3),
+            "thread": threading.current_thread().name,
+            "db": self.connection.db_name,
+            "statement_id": _statement_id(normalized),
+            "kind": kind,
+            "sql": normalized,
+            "exec_ms": elapsed * 1000,
+            "fetch_ms": 0.0,
+            "rows": rows,
+            "full_scans": info["full_scans"] if info else [],
+            "temp_btrees": info["temp_btrees"] if info else [],
+        }
+        if info and not info.get("reported"):
+            event["plan"] = info["plan"]   # full plan only on the first occurrence
+            info["reported"] = True
+        self._event = event
+        self._tracer = tracer
+
+    def _finish(self):
+        event, self._event = self._event, None
+        if event is not None:
+            event["latency_ms"] = round(event.pop("exec_ms") + event["fetch_ms"], 3)
+            event["fetch_ms"] = round(event["fetch_ms"], 3)
+            self._tracer.record(event)
+
+    def _fetched(self, start: float, n: int):
+        if self._event is not None:
+            self._event["fetch_ms"] += (time.perf_counter() - start) * 1000
+            self._event["rows"] += n
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except sqlite3.Error as e:
+            if _active is not None:
+                _active.record({"ts": round(time.time(), 3), "kind": "error",
+                                "statement_id": _statement_id(normalize_sql(sql)),
+                                "sql": normalize_sql(sql), "error": str(e)})
+            raise
+        self._begin("execute", sql, parameters, time.perf_counter() - start)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._begin("executemany", sql, (), time.perf_counter() - start, max(self.rowcount, 0))
+        self._finish()
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        row = super().__next__()
+        self._fetched(start, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose cursors (including ``conn.execute``) are traced."""
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or TracedCursor)
+
+    @cached_property
+    def db_name(self) -> str:
+        try:
+            cur = sqlite3.Cursor(self)
+            return Path(cur.execute("PRAGMA database_list").fetchone()[2]).name
+        except (sqlite3.Error, TypeError):
+            return ""
+
+
+def connection_factory():
+    """Connection class for ``sqlite3.connect``: traced only while a trace is active."""
+    return TracedConnection if _active is not None else sqlite3.Connection
+
+
+def active() -> Tracer | None:
+    return _active
+
+
+def _enable(path: Path | None) -> Tracer:
+    global _active
+    with _active_lock:
+        if _active is not None:
+            _active.close()
+        _active = Tracer(path)
+        return _active
+
+
+def start_trace(path: Path | None = None) -> Tracer:
+    """Start tracing (to ``path`` as JSONL if given) and reopen pooled connections."""
+    from .db_helpers import close_pools
+
+    tracer = _enable(path)
+    close_pools()
+    return tracer
+
+
+def stop_trace() -> Tracer | None:
+    """Stop tracing; returns the finished tracer."""
+    global _active
+    from .db_helpers import close_pools
+
+    with _active_lock:
+        tracer, _active = _active, None
+    close_pools()
+    if tracer is not None:
+        tracer.close()
+    return tracer
+
+
+@contextmanager
+def tracing(path: Path | None = None):
+    """``with tracing("trace.jsonl") as tracer: ...``"""
+    tracer = start_trace(path)
+    try:
+        yield tracer
+    finally:
+        stop_trace()
+
+
+def record_cache_hit(sql: str, elapsed: float, rows: int):
+    """Log a ``run_query`` result served from the query cache."""
+    if _active is not None:
+        normalized = normalize_sql(sql)
+        _active.record({
+            "ts": round(time.time(), 3), "thread": threading.current_thread().name,
+            "statement_id": _statement_id(normalized), "kind": "cache_hit", "sql": normalized,
+            "latency_ms": round(elapsed * 1000, 3), "rows": rows,
+        })
+
+
+def load_trace(path: Path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(events: list[dict]) -> pd.DataFrame:
+    """One row per statement: calls, latency, rows and plan flags, slowest first."""
+    cols = ["statement_id", "statement", "calls", "cache_hits", "total_ms", "mean_ms", "max_ms",
+            "rows", "full_scans", "temp_btrees", "errors"]
+    if not events:
+        return pd.DataFrame(columns=cols)
+    df = pd.DataFrame(events)
+    for col, default in [("latency_ms", 0.0), ("rows", 0), ("full_scans", None),
+                         ("temp_btrees", None), ("error", None)]:
+        if col not in df:
+            df[col] = default
+    df["is_hit"] = df["kind"] == "cache_hit"
+    df["is_error"] = df["kind"] == "error"
+    df["is_run"] = ~df["is_hit"] & ~df["is_error"]
+    flags = lambda s: ", ".join(sorted({x for v in s.dropna() for x in v}))  # noqa: E731
+    out = df.groupby("statement_id", sort=False).agg(
+        statement=("sql", "first"),
+        calls=("is_run", "sum"),
+        cache_hits=("is_hit", "sum"),
+        total_ms=("latency_ms", "sum"),
+        max_ms=("latency_ms", "max"),
+        rows=("rows", "sum"),
+        full_scans=("full_scans", flags),
+        temp_btrees=("temp_btrees", flags),
+        errors=("is_error", "sum"),
+    ).reset_index()
+    out["mean_ms"] = out["total_ms"] / (out["calls"] + out["cache_hits"]).clip(lower=1)
+    out["statement"] = out["statement"].str.slice(0, 100)
+    out[["total_ms", "mean_ms", "max_ms"]] = out[["total_ms", "mean_ms", "max_ms"]].round(1)
+    return out[cols].sort_values("total_ms", ascending=False, ignore_index=True)
+
+
+def report(events_or_path, out: Path | None = None) -> pd.DataFrame:
+    """Print the per-statement summary of a trace; optionally save it as JSON."""
+    events = load_trace(events_or_path) if isinstance(events_or_path, (str, Path)) \
+        else list(events_or_path)
+    df = summarize(events)
+    total = df["total_ms"].sum() / 1000 if len(df) else 0.0
+    scans = int((df["full_scans"] != "").sum()) if len(df) else 0
+    sorts = int((df["temp_btrees"] != "").sum()) if len(df) else 0
+    with pd.option_context("display.width", 200, "display.max_colwidth", 60):
+        print(df.drop(columns="statement_id").head(30).to_string(index=False))
+    print(f"\n{len(df)} statements, {int(df['calls'].sum()) if len(df) else 0} executions, "
+          f"{total:.1f}s in SQLite; {scans} with full-table scans, {sorts} with temp B-tree sorts")
+    if out:
+        Path(out).write_text(df.to_json(orient="records", indent=2))
+    return df
+
+
+if os.environ.get("FOOTBALL_TRACE"):
+    _enable(Path(os.environ["FOOTBALL_TRACE"]))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize a JSONL statement trace")
+    parser.add_argument("trace", type=Path)
+    parser.add_argument("--out", type=Path, default=None, help="also write the summary as JSON")
+    args = parser.parse_args()
+    report(args.trace, args.out)
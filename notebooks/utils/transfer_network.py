@@ -0,0 +1,296 @@
+"""Transfer network: club x club transfer flows per season, keyed by club ID.
+
+``SQL_NET_SPEND`` aggregates ``transfers`` once per window and per side
+(paid, received) and joins the two. Here every transfer is reduced once
+into a sparse flow matrix: one entry per (season, selling club, buying club)
+with the fees and the number of transfers, on node indexes of the sorted club
+IDs. Everything else is a reduction over those entries:
+
+- net spend: fees received minus fees paid per club (two ``bincount`` calls;
+  per season at once with the season in the bin)
+- league flows: the entries re-binned on the clubs' leagues
+- top trading partners: both directions of every entry, summed per club pair
+- centrality: counterparties, transfer and fee totals per club and a PageRank
+  over the money flow (buyer -> seller, weighted by fee), by power iteration
+  with sparse matrix-vector products
+
+A season starts on 1 July (``2023`` = 2023/24, as ``games.season``). Club
+names and leagues come from ``clubs``; clubs outside it (lower leagues,
+"Retired", ...) get their latest name from ``transfers`` and no league.
+``matrix`` returns a ``scipy.sparse`` matrix and needs ``scipy``; nothing
+else does.
+"""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+SEASON_START_MONTH = 7
+OTHER_LEAGUE = "Other"
+
+
+def season_of(days) -> np.ndarray:
+    """Season start year of dates given as days since 1970-01-01."""
+    months = np.asarray(days, dtype="datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    year, month = months // 12 + 1970, months % 12 + 1
+    return year - (month < SEASON_START_MONTH)
+
+
+def _distinct(keys) -> np.ndarray:
+    """Sorted distinct values; a plain sort, much faster than ``np.unique`` on int keys."""
+    keys = np.sort(keys)
+    return keys[np.diff(keys, prepend=keys[:1] - 1) != 0]
+
+
+def season_label(season: int) -> str:
+    """``2023`` -> ``'2023/24'``."""
+    return f"{season}/{(season + 1) % 100:02d}"
+
+
+class TransferNetwork:
+    """Sparse club x club transfer flows per season.
+
+    Entries are sorted by season, seller and buyer; ``src`` and ``dst`` index
+    ``clubs``, ``season`` indexes ``seasons``.
+    """
+
+    def __init__(self, clubs, seasons, season, src, dst, fees, transfers, names=None, leagues=None):
+        self.clubs = np.asarray(clubs, dtype=np.int64)             # node -> club_id
+        self.seasons = np.asarray(seasons, dtype=np.int64)         # season index -> start year
+        self.season = np.asarray(season, dtype=np.int64)
+        self.src = np.asarray(src, dtype=np.int64)                 # selling club
+        self.dst = np.asarray(dst, dtype=np.int64)                 # buying club
+        self.fees = np.asarray(fees, dtype=np.float64)
+        self.transfers = np.asarray(transfers, dtype=np.int64)
+        n = len(self.clubs)
+        self.names = np.asarray(names if names is not None else self.clubs.astype(str), dtype=object)
+        self.leagues = np.asarray(leagues if leagues is not None else [None] * n, dtype=object)
+
+    @classmethod
+    def from_frame(cls, transfers: pd.DataFrame, clubs: pd.DataFrame | None = None) -> "TransferNetwork":
+        """Network from transfers (``from_club_id, to_club_id, transfer_epoch_day,
+        transfer_fee``) and club names and leagues (``club_id, name, league_id``);
+        a club missing there is named by its ID."""
+        df = transfers.dropna(subset=["from_club_id", "to_club_id", "transfer_epoch_day"])
+        seller = df["from_club_id"].to_numpy(np.int64)
+        buyer = df["to_club_id"].to_numpy(np.int64)
+        season_year = season_of(df["transfer_epoch_day"].to_numpy(np.int64))
+        fee = np.nan_to_num(df["transfer_fee"].to_numpy(np.float64))
+
+        ids = _distinct(np.concatenate([seller, buyer]))
+        seasons, season = np.unique(season_year, return_inverse=True)
+        n = len(ids)
+        src, dst = np.searchsorted(ids, seller), np.searchsorted(ids, buyer)
+        # One entry per (season, seller, buyer): unique keys are sorted in that order
+        keys, cell = np.unique((season * n + src) * n + dst, return_inverse=True)
+        fees = np.bincount(cell, fee, minlength=len(keys))
+        counts = np.bincount(cell, minlength=len(keys))
+
+        names = ids.astype(str).astype(object)
+        leagues = np.full(n, None, dtype=object)
+        if clubs is not None:
+            clubs = clubs[clubs["club_id"].isin(ids)]
+            node = np.searchsorted(ids, clubs["club_id"].to_numpy(np.int64))
+            named = clubs["name"].notna().to_numpy()
+            names[node[named]] = clubs["name"].to_numpy(object)[named]
+            leagues[node] = clubs["league_id"].to_numpy(object)
+
+        season, rest = np.divmod(keys, n * n)
+        return cls(ids, seasons, season, rest // n, rest % n, fees, counts, names, leagues)
+
+    @classmethod
+    def from_connection(cls, conn: sqlite3.Connection) -> "TransferNetwork":
+        """Network of every transfer with both clubs known."""
+        transfers = pd.read_sql_query("""
+            SELECT from_club_id, to_club_id, transfer_epoch_day, transfer_fee
+            FROM transfers
+            WHERE from_club_id IS NOT NULL AND to_club_id IS NOT NULL
+        """, conn)
+        # Clubs outside the clubs table: the name on their latest transfer
+        # (the row of MAX(transfer_date) supplies the bare column)
+        clubs = pd.read_sql_query("""
+            SELECT club_id, name, domestic_competition_id AS league_id FROM clubs
+            UNION ALL
+            SELECT club_id, name, NULL FROM (
+                SELECT club_id, name, MAX(transfer_date) FROM (
+                    SELECT to_club_id AS club_id, to_club_name AS name, transfer_date FROM transfers
+                    UNION ALL
+                    SELECT from_club_id, from_club_name, transfer_date FROM transfers
+                )
+                WHERE name IS NOT NULL AND club_id NOT IN (SELECT club_id FROM clubs)
+                GROUP BY club_id
+            )
+        """, conn)
+        return cls.from_frame(transfers, clubs)
+
+    def __len__(self):
+        return len(self.clubs)
+
+    def _window(self, seasons=None) -> np.ndarray:
+        """Entry mask of the given season start years (default: all)."""
+        if seasons is None:
+            return np.ones(len(self.season), dtype=bool)
+        return np.isin(self.seasons[self.season], np.atleast_1d(seasons))
+
+    def _clubs_frame(self, nodes) -> pd.DataFrame:
+        return pd.DataFrame({"club_id": self.clubs[nodes], "club": self.names[nodes],
+                             "league_id": self.leagues[nodes]})
+
+    def matrix(self, seasons=None, weight: str = "fees"):
+        """Club x club ``scipy.sparse`` CSR matrix (seller rows, buyer columns) of
+        ``weight`` (``fees`` or ``transfers``) over ``seasons``."""
+        from scipy.sparse import coo_array
+
+        mask = self._window(seasons)
+        values = getattr(self, weight)[mask]
+        return coo_array((values, (self.src[mask], self.dst[mask])), shape=(len(self), len(self))).tocsr()
+
+    def net_spend(self, seasons=None) -> pd.DataFrame:
+        """Fees received and paid per club over ``seasons`` (default all), with
+        ``net_spend = received - paid``; clubs with any transfer, biggest spender first."""
+        mask = self._window(seasons)
+        n = len(self)
+        src, dst, fees, counts = self.src[mask], self.dst[mask], self.fees[mask], self.transfers[mask]
+        received = np.bincount(src, fees, minlength=n)
+        paid = np.bincount(dst, fees, minlength=n)
+        sold = np.bincount(src, counts, minlength=n).astype(np.int64)
+        bought = np.bincount(dst, counts, minlength=n).astype(np.int64)
+        active = np.flatnonzero(sold + bought)
+        df = self._clubs_frame(active)
+        df["received"], df["paid"] = received[active], paid[active]
+        df["net_spend"] = received[active] - paid[active]
+        df["sold"], df["bought"] = sold[active], bought[active]
+        return df.sort_values("net_spend", kind="stable", ignore_index=True)
+
+    def net_spend_by_season(self) -> pd.DataFrame:
+        """:meth:`net_spend` of every season in one pass: one row per season and
+        club with a transfer in it."""
+        n, s = len(self), len(self.seasons)
+        sell, buy = self.season * n + self.src, self.season * n + self.dst
+        received = np.bincount(sell, self.fees, minlength=s * n)
+        paid = np.bincount(buy, self.fees, minlength=s * n)
+        sold = np.bincount(sell, self.transfers, minlength=s * n).astype(np.int64)
+        bought = np.bincount(buy, self.transfers, minlength=s * n).astype(np.int64)
+        cells = np.flatnonzero(sold + bought)
+        df = self._clubs_frame(cells % n)
+        df.insert(0, "season", self.seasons[cells // n])
+        df["received"], df["paid"] = received[cells], paid[cells]
+        df["net_spend"] = received[cells] - paid[cells]
+        df["sold"], df["bought"] = sold[cells], bought[cells]
+        return df
+
+    def league_flows(self, seasons=None, by_season: bool = False, leagues=None) -> pd.DataFrame:
+        """Fees and transfers from league to league over ``seasons``.
+
+        ``leagues`` keeps those league IDs and pools every other club (and
+        clubs without a league) as ``OTHER_LEAGUE``; by default every league is kept.
+        """
+        node_league = np.where(pd.isna(self.leagues), OTHER_LEAGUE, self.leagues).astype(object)
+        if leagues is not None:
+            node_league = np.where(np.isin(node_league, list(leagues)), node_league, OTHER_LEAGUE)
+        names, node_index = np.unique(node_league.astype(str), return_inverse=True)
+        mask = self._window(seasons)
+        k = len(names)
+        src, dst = node_index[self.src[mask]], node_index[self.dst[mask]]
+        season = self.season[mask] if by_season else np.zeros(mask.sum(), dtype=np.int64)
+        cell = (season * k + src) * k + dst
+        size = (len(self.seasons) if by_season else 1) * k * k
+        fees = np.bincount(cell, self.fees[mask], minlength=size)
+        counts = np.bincount(cell, self.transfers[mask], minlength=size).astype(np.int64)
+        filled = np.flatnonzero(counts)
+        season_idx, rest = np.divmod(filled, k * k)
+        df = pd.DataFrame({"from_league": names[rest // k], "to_league": names[rest % k],
+                           "fees": fees[filled], "transfers": counts[filled]})
+        if by_season:
+            df.insert(0, "season", self.seasons[season_idx])
+        return df
+
+    def top_partners(self, k: int = 5, seasons=None, clubs=None) -> pd.DataFrame:
+        """The ``k`` biggest trading partners of every club (or of ``clubs``) by fees
+        in both directions, then by transfers.
+
+        ``bought`` is what the club paid the partner, ``sold`` what it received.
+        """
+        mask = self._window(seasons)
+        n = len(self)
+        src, dst, fees, counts = self.src[mask], self.dst[mask], self.fees[mask], self.transfers[mask]
+        # Each entry seen from both ends: the buyer bought from the seller and vice versa
+        club = np.concatenate([dst, src])
+        partner = np.concatenate([src, dst])
+        bought = np.concatenate([fees, np.zeros_like(fees)])
+        sold = np.concatenate([np.zeros_like(fees), fees])
+        counts = np.concatenate([counts, counts])
+        if clubs is not None:
+            keep = np.isin(self.clubs[club], np.asarray(clubs, dtype=np.int64))
+            club, partner, bought, sold, counts = (a[keep] for a in (club, partner, bought, sold, counts))
+        pairs, cell = np.unique(club * n + partner, return_inverse=True)
+        bought = np.bincount(cell, bought, minlength=len(pairs))
+        sold = np.bincount(cell, sold, minlength=len(pairs))
+        transfers = np.bincount(cell, counts, minlength=len(pairs)).astype(np.int64)
+        club, partner = pairs // n, pairs % n
+        total = bought + sold
+        order = np.lexsort((-transfers, -total, club))
+        club, partner = club[order], partner[order]
+        # Rank within each club: position minus the club's first position
+        first = np.flatnonzero(np.diff(club, prepend=-1))
+        rank = np.arange(len(club)) - np.repeat(first, np.diff(np.append(first, len(club))))
+        top = order[rank < k]
+        df = self._clubs_frame(pairs[top] // n)
+        other = pairs[top] % n
+        df["rank"] = rank[rank < k] + 1
+        df["partner_id"], df["partner"] = self.clubs[other], self.names[other]
+        df["partner_league_id"] = self.leagues[other]
+        df["bought"], df["sold"] = bought[top], sold[top]
+        df["total"], df["transfers"] = total[top], transfers[top]
+        return df
+
+    def centrality(self, seasons=None, by_season: bool = False, damping: float = 0.85,
+                   tol: float = 1e-10, max_iter: int = 200) -> pd.DataFrame:
+        """Network position of every club with a transfer over ``seasons``.
+
+        ``partners`` is the number of distinct counterparties; ``received``,
+        ``paid``, ``sold`` and ``bought`` as in :meth:`net_spend`. ``pagerank``
+        follows the money: every buyer passes its score on to the clubs it
+        paid, in proportion to the fees, so a club ranks high when highly
+        ranked clubs pay it. Clubs that paid nothing spread their score evenly.
+
+        ``by_season`` ranks every season separately, all in one iteration: each
+        season is its own block of nodes (``season * n + club``), so the graph
+        is block diagonal and every block's scores (over all clubs) sum to 1.
+        """
+        mask = self._window(seasons)
+        n = len(self)
+        blocks = len(self.seasons) if by_season else 1
+        block = self.season[mask] if by_season else np.zeros(mask.sum(), dtype=np.int64)
+        size = blocks * n
+        src, dst = block * n + self.src[mask], block * n + self.dst[mask]
+        fees, counts = self.fees[mask], self.transfers[mask]
+        bought = np.bincount(dst, counts, minlength=size).astype(np.int64)
+        sold = np.bincount(src, counts, minlength=size).astype(np.int64)
+        received, paid = np.bincount(src, fees, minlength=size), np.bincount(dst, fees, minlength=size)
+        pairs = _distinct(np.concatenate([src * size + dst, dst * size + src]))
+        partners = np.bincount(pairs // size, minlength=size)
+        active = np.flatnonzero(bought + sold)
+
+        # Column-stochastic money flow: entry (seller, buyer) is the buyer's share paid to the seller
+        share = np.divide(fees, paid[dst], out=np.zeros_like(fees), where=paid[dst] > 0)
+        dangling = paid == 0
+        rank = np.full(size, 1.0 / n)
+        for _ in range(max_iter):
+            spread = np.repeat(np.where(dangling, rank, 0.0).reshape(blocks, n).sum(axis=1) / n, n)
+            new = (1 - damping) / n + damping * (np.bincount(src, share * rank[dst], minlength=size) + spread)
+            done = np.abs(new - rank).sum() < tol * blocks
+            rank = new
+            if done:
+                break
+
+        df = self._clubs_frame(active % n)
+        if by_season:
+            df.insert(0, "season", self.seasons[active // n])
+        df["partners"] = partners[active]
+        df["received"], df["paid"] = received[active], paid[active]
+        df["sold"], df["bought"] = sold[active], bought[active]
+        df["pagerank"] = rank[active]
+        order = ["season", "pagerank"] if by_season else ["pagerank"]
+        return df.sort_values(order, ascending=[True, False][-len(order):], kind="stable", ignore_index=True)
@@ -19,6 +19,27 @@
 -- club_games: Club-level match statistics
 -- game_events: In-match events (goals, cards, substitutions)
 
+-- Derived columns (notebooks/utils/derived.py), added at ingest
+-- player_valuations: valuation_year, valuation_month ('YYYY-MM'), valuation_epoch_day,
+--   valuation_age (whole years at the valuation), valuation_age_bracket
+-- transfers: transfer_year, transfer_month, transfer_epoch_day
+-- games: game_year, game_month, game_epoch_day
+
+-- Materialized aggregates (notebooks/utils/materialized.py),
+-- built at ingest and refreshed incrementally after data drops
+-- agg_league_month: League x month valuation count, sum, sum of squares, distinct players
+--   over positive valuations, plus count, sum and distinct players over all (all_*)
+-- agg_league_year: Same measures per league x year
+-- fact_valuation_returns: One row per positive valuation in (player_id, date) order,
+--   with the previous valuation, simple and log return, days elapsed,
+--   age bracket, league, club and position
+-- feature_player: One row per player with career totals from appearances, valuation
+--   and transfer counts and the latest event date (as_of); refreshed only for players
+--   with new rows (feature store behind sql/06, notebooks/utils/features.py)
+-- cube_player_season: Player x season x competition x club with games, minutes,
+--   goals, assists, cards and game_events counts; refreshed per season
+-- cube_club_season: Club x season x competition results from club_games
+
 -- ============================================================
 -- INDEXES for query performance
 -- ============================================================
@@ -28,6 +49,8 @@ CREATE INDEX IF NOT EXISTS idx_pv_player_id ON player_valuations(player_id);
 CREATE INDEX IF NOT EXISTS idx_pv_date ON player_valuations(date);
 CREATE INDEX IF NOT EXISTS idx_pv_club_comp ON player_valuations(player_club_domestic_competition_id);
 CREATE INDEX IF NOT EXISTS idx_pv_composite ON player_valuations(player_id, date);
+CREATE INDEX IF NOT EXISTS idx_pv_year ON player_valuations(valuation_year, player_club_domestic_competition_id);
+CREATE INDEX IF NOT EXISTS idx_pv_month ON player_valuations(valuation_month);
 
 -- Appearances (performance metrics)
 CREATE INDEX IF NOT EXISTS idx_app_player_id ON appearances(player_id);
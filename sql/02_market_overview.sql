@@ -10,7 +10,7 @@ WITH league_yearly_values AS (
         pv.player_club_domestic_competition_id AS league_id,
         c.name AS league_name,
         c.country_name,
-        CAST(strftime('%Y', pv.date) AS INTEGER) AS year,
+        pv.valuation_year AS year,
         SUM(pv.market_value_in_eur) AS total_market_value,
         COUNT(DISTINCT pv.player_id) AS player_count,
         ROUND(AVG(pv.market_value_in_eur), 0) AS avg_player_value
@@ -5,7 +5,10 @@
 -- ============================================================
 
 -- Query 1: Transfer ROI -- fee paid vs. market value change after 1 year
--- This demonstrates correlated subqueries and financial ROI calculation
+-- This demonstrates correlated subqueries and financial ROI calculation.
+-- The subquery runs once per transfer; for all transfers and several
+-- horizons (6/12/24 months) use notebooks/utils/asof.py, which does the
+-- same lookup as one sorted merge over transfers and valuations.
 WITH transfer_roi AS (
     SELECT
         t.player_id,
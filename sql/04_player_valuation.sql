@@ -15,9 +15,8 @@ WITH player_age_values AS (
         p.sub_position,
         pv.date AS valuation_date,
         pv.market_value_in_eur,
-        CAST(
-            (julianday(pv.date) - julianday(p.date_of_birth)) / 365.25
-        AS INTEGER) AS age_at_valuation
+        -- whole years at the valuation date, precomputed at ingest
+        pv.valuation_age AS age_at_valuation
     FROM player_valuations pv
     JOIN players p ON pv.player_id = p.player_id
     WHERE p.date_of_birth IS NOT NULL
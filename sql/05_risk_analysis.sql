@@ -10,17 +10,21 @@
 
 -- Query 1: Market value volatility by league
 -- Calculates monthly returns and volatility (std dev) per league,
--- plus a Sharpe-like ratio (return / risk)
+-- plus a Sharpe-like ratio (return / risk).
+-- Reads the league x month aggregate maintained at ingest
+-- (agg_league_month) instead of rescanning player_valuations. Its
+-- all_* columns cover every valuation, zero and missing values
+-- included, like the AVG and distinct player count this query has
+-- always used; the plain columns are positive valuations only.
 WITH monthly_avg_values AS (
     SELECT
-        pv.player_club_domestic_competition_id AS league_id,
-        strftime('%Y-%m', pv.date) AS month,
-        AVG(pv.market_value_in_eur) AS avg_value,
-        COUNT(DISTINCT pv.player_id) AS player_count
-    FROM player_valuations pv
-    WHERE pv.player_club_domestic_competition_id IN ('GB1', 'ES1', 'IT1', 'L1', 'FR1')
-    GROUP BY 1, 2
-    HAVING COUNT(DISTINCT pv.player_id) >= 50
+        league_id,
+        month,
+        all_sum_value / all_valuations AS avg_value,
+        all_player_count AS player_count
+    FROM agg_league_month
+    WHERE league_id IN ('GB1', 'ES1', 'IT1', 'L1', 'FR1')
+      AND all_player_count >= 50
 ),
 monthly_returns AS (
     SELECT
@@ -32,6 +36,16 @@ monthly_returns AS (
             * 1.0 / NULLIF(LAG(avg_value) OVER (PARTITION BY league_id ORDER BY month), 0)
         AS monthly_return
     FROM monthly_avg_values
+),
+-- Deviations from the league mean: the standard deviation is taken in
+-- two passes, numerically stable unlike SQRT(AVG(x*x) - AVG(x)*AVG(x))
+return_devs AS (
+    SELECT
+        league_id,
+        monthly_return,
+        monthly_return - AVG(monthly_return) OVER (PARTITION BY league_id) AS dev
+    FROM monthly_returns
+    WHERE monthly_return IS NOT NULL
 )
 SELECT
     r.league_id,
@@ -39,24 +53,76 @@ SELECT
     COUNT(*) AS months_observed,
     ROUND(AVG(r.monthly_return) * 100, 4) AS avg_monthly_return_pct,
     -- Volatility = standard deviation of returns
-    ROUND(
-        SQRT(
-            AVG(r.monthly_return * r.monthly_return)
-            - AVG(r.monthly_return) * AVG(r.monthly_return)
-        ) * 100, 4
-    ) AS volatility_pct,
+    ROUND(SQRT(AVG(r.dev * r.dev)) * 100, 4) AS volatility_pct,
     -- Sharpe-like ratio = avg return / volatility
     ROUND(
-        AVG(r.monthly_return)
-        / NULLIF(
-            SQRT(
-                AVG(r.monthly_return * r.monthly_return)
-                - AVG(r.monthly_return) * AVG(r.monthly_return)
-            ), 0
-        ), 4
+        AVG(r.monthly_return) / NULLIF(SQRT(AVG(r.dev * r.dev)), 0), 4
     ) AS sharpe_ratio
-FROM monthly_returns r
+FROM return_devs r
 JOIN competitions c ON r.league_id = c.competition_id
-WHERE r.monthly_return IS NOT NULL
 GROUP BY r.league_id, c.name
 ORDER BY volatility_pct DESC;
+
+
+-- Query 2: Maximum drawdown by position
+-- Peak-to-trough decline of every player's market value, the
+-- football equivalent of a portfolio's maximum drawdown.
+-- Reads fact_valuation_returns (one row per positive valuation, stored
+-- in player_id, date order), so the running max needs no join or sort.
+WITH player_peak AS (
+    SELECT
+        player_id,
+        position,
+        market_value_in_eur,
+        MAX(market_value_in_eur) OVER (
+            PARTITION BY player_id ORDER BY date
+            ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+        ) AS running_max
+    FROM fact_valuation_returns
+    WHERE position IN ('Attack', 'Midfield', 'Defender', 'Goalkeeper')
+),
+player_max_dd AS (
+    SELECT
+        player_id,
+        position,
+        MIN((market_value_in_eur - running_max) * 100.0 / running_max) AS max_drawdown_pct
+    FROM player_peak
+    GROUP BY player_id, position
+)
+SELECT
+    position,
+    COUNT(*) AS players,
+    ROUND(AVG(max_drawdown_pct), 1) AS avg_max_drawdown_pct,
+    ROUND(MIN(max_drawdown_pct), 1) AS worst_drawdown_pct
+FROM player_max_dd
+GROUP BY position
+ORDER BY avg_max_drawdown_pct;
+
+
+-- Query 3: Player value volatility by position and age bracket
+-- Standard deviation of log returns between consecutive valuations,
+-- with the average gap between them, from fact_valuation_returns.
+-- Two-pass standard deviation as in Query 1.
+WITH return_devs AS (
+    SELECT
+        position,
+        age_bracket,
+        log_return,
+        days_elapsed,
+        log_return - AVG(log_return) OVER (PARTITION BY position, age_bracket) AS dev
+    FROM fact_valuation_returns
+    WHERE log_return IS NOT NULL
+      AND days_elapsed > 0
+      AND position IN ('Attack', 'Midfield', 'Defender', 'Goalkeeper')
+      AND age_bracket IS NOT NULL
+)
+SELECT
+    position,
+    age_bracket,
+    COUNT(*) AS returns_observed,
+    ROUND(AVG(log_return) * 100, 2) AS avg_log_return_pct,
+    ROUND(SQRT(AVG(dev * dev)) * 100, 2) AS volatility_pct,
+    ROUND(AVG(days_elapsed), 0) AS avg_days_between
+FROM return_devs
+GROUP BY position, age_bracket
+ORDER BY position, age_bracket;
@@ -6,6 +6,9 @@
 -- Builds a feature matrix combining player attributes,
 -- career statistics, and contextual features for market
 -- value prediction models in the Python notebooks.
+-- Notebook 04 reads the same matrix from the feature store
+-- (notebooks/utils/features.py): career_stats is kept per player
+-- in feature_player and refreshed only for players with new data.
 -- ============================================================
 
 WITH career_stats AS (
@@ -26,6 +29,9 @@ WITH career_stats AS (
 ),
 value_trajectory AS (
     -- Calculate value momentum: how fast is the player's value changing?
+    -- The window below sorts each player's whole history by distance to
+    -- the target date; notebooks/utils/timeseries.py (value_momentum) does
+    -- the same lookup as binary searches in a per-player valuation index.
     SELECT
         player_id,
         -- Most recent valuation
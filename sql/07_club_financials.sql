@@ -8,6 +8,8 @@
 -- - Concentration risk (star dependency)
 -- - Age risk (depreciation exposure)
 -- - Investment efficiency (spend vs. current value)
+-- Squads as of past dates (monthly history in club_history.json):
+-- notebooks/utils/portfolio.py
 -- ============================================================
 
 WITH squad_analysis AS (